@@ -324,6 +324,54 @@ resource "aws_s3_bucket_lifecycle_configuration" "terraform_state_logs" {
       days = 365 # Keep logs for 1 year
     }
   }
+
+  # Processed-object markers and backfill state of the OCSF transformer
+  # (security-lake-custom-sources); one marker per log object, so they
+  # must expire too. Markers outlive the logs they dedupe.
+  dynamic "rule" {
+    for_each = {
+      "ocsf-checkpoints-expiration" = { prefix = var.ocsf_checkpoint_prefix, days = var.ocsf_checkpoint_retention_days }
+      "ocsf-backfill-expiration"    = { prefix = var.ocsf_backfill_state_prefix, days = var.ocsf_backfill_state_retention_days }
+    }
+
+    content {
+      id     = rule.key
+      status = "Enabled"
+
+      filter {
+        prefix = rule.value.prefix
+      }
+
+      expiration {
+        days = rule.value.days
+      }
+
+      noncurrent_version_expiration {
+        noncurrent_days = 1
+      }
+    }
+  }
+
+  # Delete markers left behind once the expired versions are gone
+  dynamic "rule" {
+    for_each = {
+      "ocsf-checkpoints-delete-markers" = var.ocsf_checkpoint_prefix
+      "ocsf-backfill-delete-markers"    = var.ocsf_backfill_state_prefix
+    }
+
+    content {
+      id     = rule.key
+      status = "Enabled"
+
+      filter {
+        prefix = rule.value
+      }
+
+      expiration {
+        expired_object_delete_marker = true
+      }
+    }
+  }
 }
 
 # Bucket policy to allow S3 log delivery
@@ -44,6 +44,45 @@ variable "region" {
   default     = "us-east-1"
 }
 
+variable "ocsf_checkpoint_prefix" {
+  description = "checkpoint_prefix of security-lake-custom-sources: processed-object markers in the Terraform state access logs bucket"
+  type        = string
+  default     = "ocsf-checkpoints/"
+
+  validation {
+    condition     = length(var.ocsf_checkpoint_prefix) > 0 && endswith(var.ocsf_checkpoint_prefix, "/")
+    error_message = "ocsf_checkpoint_prefix must be a non-empty prefix ending in /, or its expiration would cover the whole bucket."
+  }
+}
+
+variable "ocsf_checkpoint_retention_days" {
+  description = "Days before a processed-object marker expires; at least the 365-day log retention, so a replay or backfill of any retained log is still deduplicated"
+  type        = number
+  default     = 400
+
+  validation {
+    condition     = var.ocsf_checkpoint_retention_days >= 365
+    error_message = "ocsf_checkpoint_retention_days must be at least the 365-day access log retention."
+  }
+}
+
+variable "ocsf_backfill_state_prefix" {
+  description = "backfill_state_prefix of security-lake-custom-sources: backfill job plans, progress and manifests in the Terraform state access logs bucket"
+  type        = string
+  default     = "ocsf-backfill/"
+
+  validation {
+    condition     = length(var.ocsf_backfill_state_prefix) > 0 && endswith(var.ocsf_backfill_state_prefix, "/")
+    error_message = "ocsf_backfill_state_prefix must be a non-empty prefix ending in /, or its expiration would cover the whole bucket."
+  }
+}
+
+variable "ocsf_backfill_state_retention_days" {
+  description = "Days before backfill job state expires; a job re-invoked after that is planned again, its objects still deduplicated by their markers"
+  type        = number
+  default     = 90
+}
+
 variable "tags" {
   description = "Common tags to apply to all resources"
   type        = map(string)
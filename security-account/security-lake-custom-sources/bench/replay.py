@@ -0,0 +1,1155 @@
+#!/usr/bin/env python3
+"""
+Local Replay / Benchmark Harness for the OCSF Transformer
+
+Generates synthetic S3 server access logs and drives
+lambda_function.lambda_handler against an in-process S3 stand-in (moto),
+so transformer performance can be measured and regression-checked
+without AWS.
+
+Usage:
+    pip install -r bench/requirements.txt
+
+    # End-to-end replay through lambda_handler
+    python bench/replay.py replay --lines 200000 --objects 4 --hit-ratio 0.05
+
+    # Inject S3 latency to exercise record concurrency
+    python bench/replay.py replay --objects 10 --latency-ms 50 --workers 1
+
+    # Fail (exit 1) below a throughput floor, e.g. in CI
+    python bench/replay.py replay --min-events-per-sec 20000 --json
+
+    # Hot-path micro-benchmarks (tokenizer, timestamps, encoder)
+    python bench/replay.py micro --lines 200000
+
+    # Timestamp parse cost per line: strptime vs the cached fixed-format parser
+    python bench/replay.py timestamps --lines 1000000
+
+    # Output size and write time: JSON vs Parquet (snappy, zstd) for the same events
+    python bench/replay.py output --lines 200000
+
+    # Tokenizer throughput on a 1M-line file: str.split vs the access log
+    # grammar, alone and behind the Terraform byte prefilter
+    python bench/replay.py tokenizer --lines 1000000 --hit-ratio 0.05
+
+    # Sharded transform of one large object across 1/2/4/6 processes
+    python bench/replay.py shards --lines 1000000 --shard-workers 1 2 4 6
+
+    # Compressed (gzip/bzip2/zstd) vs uncompressed input, end to end;
+    # --get-mbps models GET transfer time from the stored object size
+    python bench/replay.py compression --lines 400000 --get-mbps 100
+
+    # Per-source parser throughput and registry routing cost
+    python bench/replay.py sources --lines 200000
+
+    # Cold start: module import and S3 client creation in fresh interpreters
+    python bench/replay.py coldstart --runs 20 --max-import-ms 100
+
+    # Backfill of 30 days of logs in 20 s "invocations" that resume from
+    # their checkpoint; checks every event is delivered exactly once
+    python bench/replay.py backfill --days 30 --objects-per-day 24 --invocation-seconds 20
+"""
+import argparse
+import bz2
+import contextlib
+import gzip
+import io
+import json
+import logging
+import os
+import random
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+
+REGION = 'us-east-1'
+ACCOUNT_ID = '123456789012'
+SOURCE_BUCKET = 'workload-account-terraform-state-access-logs'
+STATE_BUCKET = 'acme-tfstate-production'
+SHARED_BUCKETS = ('acme-app-assets', 'acme-data-exports', 'acme-cloudtrail-archive')
+SECURITY_LAKE_BUCKET = f'aws-security-data-lake-{REGION}-{ACCOUNT_ID}'
+
+OPERATIONS = (
+    ('REST.GET.OBJECT', 'GET'),
+    ('REST.PUT.OBJECT', 'PUT'),
+    ('REST.HEAD.OBJECT', 'HEAD'),
+    ('REST.GET.BUCKET', 'GET'),
+    ('REST.DELETE.OBJECT', 'DELETE'),
+)
+TERRAFORM_KEYS = (
+    'terraform-state/production/networking/terraform.tfstate',
+    'terraform-state/production/eks/terraform.tfstate',
+    'terraform-state/security/backend/terraform.tfstate',
+    'env:/staging/terraform.tfstate.backup',
+)
+OTHER_KEYS = (
+    'images/2026/10/banner.png',
+    'exports/report-{n}.csv',
+    'AWSLogs/{account}/CloudTrail/{region}/2026/10/18/{n}.json.gz',
+    'static/js/app.{n}.js',
+)
+TERRAFORM_USER_AGENT = 'APN/1.0 HashiCorp/1.0 Terraform/1.6.6 (+https://www.terraform.io) terraform-provider-aws/5.31.0'
+USER_AGENTS = (
+    'aws-cli/2.15.0 Python/3.11.6 Linux/6.1 exe/x86_64.amzn.2023 prompt/off command/s3.cp',
+    'Boto3/1.34.0 md/Botocore#1.34.0 ua/2.0 os/linux#6.1 lang/python#3.11.6',
+    'aws-sdk-go/1.49.0 (go1.21.5; linux; amd64)',
+)
+
+
+class LambdaContext:
+    """Minimal stand-in for the Lambda context object"""
+
+    def __init__(self):
+        self.request_id = str(uuid.uuid4())
+        self.invoked_function_arn = f'arn:aws:lambda:{REGION}:{ACCOUNT_ID}:function:SecurityLakeTerraformStateTransformer'
+        self.function_name = 'SecurityLakeTerraformStateTransformer'
+
+    def get_remaining_time_in_millis(self):
+        return 300000
+
+
+class DeadlineContext(LambdaContext):
+    """Context whose remaining time runs out after seconds"""
+
+    def __init__(self, seconds):
+        super().__init__()
+        self.deadline = time.perf_counter() + seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self.deadline - time.perf_counter()) * 1000))
+
+
+def generate_access_log(lines, hit_ratio, seed=0, start=None):
+    """Synthetic S3 server access log (bytes) with the full modern field set"""
+    rng = random.Random(seed)
+    current = start or datetime(2026, 10, 18, 0, 0, 0, tzinfo=timezone.utc)
+    out = io.StringIO()
+
+    for n in range(lines):
+        # Roughly 20 lines per second, so timestamps repeat like real logs
+        if rng.random() < 0.05:
+            current += timedelta(seconds=1)
+
+        operation, method = rng.choice(OPERATIONS)
+        if rng.random() < hit_ratio:
+            bucket = STATE_BUCKET
+            key = rng.choice(TERRAFORM_KEYS)
+            requester = f'arn:aws:sts::{ACCOUNT_ID}:assumed-role/TerraformExecutionRole/session-{n % 7}'
+            user_agent = TERRAFORM_USER_AGENT
+        else:
+            bucket = rng.choice(SHARED_BUCKETS)
+            key = rng.choice(OTHER_KEYS).format(n=n, account=ACCOUNT_ID, region=REGION)
+            requester = f'arn:aws:iam::{ACCOUNT_ID}:user/app-{n % 13}'
+            user_agent = rng.choice(USER_AGENTS)
+
+        status = rng.choice(('200', '200', '200', '204', '403', '404'))
+        error = '-' if status.startswith('2') else rng.choice(('AccessDenied', 'NoSuchKey'))
+        size = rng.randint(200, 5_000_000)
+
+        out.write(
+            f'79a59df900b949e55d96a1e698fbacedfd6e09d98eacf8f8d5218e7cd47ef2be {bucket} '
+            f'[{current.strftime("%d/%b/%Y:%H:%M:%S")} +0000] 10.{n % 250}.{n % 17}.{n % 200} '
+            f'{requester} {uuid.UUID(int=rng.getrandbits(128)).hex[:16].upper()} {operation} {key} '
+            f'"{method} /{bucket}/{key} HTTP/1.1" {status} {error} {size if method == "GET" else "-"} '
+            f'{size} {rng.randint(5, 900)} {rng.randint(1, 90)} "-" "{user_agent}" - '
+            f's9lzHYrFp76ZVxRcpX9+5cjAnEH2ROuNkd2BHfIa6UkFVdtjf5mKR3/eTPFvsiP/XV/VLi31234= SigV4 '
+            f'ECDHE-RSA-AES128-GCM-SHA256 AuthHeader {bucket}.s3.{REGION}.amazonaws.com TLSv1.2 - -\n'
+        )
+
+    return out.getvalue().encode('utf-8')
+
+
+def generate_cloudfront_log(lines, seed=0, start=None):
+    """Synthetic CloudFront standard log (bytes, tab separated, with headers)"""
+    rng = random.Random(seed)
+    current = start or datetime(2026, 10, 18, 0, 0, 0, tzinfo=timezone.utc)
+    out = io.StringIO()
+    out.write('#Version: 1.0\n#Fields: date time x-edge-location sc-bytes c-ip cs-method ...\n')
+
+    for n in range(lines):
+        if rng.random() < 0.05:
+            current += timedelta(seconds=1)
+        method = rng.choice(('GET', 'GET', 'GET', 'HEAD', 'POST'))
+        status = rng.choice(('200', '200', '304', '403', '404', '502'))
+        fields = (
+            current.strftime('%Y-%m-%d'), current.strftime('%H:%M:%S'), 'IAD89-P1', str(rng.randint(300, 90000)),
+            f'203.0.{n % 250}.{n % 200}', method, 'd111111abcdef8.cloudfront.net', f'/static/app.{n % 97}.js',
+            status, 'https://www.example.com/', 'Mozilla/5.0%20(X11;%20Linux%20x86_64)', '-' if n % 3 else f'v={n}',
+            '-', 'Hit', uuid.UUID(int=rng.getrandbits(128)).hex, 'www.example.com', 'https', str(rng.randint(100, 900)),
+            f'0.{rng.randint(1, 999):03d}', '-', 'TLSv1.3', 'TLS_AES_128_GCM_SHA256', 'Hit', 'HTTP/2.0', '-', '-',
+            str(rng.randint(1024, 65535)), '0.001', 'Hit', 'application/javascript', str(rng.randint(300, 90000)), '-', '-',
+        )
+        out.write('\t'.join(fields) + '\n')
+
+    return out.getvalue().encode('utf-8')
+
+
+def generate_alb_log(lines, seed=0, start=None):
+    """Synthetic Application Load Balancer access log (bytes)"""
+    rng = random.Random(seed)
+    current = start or datetime(2026, 10, 18, 0, 0, 0, tzinfo=timezone.utc)
+    out = io.StringIO()
+
+    for n in range(lines):
+        if rng.random() < 0.05:
+            current += timedelta(seconds=1)
+        method = rng.choice(('GET', 'GET', 'POST', 'PUT', 'DELETE'))
+        status = rng.choice(('200', '200', '201', '401', '404', '503'))
+        out.write(
+            f'https {current.strftime("%Y-%m-%dT%H:%M:%S")}.{rng.randint(0, 999999):06d}Z app/prod-alb/50dc6c495c0c9188 '
+            f'198.51.{n % 250}.{n % 200}:{rng.randint(1024, 65535)} 10.0.{n % 8}.{n % 250}:8080 '
+            f'0.000 0.{rng.randint(1, 999):03d} 0.000 {status} {status} {rng.randint(100, 4000)} {rng.randint(200, 90000)} '
+            f'"{method} https://api.example.com:443/v1/orders/{n}?expand=items HTTP/1.1" '
+            f'"Mozilla/5.0 (Macintosh; Intel Mac OS X 14_0)" ECDHE-RSA-AES128-GCM-SHA256 TLSv1.2 '
+            f'arn:aws:elasticloadbalancing:{REGION}:{ACCOUNT_ID}:targetgroup/api/73e2d6bc24d8a067 '
+            f'"Root=1-58337262-{uuid.UUID(int=rng.getrandbits(128)).hex[:24]}" "api.example.com" '
+            f'"arn:aws:acm:{REGION}:{ACCOUNT_ID}:certificate/12345678" 0 {current.strftime("%Y-%m-%dT%H:%M:%S")}.000000Z '
+            f'"forward" "-" "-" "10.0.{n % 8}.{n % 250}:8080" "{status}" "-" "-" TID_{n}\n'
+        )
+
+    return out.getvalue().encode('utf-8')
+
+
+def generate_k8s_audit_log(lines, seed=0, start=None):
+    """Synthetic Kubernetes audit log (bytes, JSON lines, both audit stages)"""
+    rng = random.Random(seed)
+    current = start or datetime(2026, 10, 18, 0, 0, 0, tzinfo=timezone.utc)
+    out = io.StringIO()
+
+    for n in range(lines):
+        if rng.random() < 0.05:
+            current += timedelta(seconds=1)
+        verb = rng.choice(('get', 'list', 'watch', 'create', 'update', 'patch', 'delete'))
+        resource = rng.choice(('pods', 'secrets', 'configmaps', 'deployments', 'leases'))
+        timestamp = f'{current.strftime("%Y-%m-%dT%H:%M:%S")}.{rng.randint(0, 999999):06d}Z'
+        out.write(json.dumps({
+            'kind': 'Event',
+            'apiVersion': 'audit.k8s.io/v1',
+            'level': 'Metadata',
+            'auditID': str(uuid.UUID(int=rng.getrandbits(128))),
+            'stage': 'ResponseComplete' if n % 4 else 'RequestReceived',
+            'requestURI': f'/api/v1/namespaces/app-{n % 5}/{resource}',
+            'verb': verb,
+            'user': {
+                'username': f'system:serviceaccount:app-{n % 5}:default' if n % 2 else 'admin@example.com',
+                'groups': ['system:authenticated'],
+            },
+            'sourceIPs': [f'10.1.{n % 250}.{n % 200}'],
+            'userAgent': 'kubectl/v1.29.0 (linux/amd64) kubernetes/3f7a50f',
+            'objectRef': {'resource': resource, 'namespace': f'app-{n % 5}', 'apiVersion': 'v1'},
+            'responseStatus': {'metadata': {}, 'code': rng.choice((200, 200, 201, 403, 404))},
+            'requestReceivedTimestamp': timestamp,
+            'stageTimestamp': timestamp,
+            'annotations': {'authorization.k8s.io/decision': 'allow'},
+        }) + '\n')
+
+    return out.getvalue().encode('utf-8')
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def configure_environment(args):
+    os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+    os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+    os.environ['AWS_DEFAULT_REGION'] = REGION
+    os.environ['AWS_REGION'] = REGION
+    os.environ['TERRAFORM_STATE_LOGS_BUCKET'] = SOURCE_BUCKET
+    os.environ['SECURITY_LAKE_CUSTOM_SOURCE_ARN_TERRAFORM'] = 'local-replay'
+    os.environ['SECURITY_LAKE_CUSTOM_SOURCE_NAME_TERRAFORM'] = 'TerraformStateAccess'
+    os.environ['OUTPUT_FORMAT'] = args.output_format
+    os.environ['RECORD_WORKERS'] = str(args.workers)
+    # Off by default so repeated --invocations measure the transform, not the skip path
+    os.environ['CHECKPOINT_PREFIX'] = 'ocsf-checkpoints/' if getattr(args, 'checkpoints', False) else ''
+    sys.path.insert(0, os.path.abspath(LAMBDA_DIR))
+
+
+def install_s3_instrumentation(client, latency_ms, counters):
+    """Count write calls and inject per-call latency through botocore events"""
+    write_operations = ('PutObject', 'UploadPart', 'CompleteMultipartUpload')
+
+    def before_call(model, **kwargs):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+
+    def after_call(model, **kwargs):
+        if model.name in write_operations:
+            counters[model.name] = counters.get(model.name, 0) + 1
+
+    client.meta.events.register('before-call.s3', before_call)
+    client.meta.events.register('after-call.s3', after_call)
+
+
+def run_replay(args):
+    configure_environment(args)
+
+    from moto import mock_aws
+
+    with mock_aws():
+        import boto3
+        import lambda_function
+
+        setup = boto3.client('s3', region_name=REGION)
+        setup.create_bucket(Bucket=SOURCE_BUCKET)
+        setup.create_bucket(Bucket=SECURITY_LAKE_BUCKET)
+
+        records = []
+        input_bytes = 0
+        for n in range(args.objects):
+            key = f'terraform-state/access-logs/2026-10-18-00-{n:02d}-00-{uuid.uuid4().hex[:16].upper()}.log'
+            body = generate_access_log(args.lines // args.objects, args.hit_ratio, seed=n)
+            setup.put_object(Bucket=SOURCE_BUCKET, Key=key, Body=body)
+            input_bytes += len(body)
+            records.append({'s3': {'bucket': {'name': SOURCE_BUCKET}, 'object': {'key': key}}})
+
+        counters = {}
+        install_s3_instrumentation(lambda_function.get_s3(), args.latency_ms, counters)
+
+        # Time each record through the handler's own per-record entry point
+        record_latencies = []
+        process_record = lambda_function.process_record
+
+        def timed_process_record(*a, **kw):
+            started = time.perf_counter()
+            try:
+                return process_record(*a, **kw)
+            finally:
+                record_latencies.append(time.perf_counter() - started)
+
+        lambda_function.process_record = timed_process_record
+        if not args.verbose:
+            lambda_function.logger.setLevel('WARNING')
+
+        # The handler prints one EMF metrics record per invocation to stdout
+        stdout = io.StringIO()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(stdout):
+            for _ in range(args.invocations):
+                lambda_function.lambda_handler({'Records': records}, LambdaContext())
+        elapsed = time.perf_counter() - started
+        emf = summarize_emf(stdout.getvalue())
+
+        events = 0
+        output_bytes = 0
+        paginator = setup.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=SECURITY_LAKE_BUCKET):
+            for obj in page.get('Contents', []):
+                output_bytes += obj['Size']
+                if obj['Key'].endswith('.json'):
+                    body = setup.get_object(Bucket=SECURITY_LAKE_BUCKET, Key=obj['Key'])['Body'].read()
+                    events += len(json.loads(body)['events'])
+                else:
+                    import pyarrow.parquet as pq
+                    body = setup.get_object(Bucket=SECURITY_LAKE_BUCKET, Key=obj['Key'])['Body'].read()
+                    events += pq.ParquetFile(io.BytesIO(body)).metadata.num_rows
+
+    total_lines = (args.lines // args.objects) * args.objects * args.invocations
+    return {
+        'scenario': 'replay',
+        'output_format': args.output_format,
+        'workers': args.workers,
+        'latency_ms': args.latency_ms,
+        'lines': total_lines,
+        'input_mb': round(input_bytes * args.invocations / 1024 / 1024, 2),
+        'events': events,
+        'seconds': round(elapsed, 3),
+        'lines_per_sec': round(total_lines / elapsed),
+        'events_per_sec': round(events / elapsed),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'puts': sum(counters.values()),
+        'put_calls': counters,
+        'output_mb': round(output_bytes / 1024 / 1024, 2),
+        'record_p50_ms': round(percentile(record_latencies, 50) * 1000, 1),
+        'record_p99_ms': round(percentile(record_latencies, 99) * 1000, 1),
+        **emf,
+    }
+
+
+def summarize_emf(output):
+    """Totals, S3 latency percentiles and memory across the EMF records in captured stdout"""
+    records = [json.loads(line) for line in output.splitlines() if '"_aws"' in line]
+    summary = {'emf_records': len(records)}
+    for name, field in (('LinesScanned', 'lines_scanned'), ('LinesMatched', 'lines_matched'),
+                        ('EventsEmitted', 'events'), ('ParseErrors', 'parse_errors')):
+        summary[f'emf_{field}'] = sum(record[name] for record in records)
+
+    for name, field in (('GetLatency', 'get'), ('PutLatency', 'put')):
+        values = []
+        for record in records:
+            histogram = record.get(name, {'Values': [], 'Counts': []})
+            for value, count in zip(histogram['Values'], histogram['Counts']):
+                values.extend([value] * count)
+        summary[f'emf_{field}_p50_ms'] = percentile(values, 50)
+        summary[f'emf_{field}_p99_ms'] = percentile(values, 99)
+
+    summary['emf_memory_mb'] = max((record.get('Memory', 0) for record in records), default=0)
+    summary['emf_container_peak_memory_mb'] = max((record['ContainerPeakMemory'] for record in records), default=0)
+    return summary
+
+
+def compress_input(data, compression):
+    """data compressed as the format's usual CLI would write it"""
+    if compression == 'gzip':
+        return gzip.compress(data, compresslevel=6)
+    if compression == 'bzip2':
+        return bz2.compress(data)
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def run_compression(args):
+    """
+    The same access logs stored uncompressed and gzip/bzip2/zstd compressed,
+    each driven through lambda_handler; reports stored size, end-to-end
+    time and peak memory, and checks every format yields the same events
+    """
+    configure_environment(args)
+
+    from moto import mock_aws
+
+    compressions = list(args.compressions)
+    if 'zstd' in compressions:
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print("zstandard is not installed, skipping zstd", file=sys.stderr)
+            compressions.remove('zstd')
+
+    with mock_aws():
+        import boto3
+        import lambda_function
+
+        setup = boto3.client('s3', region_name=REGION)
+        setup.create_bucket(Bucket=SOURCE_BUCKET)
+        setup.create_bucket(Bucket=SECURITY_LAKE_BUCKET)
+
+        counters = {}
+        install_s3_instrumentation(lambda_function.get_s3(), args.latency_ms, counters)
+        if args.get_mbps:
+            # Transfer time of the stored (possibly compressed) object
+            def transfer(http_response, parsed, model, **kwargs):
+                if model.name == 'GetObject' and http_response.status_code < 300:
+                    time.sleep(int(parsed.get('ContentLength', 0)) / (args.get_mbps * 1024 * 1024 / 8))
+
+            lambda_function.get_s3().meta.events.register('after-call.s3.GetObject', transfer)
+        if not args.verbose:
+            lambda_function.logger.setLevel('WARNING')
+
+        plain = [generate_access_log(args.lines // args.objects, args.hit_ratio, seed=n) for n in range(args.objects)]
+
+        runs = []
+        for compression in compressions:
+            for obj in setup.list_objects_v2(Bucket=SECURITY_LAKE_BUCKET).get('Contents', []):
+                setup.delete_object(Bucket=SECURITY_LAKE_BUCKET, Key=obj['Key'])
+
+            records = []
+            stored_bytes = 0
+            for n, data in enumerate(plain):
+                key = f'terraform-state/access-logs/{compression}/2026-10-18-00-{n:02d}-00.log'
+                body = compress_input(data, compression)
+                setup.put_object(Bucket=SOURCE_BUCKET, Key=key, Body=body)
+                stored_bytes += len(body)
+                records.append({'s3': {'bucket': {'name': SOURCE_BUCKET}, 'object': {'key': key}}})
+
+            stdout = io.StringIO()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(stdout):
+                lambda_function.lambda_handler({'Records': records}, LambdaContext())
+            elapsed = time.perf_counter() - started
+            emf = summarize_emf(stdout.getvalue())
+
+            events = []
+            for obj in setup.list_objects_v2(Bucket=SECURITY_LAKE_BUCKET).get('Contents', []):
+                data = setup.get_object(Bucket=SECURITY_LAKE_BUCKET, Key=obj['Key'])['Body'].read()
+                events.extend(
+                    (event['time'], event['unmapped']['request_id']) for event in json.loads(data)['events']
+                )
+
+            runs.append({
+                'compression': compression,
+                'stored_mb': round(stored_bytes / 1024 / 1024, 2),
+                'ratio': round(sum(map(len, plain)) / stored_bytes, 1),
+                'seconds': round(elapsed, 3),
+                'lines_per_sec': round(emf['emf_lines_scanned'] / elapsed),
+                'events': len(events),
+                'same_events': sorted(events) == sorted(runs[0]['_events']) if runs else True,
+                'get_p50_ms': emf['emf_get_p50_ms'],
+                '_events': events,
+            })
+
+    for run in runs:
+        del run['_events']
+    return {
+        'scenario': 'compression',
+        'lines': (args.lines // args.objects) * args.objects,
+        'objects': args.objects,
+        'get_mbps': args.get_mbps,
+        'runs': runs,
+        'mismatched': sum(1 for run in runs if not run['same_events']),
+    }
+
+
+def run_backfill(args):
+    """
+    Historical logs over args.days, backfilled through backfill.lambda_handler
+    in invocations of args.invocation_seconds that each resume the job from
+    its checkpoint; checks the delivered events against a direct transform
+    (none missing, none duplicated)
+    """
+    configure_environment(args)
+    os.environ['BACKFILL_RESERVE_SECONDS'] = str(args.reserve_seconds)
+    os.environ['BACKFILL_BATCH_OBJECTS'] = str(args.batch_objects)
+    # The harness plays the self-invocation, so resumes are counted
+    os.environ['BACKFILL_CONTINUE'] = 'false'
+
+    from moto import mock_aws
+
+    with mock_aws():
+        import boto3
+        import backfill
+        import lambda_function
+
+        setup = boto3.client('s3', region_name=REGION)
+        setup.create_bucket(Bucket=SOURCE_BUCKET)
+        setup.create_bucket(Bucket=SECURITY_LAKE_BUCKET)
+
+        expected = []
+        input_bytes = 0
+        first_day = datetime(2026, 9, 1, tzinfo=timezone.utc)
+        for day in range(args.days):
+            for n in range(args.objects_per_day):
+                start = first_day + timedelta(days=day, hours=n * 24 // args.objects_per_day)
+                key = f'terraform-state/access-logs/{start.strftime("%Y-%m-%d-%H-%M-%S")}-{n:04X}.log'
+                body = generate_access_log(args.lines, args.hit_ratio, seed=day * 1000 + n, start=start)
+                setup.put_object(Bucket=SOURCE_BUCKET, Key=key, Body=body)
+                input_bytes += len(body)
+                expected.extend(
+                    event['unmapped']['request_id']
+                    for _, event in lambda_function.transform_s3_access_log_to_ocsf(body, SOURCE_BUCKET, key)
+                )
+
+        install_s3_instrumentation(lambda_function.get_s3(), args.latency_ms, {})
+        if not args.verbose:
+            lambda_function.logger.setLevel('WARNING')
+
+        last_day = first_day + timedelta(days=args.days - 1)
+        event = {
+            'job_id': 'bench',
+            'bucket': SOURCE_BUCKET,
+            'prefix': 'terraform-state/access-logs/{date}',
+            'start_date': first_day.strftime('%Y-%m-%d'),
+            'end_date': last_day.strftime('%Y-%m-%d'),
+        }
+
+        reports = []
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            while not reports or reports[-1]['status'] == 'in_progress':
+                reports.append(backfill.lambda_handler(event, DeadlineContext(args.invocation_seconds)))
+                if len(reports) >= args.max_invocations:
+                    break
+        elapsed = time.perf_counter() - started
+
+        delivered = []
+        output_objects = 0
+        paginator = setup.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=SECURITY_LAKE_BUCKET):
+            for obj in page.get('Contents', []):
+                output_objects += 1
+                data = setup.get_object(Bucket=SECURITY_LAKE_BUCKET, Key=obj['Key'])['Body'].read()
+                delivered.extend(event['unmapped']['request_id'] for event in json.loads(data)['events'])
+
+    missing = len(set(expected) - set(delivered))
+    duplicated = len(delivered) - len(set(delivered))
+    return {
+        'scenario': 'backfill',
+        'workers': args.workers,
+        'latency_ms': args.latency_ms,
+        'objects': args.days * args.objects_per_day,
+        'input_mb': round(input_bytes / 1024 / 1024, 2),
+        'batches': reports[-1]['batches'],
+        'invocations': len(reports),
+        'status': reports[-1]['status'],
+        'seconds': round(elapsed, 3),
+        'objects_per_sec': round(args.days * args.objects_per_day / elapsed, 1),
+        'events_per_sec': round(len(delivered) / elapsed),
+        'backlog_after_first': reports[0]['backlog_objects'],
+        'output_objects': output_objects,
+        'expected_events': len(expected),
+        'events': len(delivered),
+        'missing': missing,
+        'duplicated': duplicated,
+        'mismatched': 1 if missing or duplicated or reports[-1]['status'] != 'complete' else 0,
+    }
+
+
+def run_shard_scaling(args):
+    """
+    Transform one large object with SHARD_WORKERS = each of args.shard_workers
+
+    Shard workers are separate processes, so S3 is served by a moto server
+    on localhost rather than the in-process mock.
+    """
+    configure_environment(args)
+
+    from moto.server import ThreadedMotoServer
+
+    if not args.verbose:
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = ThreadedMotoServer(ip_address='127.0.0.1', port=port, verbose=False)
+    server.start()
+    os.environ['AWS_ENDPOINT_URL_S3'] = f'http://127.0.0.1:{port}'
+
+    try:
+        import boto3
+        import lambda_function
+
+        if not args.verbose:
+            lambda_function.logger.setLevel('WARNING')
+
+        setup = boto3.client('s3', region_name=REGION)
+        setup.create_bucket(Bucket=SOURCE_BUCKET)
+        setup.create_bucket(Bucket=SECURITY_LAKE_BUCKET)
+
+        key = f'terraform-state/access-logs/2026-10-18-00-00-00-{uuid.uuid4().hex[:16].upper()}.log'
+        body = generate_access_log(args.lines, args.hit_ratio)
+        setup.put_object(Bucket=SOURCE_BUCKET, Key=key, Body=body)
+        record = {'s3': {'bucket': {'name': SOURCE_BUCKET}, 'object': {'key': key}}}
+
+        lambda_function.SHARD_MIN_MB = 0
+        runs = []
+        for workers in args.shard_workers:
+            for obj in setup.list_objects_v2(Bucket=SECURITY_LAKE_BUCKET).get('Contents', []):
+                setup.delete_object(Bucket=SECURITY_LAKE_BUCKET, Key=obj['Key'])
+
+            lambda_function.SHARD_WORKERS = workers
+            stdout = io.StringIO()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(stdout):
+                lambda_function.lambda_handler({'Records': [record]}, LambdaContext())
+            elapsed = time.perf_counter() - started
+            emf = summarize_emf(stdout.getvalue())
+
+            events = 0
+            for obj in setup.list_objects_v2(Bucket=SECURITY_LAKE_BUCKET).get('Contents', []):
+                data = setup.get_object(Bucket=SECURITY_LAKE_BUCKET, Key=obj['Key'])['Body'].read()
+                events += len(json.loads(data)['events'])
+
+            runs.append({
+                'workers': workers,
+                'seconds': round(elapsed, 3),
+                'lines_per_sec': round(args.lines / elapsed),
+                'events': events,
+                'emf_lines_scanned': emf['emf_lines_scanned'],
+                'speedup': round(runs[0]['seconds'] / elapsed, 2) if runs else 1.0,
+            })
+    finally:
+        server.stop()
+
+    return {
+        'scenario': 'shards',
+        'cpus': os.cpu_count(),
+        'lines': args.lines,
+        'input_mb': round(len(body) / 1024 / 1024, 2),
+        'runs': runs,
+    }
+
+
+def run_sources(args):
+    """
+    Per-source transform throughput over in-memory logs, plus the cost of
+    routing a key through the source registry
+    """
+    configure_environment(args)
+    os.environ['LOG_SOURCES'] = json.dumps({name: {'prefixes': [f'{name}/']} for name in ('cloudfront', 'alb', 'k8s_audit')})
+
+    import lambda_function
+    from sources import LogSource, SourceRegistry
+
+    if not args.verbose:
+        lambda_function.logger.setLevel('WARNING')
+
+    inputs = {
+        'terraform_state': generate_access_log(args.lines, args.hit_ratio),
+        'cloudfront': generate_cloudfront_log(args.lines),
+        'alb': generate_alb_log(args.lines),
+        'k8s_audit': generate_k8s_audit_log(args.lines),
+    }
+
+    sources = []
+    for source in lambda_function.SOURCES:
+        data = inputs[source.name]
+        started = time.perf_counter()
+        events = sum(1 for _ in source.transform(data, SOURCE_BUCKET, 'bench.log'))
+        elapsed = time.perf_counter() - started
+        sources.append({
+            'source': source.name,
+            'input_mb': round(len(data) / 1024 / 1024, 2),
+            'events': events,
+            'lines_per_sec': round(args.lines / elapsed),
+            'events_per_sec': round(events / elapsed),
+            'mb_per_sec': round(len(data) / 1024 / 1024 / elapsed, 1),
+        })
+
+    # Routing: trie lookup vs a linear scan over the same prefixes
+    rng = random.Random(0)
+    prefixes = [f'logs/team-{n}/{uuid.UUID(int=rng.getrandbits(128)).hex[:8]}/' for n in range(args.prefixes)]
+    registry = SourceRegistry()
+    for n, prefix in enumerate(prefixes):
+        registry.register(LogSource(f'source-{n}', 'bench', 'bench', None, None), prefixes=(prefix,))
+    keys = [rng.choice(prefixes) + f'2026/10/18/{n}.log.gz' for n in range(20000)]
+
+    def linear_route(key):
+        return next((prefix for prefix in prefixes if key.startswith(prefix)), None)
+
+    return {
+        'scenario': 'sources',
+        'lines': args.lines,
+        'sources': sources,
+        'route_prefixes': args.prefixes,
+        'route_trie_ns': round(time_per_item(lambda key: registry.route(SOURCE_BUCKET, key), keys)),
+        'route_linear_ns': round(time_per_item(linear_route, keys)),
+    }
+
+
+# Run in a fresh interpreter per sample; prints import and client creation seconds
+COLD_START_PROBE = """
+import time
+started = time.perf_counter()
+import lambda_function
+imported = time.perf_counter()
+lambda_function.get_s3()
+print(imported - started, time.perf_counter() - imported)
+"""
+
+# The previous startup path: boto3 imported and its client built at module load
+BOTO3_PROBE = """
+import time
+started = time.perf_counter()
+import boto3
+imported = time.perf_counter()
+boto3.client('s3')
+print(imported - started, time.perf_counter() - imported)
+"""
+
+
+def run_coldstart(args):
+    """
+    Container init cost: import lambda_function, then create the S3 client
+    on first use, each sample in a new interpreter so nothing is cached
+    """
+    configure_environment(args)
+    env = dict(os.environ, PYTHONPATH=os.path.abspath(LAMBDA_DIR), PYTHONDONTWRITEBYTECODE='1')
+
+    def sample(probe):
+        imports, clients = [], []
+        for _ in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, '-c', probe], env=env, cwd=LAMBDA_DIR, check=True, capture_output=True, text=True
+            ).stdout.split()
+            imports.append(float(output[-2]) * 1000)
+            clients.append(float(output[-1]) * 1000)
+        return imports, clients
+
+    imports, clients = sample(COLD_START_PROBE)
+    boto3_imports, boto3_clients = sample(BOTO3_PROBE)
+    totals = [i + c for i, c in zip(imports, clients)]
+
+    return {
+        'scenario': 'coldstart',
+        'runs': args.runs,
+        'import_p50_ms': round(statistics.median(imports), 1),
+        'import_p90_ms': round(percentile(imports, 90), 1),
+        'client_p50_ms': round(statistics.median(clients), 1),
+        'init_p50_ms': round(statistics.median(totals), 1),
+        'boto3_import_p50_ms': round(statistics.median(boto3_imports), 1),
+        'boto3_client_p50_ms': round(statistics.median(boto3_clients), 1),
+    }
+
+
+def time_per_item(fn, items):
+    started = time.perf_counter()
+    for item in items:
+        fn(item)
+    elapsed = time.perf_counter() - started
+    return elapsed / len(items) * 1e9
+
+
+def run_timestamps(args):
+    """
+    Per-line cost of datetime.strptime against S3LogTimestampParser on the
+    timestamps of a synthetic log (seconds repeat, as in real logs) and on
+    all-distinct timestamps (every lookup misses the cache); checks the
+    parser agrees with strptime, UTC offset included
+    """
+    configure_environment(args)
+
+    from s3_access_log import S3LogTimestampParser
+
+    rng = random.Random(0)
+    base = datetime(2026, 10, 18, tzinfo=timezone.utc)
+    offsets = ('+0000', '+0000', '+0000', '-0700', '+0530')
+    log_times = []
+    current = base
+    for _ in range(args.lines):
+        # Roughly 20 lines per second, as generate_access_log writes them
+        if rng.random() < 0.05:
+            current += timedelta(seconds=1)
+        log_times.append(f'{current.strftime("%d/%b/%Y:%H:%M:%S")} {rng.choice(offsets)}')
+    distinct_times = [
+        f'{(base + timedelta(seconds=n)).strftime("%d/%b/%Y:%H:%M:%S")} +0000' for n in range(args.lines)
+    ]
+
+    def strptime_millis(timestamp):
+        return int(datetime.strptime(timestamp, '%d/%b/%Y:%H:%M:%S %z').timestamp()) * 1000
+
+    parser = S3LogTimestampParser()
+    results = {
+        'strptime_ns_per_line': time_per_item(strptime_millis, log_times),
+        'parser_ns_per_line': time_per_item(parser.parse, log_times),
+        'parser_uncached_ns_per_line': time_per_item(S3LogTimestampParser().parse, distinct_times),
+    }
+
+    checker = S3LogTimestampParser()
+    mismatched = sum(1 for t in log_times if checker.parse(t) != strptime_millis(t))
+    return {
+        'scenario': 'timestamps',
+        'lines': args.lines,
+        **{k: round(v) for k, v in results.items()},
+        'speedup': round(results['strptime_ns_per_line'] / results['parser_ns_per_line'], 1),
+        'unparseable': checker.errors,
+        'mismatched': mismatched,
+    }
+
+
+def run_output(args):
+    """
+    The same OCSF events written through JsonBatchWriter and through
+    OcsfParquetWriter (snappy and zstd) into moto S3: output size, object
+    count and writer time (encode + upload) per format
+    """
+    configure_environment(args)
+
+    from moto import mock_aws
+
+    formats = list(args.formats)
+    if any(f.startswith('parquet') for f in formats):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("pyarrow is not installed, skipping Parquet", file=sys.stderr)
+            formats = [f for f in formats if not f.startswith('parquet')]
+
+    with mock_aws():
+        import boto3
+        import lambda_function
+        from parquet_writer import OcsfParquetWriter, ocsf_api_activity_schema
+        from s3_output import JsonBatchWriter
+
+        setup = boto3.client('s3', region_name=REGION)
+        setup.create_bucket(Bucket=SECURITY_LAKE_BUCKET)
+        s3 = lambda_function.get_s3()
+        lambda_function.logger.setLevel('WARNING')
+
+        data = generate_access_log(args.lines, args.hit_ratio)
+        events = list(lambda_function.transform_s3_access_log_to_ocsf(data, SOURCE_BUCKET, 'bench.log'))
+        max_bytes = args.batch_max_mb * 1024 * 1024
+
+        runs = []
+        for output_format in formats:
+            prefix = f'bench/{output_format}'
+            if output_format == 'json':
+                writer = JsonBatchWriter(s3, SECURITY_LAKE_BUCKET, lambda offset: f'{prefix}/{offset}.json', max_bytes)
+            else:
+                writer = OcsfParquetWriter(
+                    s3, SECURITY_LAKE_BUCKET, lambda day, offset: f'{prefix}/{day}/{offset}.parquet',
+                    compression=output_format.split('-')[1], max_bytes=max_bytes, schema=ocsf_api_activity_schema()
+                )
+
+            started = time.perf_counter()
+            for offset, event in events:
+                writer.write(event, offset)
+            writer.close()
+            elapsed = time.perf_counter() - started
+
+            output_bytes = sum(
+                obj['Size'] for obj in setup.list_objects_v2(Bucket=SECURITY_LAKE_BUCKET, Prefix=prefix).get('Contents', [])
+            )
+            runs.append({
+                'format': output_format,
+                'objects': writer.objects_written,
+                'output_mb': round(output_bytes / 1024 / 1024, 2),
+                'bytes_per_event': round(output_bytes / len(events), 1),
+                'write_seconds': round(elapsed, 3),
+                'events_per_sec': round(len(events) / elapsed),
+            })
+
+    return {'scenario': 'output', 'events': len(events), 'runs': runs}
+
+
+def run_tokenizer(args):
+    """
+    Lines/sec of the naive str.split, the full-grammar regex and
+    parse_s3_access_log_line (split fast path, regex fallback) over every
+    line of a synthetic file, and of the transformer's actual order: the
+    byte prefilter over raw blocks, then parsing candidate lines only.
+    Checks the tokenizer and the regex agree on every line.
+    """
+    configure_environment(args)
+
+    from s3_access_log import S3_ACCESS_LOG_PATTERN, S3AccessLogRecord, TerraformStateLineFilter, parse_s3_access_log_line
+
+    data = generate_access_log(args.lines, args.hit_ratio)
+    lines = data.decode('utf-8').splitlines()
+    line_filter = TerraformStateLineFilter()
+
+    def regex(line):
+        match = S3_ACCESS_LOG_PATTERN.match(line)
+        return None if match is None else S3AccessLogRecord._make(match.groups())
+
+    def prefiltered():
+        parsed = 0
+        for start in range(0, len(data), 1 << 20):
+            # 1 MiB blocks, as iter_source_blocks reads them (line-aligned)
+            end = data.find(b'\n', start + (1 << 20))
+            block = data[start:end if end != -1 else len(data)]
+            for _, raw_line in line_filter.candidate_lines(block):
+                parse_s3_access_log_line(raw_line.decode('utf-8'))
+                parsed += 1
+        return parsed
+
+    results = {}
+    for name, fn in (('split', lambda line: line.split(' ')), ('regex', regex), ('tokenizer', parse_s3_access_log_line)):
+        started = time.perf_counter()
+        for line in lines:
+            fn(line)
+        results[f'{name}_lines_per_sec'] = round(len(lines) / (time.perf_counter() - started))
+
+    started = time.perf_counter()
+    candidates = prefiltered()
+    results['prefiltered_lines_per_sec'] = round(len(lines) / (time.perf_counter() - started))
+
+    mismatched = sum(1 for line in lines if parse_s3_access_log_line(line) != regex(line))
+    return {
+        'scenario': 'tokenizer',
+        'lines': len(lines),
+        'hit_ratio': args.hit_ratio,
+        'candidate_lines': candidates,
+        **results,
+        'tokenizer_vs_split': round(results['split_lines_per_sec'] / results['tokenizer_lines_per_sec'], 1),
+        'mismatched': mismatched,
+    }
+
+
+def run_micro(args):
+    configure_environment(args)
+
+    from ocsf import S3ApiActivityEventBuilder, encode_event
+    from s3_access_log import S3LogTimestampParser, parse_s3_access_log_line
+
+    lines = generate_access_log(args.lines, hit_ratio=1.0).decode('utf-8').splitlines()
+    records = [parse_s3_access_log_line(line) for line in lines]
+    timestamps = [record.time for record in records]
+
+    parser = S3LogTimestampParser()
+    builder = S3ApiActivityEventBuilder('1.1.0', SOURCE_BUCKET)
+    events = [
+        builder.build(r, r.key, r.operation, 200, parser.parse(r.time), 3)
+        for r in records
+    ]
+
+    results = {
+        'split_ns_per_line': time_per_item(lambda line: line.split(' '), lines),
+        'tokenizer_ns_per_line': time_per_item(parse_s3_access_log_line, lines),
+        'strptime_ns_per_line': time_per_item(
+            lambda ts: datetime.strptime(ts, '%d/%b/%Y:%H:%M:%S %z').timestamp(), timestamps
+        ),
+        'timestamp_parser_ns_per_line': time_per_item(S3LogTimestampParser().parse, timestamps),
+        'build_ns_per_event': time_per_item(
+            lambda r: builder.build(r, r.key, r.operation, 200, 0, 3), records
+        ),
+        'encode_ns_per_event': time_per_item(encode_event, events),
+    }
+
+    return {'scenario': 'micro', 'lines': len(lines), **{k: round(v) for k, v in results.items()}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='scenario', required=True)
+
+    replay = sub.add_parser('replay', help='Drive lambda_handler end to end against moto S3')
+    replay.add_argument('--lines', type=int, default=100000, help='Total log lines per invocation')
+    replay.add_argument('--objects', type=int, default=4, help='S3 records (log objects) per invocation')
+    replay.add_argument('--hit-ratio', type=float, default=0.05, help='Fraction of lines touching Terraform state')
+    replay.add_argument('--invocations', type=int, default=1)
+    replay.add_argument('--workers', type=int, default=4, help='RECORD_WORKERS')
+    replay.add_argument('--output-format', choices=('json', 'parquet'), default='json')
+    replay.add_argument('--checkpoints', action='store_true', help='Enable processed-object checkpoints')
+    replay.add_argument('--latency-ms', type=float, default=0, help='Injected latency per S3 call')
+    replay.add_argument('--min-events-per-sec', type=float, default=0, help='Exit 1 below this throughput')
+    replay.add_argument('--verbose', action='store_true', help='Keep the transformer INFO logs')
+    replay.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    micro = sub.add_parser('micro', help='Per-line cost of the transformer hot path')
+    micro.add_argument('--lines', type=int, default=100000)
+    micro.add_argument('--output-format', default='json', help=argparse.SUPPRESS)
+    micro.add_argument('--workers', type=int, default=1, help=argparse.SUPPRESS)
+    micro.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    timestamps = sub.add_parser('timestamps', help='Timestamp parse cost, strptime vs the cached parser')
+    timestamps.add_argument('--lines', type=int, default=1000000, help='Timestamps parsed')
+    timestamps.add_argument('--output-format', default='json', help=argparse.SUPPRESS)
+    timestamps.add_argument('--workers', type=int, default=1, help=argparse.SUPPRESS)
+    timestamps.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    output = sub.add_parser('output', help='Output size and write time, JSON vs Parquet')
+    output.add_argument('--lines', type=int, default=200000, help='Log lines transformed into events')
+    output.add_argument('--hit-ratio', type=float, default=1.0, help='Fraction of lines touching Terraform state')
+    output.add_argument('--formats', nargs='+', default=['json', 'parquet-snappy', 'parquet-zstd'],
+                        choices=('json', 'parquet-snappy', 'parquet-zstd'))
+    output.add_argument('--batch-max-mb', type=int, default=64, help='BATCH_MAX_MB')
+    output.add_argument('--output-format', default='json', help=argparse.SUPPRESS)
+    output.add_argument('--workers', type=int, default=1, help=argparse.SUPPRESS)
+    output.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    tokenizer = sub.add_parser('tokenizer', help='Access log tokenizer vs str.split, with and without the prefilter')
+    tokenizer.add_argument('--lines', type=int, default=1000000, help='Log lines in the synthetic file')
+    tokenizer.add_argument('--hit-ratio', type=float, default=0.05, help='Fraction of lines touching Terraform state')
+    tokenizer.add_argument('--output-format', default='json', help=argparse.SUPPRESS)
+    tokenizer.add_argument('--workers', type=int, default=1, help=argparse.SUPPRESS)
+    tokenizer.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    shards = sub.add_parser('shards', help='Sharded transform scaling across worker processes')
+    shards.add_argument('--lines', type=int, default=1000000, help='Log lines in the single input object')
+    shards.add_argument('--hit-ratio', type=float, default=0.05, help='Fraction of lines touching Terraform state')
+    shards.add_argument('--shard-workers', type=int, nargs='+', default=[1, 2, 4, 6])
+    shards.add_argument('--output-format', default='json', help=argparse.SUPPRESS)
+    shards.add_argument('--workers', type=int, default=1, help=argparse.SUPPRESS)
+    shards.add_argument('--verbose', action='store_true', help='Keep the transformer INFO logs')
+    shards.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    compression = sub.add_parser('compression', help='Compressed vs uncompressed input through lambda_handler')
+    compression.add_argument('--lines', type=int, default=400000, help='Total log lines')
+    compression.add_argument('--objects', type=int, default=4, help='S3 records (log objects)')
+    compression.add_argument('--hit-ratio', type=float, default=0.05, help='Fraction of lines touching Terraform state')
+    compression.add_argument('--compressions', nargs='+', default=['none', 'gzip', 'bzip2', 'zstd'],
+                             choices=('none', 'gzip', 'bzip2', 'zstd'))
+    compression.add_argument('--get-mbps', type=float, default=0, help='Modelled GET bandwidth in Mbit/s (0 = off)')
+    compression.add_argument('--latency-ms', type=float, default=0, help='Injected latency per S3 call')
+    compression.add_argument('--workers', type=int, default=4, help='RECORD_WORKERS')
+    compression.add_argument('--output-format', default='json', help=argparse.SUPPRESS)
+    compression.add_argument('--verbose', action='store_true', help='Keep the transformer INFO logs')
+    compression.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    sources = sub.add_parser('sources', help='Per-source parser throughput and routing cost')
+    sources.add_argument('--lines', type=int, default=100000, help='Log lines per source')
+    sources.add_argument('--hit-ratio', type=float, default=0.05, help='Terraform state share of S3 access log lines')
+    sources.add_argument('--prefixes', type=int, default=200, help='Registered prefixes for the routing benchmark')
+    sources.add_argument('--output-format', default='json', help=argparse.SUPPRESS)
+    sources.add_argument('--workers', type=int, default=1, help=argparse.SUPPRESS)
+    sources.add_argument('--verbose', action='store_true', help='Keep the transformer INFO logs')
+    sources.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    coldstart = sub.add_parser('coldstart', help='Module import and S3 client creation time in fresh interpreters')
+    coldstart.add_argument('--runs', type=int, default=10, help='Fresh interpreters per measurement')
+    coldstart.add_argument('--max-import-ms', type=float, default=0, help='Exit 1 when the p50 import is slower')
+    coldstart.add_argument('--output-format', default='json', help=argparse.SUPPRESS)
+    coldstart.add_argument('--workers', type=int, default=4, help=argparse.SUPPRESS)
+    coldstart.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    backfill = sub.add_parser('backfill', help='Checkpointed bulk backfill across resumed invocations')
+    backfill.add_argument('--days', type=int, default=14, help='Days of historical logs')
+    backfill.add_argument('--objects-per-day', type=int, default=24, help='Log objects per day')
+    backfill.add_argument('--lines', type=int, default=2000, help='Log lines per object')
+    backfill.add_argument('--hit-ratio', type=float, default=0.05, help='Fraction of lines touching Terraform state')
+    backfill.add_argument('--batch-objects', type=int, default=20, help='BACKFILL_BATCH_OBJECTS')
+    backfill.add_argument('--invocation-seconds', type=float, default=10, help='Time each invocation gets')
+    backfill.add_argument('--reserve-seconds', type=int, default=2, help='BACKFILL_RESERVE_SECONDS')
+    backfill.add_argument('--max-invocations', type=int, default=100)
+    backfill.add_argument('--latency-ms', type=float, default=0, help='Injected latency per S3 call')
+    backfill.add_argument('--workers', type=int, default=8, help='RECORD_WORKERS')
+    backfill.add_argument('--checkpoints', action='store_true', help='Enable processed-object checkpoints')
+    backfill.add_argument('--output-format', default='json', help=argparse.SUPPRESS)
+    backfill.add_argument('--verbose', action='store_true', help='Keep the transformer INFO logs')
+    backfill.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    args = parser.parse_args()
+    if args.scenario == 'replay':
+        result = run_replay(args)
+    elif args.scenario == 'shards':
+        result = run_shard_scaling(args)
+    elif args.scenario == 'compression':
+        result = run_compression(args)
+    elif args.scenario == 'sources':
+        result = run_sources(args)
+    elif args.scenario == 'coldstart':
+        result = run_coldstart(args)
+    elif args.scenario == 'backfill':
+        result = run_backfill(args)
+    elif args.scenario == 'tokenizer':
+        result = run_tokenizer(args)
+    elif args.scenario == 'output':
+        result = run_output(args)
+    elif args.scenario == 'timestamps':
+        result = run_timestamps(args)
+    else:
+        result = run_micro(args)
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for name, value in result.items():
+            print(f"{name:>30}: {value}")
+
+    floor = getattr(args, 'min_events_per_sec', 0)
+    if floor and result['events_per_sec'] < floor:
+        print(f"FAIL: {result['events_per_sec']} events/s is below the {floor} events/s floor", file=sys.stderr)
+        return 1
+
+    if result.get('mismatched'):
+        if args.scenario == 'tokenizer':
+            print(f"FAIL: tokenizer and regex disagree on {result['mismatched']} lines", file=sys.stderr)
+        elif args.scenario == 'timestamps':
+            print(f"FAIL: parser and strptime disagree on {result['mismatched']} timestamps", file=sys.stderr)
+        elif args.scenario == 'backfill':
+            print(
+                f"FAIL: backfill {result['status']}, {result['missing']} events missing, "
+                f"{result['duplicated']} duplicated", file=sys.stderr
+            )
+        else:
+            print(f"FAIL: {result['mismatched']} compressed runs produced different events", file=sys.stderr)
+        return 1
+
+    ceiling = getattr(args, 'max_import_ms', 0)
+    if ceiling and result['import_p50_ms'] > ceiling:
+        print(f"FAIL: {result['import_p50_ms']} ms import is above the {ceiling} ms ceiling", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
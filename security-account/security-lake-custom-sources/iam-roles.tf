@@ -33,7 +33,7 @@ resource "aws_iam_role_policy" "lambda_s3_read" {
 
   policy = jsonencode({
     Version = "2012-10-17"
-    Statement = [
+    Statement = concat([
       {
         Sid    = "ReadTerraformStateLogs"
         Effect = "Allow"
@@ -47,6 +47,73 @@ resource "aws_iam_role_policy" "lambda_s3_read" {
           "arn:aws:s3:::${local.terraform_state_logs_bucket_name}/*"
         ]
       }
+      ], length(local.additional_source_buckets) == 0 ? [] : [
+      {
+        Sid    = "ReadAdditionalLogSources"
+        Effect = "Allow"
+        Action = [
+          "s3:GetObject",
+          "s3:ListBucket"
+        ]
+        Resource = flatten([
+          for bucket in local.additional_source_buckets : [
+            "arn:aws:s3:::${bucket}",
+            "arn:aws:s3:::${bucket}/*"
+          ]
+        ])
+      }
+      ], var.checkpoint_prefix == "" ? [] : [
+      {
+        Sid    = "WriteProcessedObjectCheckpoints"
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject"
+        ]
+        Resource = [
+          for bucket in setunion([local.terraform_state_logs_bucket_name], local.additional_source_buckets) :
+          "arn:aws:s3:::${bucket}/${var.checkpoint_prefix}*"
+        ]
+      }
+      ], var.enable_backfill ? [
+      {
+        Sid    = "WriteBackfillState"
+        Effect = "Allow"
+        Action = [
+          "s3:PutObject"
+        ]
+        Resource = [
+          for bucket in setunion([local.terraform_state_logs_bucket_name], local.additional_source_buckets) :
+          "arn:aws:s3:::${bucket}/${var.backfill_state_prefix}*"
+        ]
+      }
+    ] : [])
+  })
+}
+
+############################################
+# IAM Policy for Lambda - Backfill continuation
+# The backfill function re-invokes itself to resume a job
+############################################
+resource "aws_iam_role_policy" "lambda_backfill_invoke" {
+  count = var.enable_backfill ? 1 : 0
+
+  name = "BackfillInvokePolicy"
+  role = aws_iam_role.lambda_ocsf_transformer.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "ContinueBackfill"
+        Effect = "Allow"
+        Action = [
+          "lambda:InvokeFunction"
+        ]
+        Resource = [
+          "arn:aws:lambda:${local.region}:${local.security_account_id}:function:${local.backfill_function_name}",
+          "arn:aws:lambda:${local.region}:${local.security_account_id}:function:${local.backfill_function_name}:*"
+        ]
+      }
     ]
   })
 }
@@ -76,7 +143,8 @@ resource "aws_iam_role_policy" "lambda_security_lake_write" {
         Effect = "Allow"
         Action = [
           "s3:PutObject",
-          "s3:PutObjectAcl"
+          "s3:PutObjectAcl",
+          "s3:AbortMultipartUpload"
         ]
         Resource = [
           "arn:aws:s3:::aws-security-data-lake-${local.region}-${local.security_account_id}/*"
@@ -112,7 +180,8 @@ resource "aws_iam_role_policy" "lambda_cloudwatch_logs" {
           "logs:PutLogEvents"
         ]
         Resource = [
-          "arn:aws:logs:${local.region}:${local.security_account_id}:log-group:/aws/lambda/${aws_lambda_function.ocsf_transformer.function_name}:*"
+          "arn:aws:logs:${local.region}:${local.security_account_id}:log-group:/aws/lambda/${aws_lambda_function.ocsf_transformer.function_name}:*",
+          "arn:aws:logs:${local.region}:${local.security_account_id}:log-group:/aws/lambda/${local.backfill_function_name}:*"
         ]
       }
     ]
@@ -0,0 +1,177 @@
+"""
+Application Load Balancer Access Log Parsing
+Tokenizes ALB access log lines into OCSF HTTP Activity
+
+Format reference:
+https://docs.aws.amazon.com/elasticloadbalancing/latest/application/load-balancer-access-logs.html
+"""
+import logging
+import re
+from collections import namedtuple
+from urllib.parse import urlsplit
+
+from log_stream import Iso8601TimestampParser, iter_block_lines, iter_source_blocks
+from ocsf import HttpActivityEventBuilder
+from s3_access_log import to_int
+
+logger = logging.getLogger()
+
+# Leading fields used for OCSF mapping; the remaining (newer) fields are
+# ignored
+ALB_LOG_FIELDS = (
+    'type',
+    'time',
+    'elb',
+    'client',
+    'target',
+    'request_processing_time',
+    'target_processing_time',
+    'response_processing_time',
+    'elb_status_code',
+    'target_status_code',
+    'received_bytes',
+    'sent_bytes',
+    'request',
+    'user_agent',
+    'ssl_cipher',
+    'ssl_protocol',
+    'target_group_arn',
+    'trace_id',
+    'domain_name',
+)
+
+AlbLogRecord = namedtuple('AlbLogRecord', ALB_LOG_FIELDS)
+
+# Source-specific fields carried in the OCSF unmapped object
+ALB_UNMAPPED_FIELDS = (
+    'type',
+    'elb',
+    'target_status_code',
+    'target_group_arn',
+    'trace_id',
+    'ssl_protocol',
+)
+
+_BARE = r'([^ ]*)'
+_QUOTED = r'"((?:[^"\\]+|\\.)*)"'
+
+_FIELD_GRAMMAR = {
+    'request': _QUOTED,
+    'user_agent': _QUOTED,
+    'trace_id': _QUOTED,
+    'domain_name': _QUOTED,
+}
+
+ALB_LOG_PATTERN = re.compile(' '.join(_FIELD_GRAMMAR.get(field, _BARE) for field in ALB_LOG_FIELDS))
+
+
+def parse_alb_log_line(line):
+    """
+    Parse one ALB access log line into an AlbLogRecord ('-' kept as is);
+    returns None for lines that do not match the access log grammar
+    """
+    match = ALB_LOG_PATTERN.match(line)
+    if match is None:
+        return None
+    return AlbLogRecord._make(match.groups())
+
+
+def split_endpoint(value):
+    """'10.0.0.1:443' -> ('10.0.0.1', 443); ('-', None) style values -> (None, None)"""
+    if not value or value == '-':
+        return None, None
+    host, _, port = value.rpartition(':')
+    return (host or value), to_int(port, None)
+
+
+def processing_millis(record):
+    """Total ALB + target + response processing time; -1 entries (no response) are skipped"""
+    total = 0.0
+    for value in (record.request_processing_time, record.target_processing_time,
+                  record.response_processing_time):
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        if seconds > 0:
+            total += seconds
+    return int(total * 1000)
+
+
+def transform_alb_log_to_ocsf(data, bucket, key, shard=None, ocsf_version='1.1.0', stats=None):
+    """
+    Transform ALB access logs to OCSF HTTP Activity (class 4002)
+
+    Same streaming contract as the other source transforms: yields
+    (offset, event) pairs for a StreamingBody, bytes or a shard of either,
+    and adds its line totals to stats (InvocationMetrics) when given.
+    """
+    line_count = 0
+    matched_count = 0
+    event_count = 0
+    error_count = 0
+    builder = HttpActivityEventBuilder(ocsf_version, "Elastic Load Balancing", "ALB Access Logs")
+    timestamps = Iso8601TimestampParser()
+
+    for block_offset, block in iter_source_blocks(data, shard):
+        for line_start, raw_line in iter_block_lines(block):
+            line_count += 1
+            try:
+                record = parse_alb_log_line(raw_line.decode('utf-8'))
+                if record is None:
+                    continue
+                matched_count += 1
+
+                event_time = timestamps.parse(record.time)
+                if event_time is None:
+                    continue
+
+                # "GET https://host:443/path?query HTTP/1.1"
+                method, _, rest = record.request.partition(' ')
+                url, _, http_version = rest.rpartition(' ')
+                parts = urlsplit(url) if url and url != '-' else None
+
+                src_ip, src_port = split_endpoint(record.client)
+                dst_ip, dst_port = split_endpoint(record.target)
+
+                ocsf_event = builder.build(
+                    event_time,
+                    method=method if method != '-' else "",
+                    hostname=parts.hostname if parts else None,
+                    path=parts.path if parts else None,
+                    query=parts.query or None if parts else None,
+                    status=to_int(record.elb_status_code),
+                    src_ip=src_ip,
+                    src_port=src_port,
+                    dst_ip=dst_ip,
+                    dst_port=dst_port,
+                    user_agent=record.user_agent if record.user_agent != '-' else None,
+                    referrer=None,
+                    http_version=http_version if http_version != '-' else None,
+                    bytes_in=to_int(record.received_bytes),
+                    bytes_out=to_int(record.sent_bytes),
+                    duration_ms=processing_millis(record),
+                    unmapped={
+                        "type": record.type,
+                        "elb": record.elb,
+                        "target_status_code": record.target_status_code,
+                        "target_group_arn": record.target_group_arn,
+                        "trace_id": record.trace_id,
+                        "ssl_protocol": record.ssl_protocol,
+                    }
+                )
+
+                event_count += 1
+                yield block_offset + line_start, ocsf_event
+
+            except Exception as e:
+                error_count += 1
+                logger.error(f"Error transforming ALB log line: {str(e)}")
+                continue
+
+    logger.info(f"Scanned {line_count} ALB log entries in {key}, emitted {event_count} OCSF events")
+    if timestamps.errors:
+        logger.warning(f"Skipped {timestamps.errors} ALB log entries with unparseable timestamps in {key}")
+
+    if stats is not None:
+        stats.add_transform(line_count, matched_count, event_count, error_count + timestamps.errors)
@@ -0,0 +1,612 @@
+"""
+Bulk Backfill
+Transforms historical source logs that never raised an S3 notification
+
+Invoked with a job instead of S3 records, either a bucket/prefix with an
+optional date range or an S3 Batch Operations style CSV manifest
+(bucket,key[,version_id], optionally compressed):
+
+    {"job_id": "onboard-prod", "bucket": "workload-account-terraform-state-access-logs",
+     "prefix": "terraform-state/{date}", "start_date": "2026-09-01", "end_date": "2026-10-18"}
+    {"job_id": "replay-1018",
+     "manifest": "s3://workload-account-terraform-state-access-logs/ocsf-backfill/manifests/1018.csv.gz"}
+
+The function's role can only list, read and write backfill state in its
+configured source buckets, so the listed bucket, the manifest and the
+state_bucket must be one of them; other buckets are rejected up front.
+
+A {date} or {date:<strftime>} placeholder in the prefix is expanded to one
+listing per day; otherwise the prefix is listed once per top-level
+"directory" and filtered on LastModified. Listings run in parallel and the
+sorted result is split into deterministic batches of one log source each,
+saved as the job's plan. Batches are transformed RECORD_WORKERS at a time
+with the same source transforms as the notification path, each into
+consolidated output objects named after the job and batch, so a batch
+that is redone overwrites rather than duplicates; its source objects are
+marked processed once that output is written.
+
+Progress is checkpointed under BACKFILL_STATE_PREFIX in the job's bucket.
+When the invocation nears its timeout it stops taking batches, and
+running batches stop taking objects: the slice of a batch transformed so
+far is delivered and marked, and the rest resumes as a slice of its own
+(consolidated separately) from the next object. The invocation then
+saves its state and invokes itself again to resume; invoking the same
+job again resumes it too. Each invocation reports throughput and the
+remaining backlog.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import unquote_plus
+
+import lambda_function
+from checkpoint import MISSING_OBJECT_CODES, ProcessedObjectCheckpoint, source_object_id
+from log_stream import open_log_body
+from metrics import InvocationMetrics
+from s3_output import DeliverySummary
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+# Job plans and progress, per job under <prefix><job_id>/ in the job's bucket
+BACKFILL_STATE_PREFIX = os.environ.get('BACKFILL_STATE_PREFIX', 'ocsf-backfill/')
+
+# A batch is closed at BACKFILL_BATCH_OBJECTS source objects or
+# BACKFILL_BATCH_MB of (stored) source bytes, whichever comes first
+BACKFILL_BATCH_OBJECTS = int(os.environ.get('BACKFILL_BATCH_OBJECTS', '200'))
+BACKFILL_BATCH_MB = int(os.environ.get('BACKFILL_BATCH_MB', '256'))
+
+# No batch or source object is started with less than this left of the
+# invocation, which leaves time for the objects in flight and the final
+# checkpoint
+BACKFILL_RESERVE_SECONDS = int(os.environ.get('BACKFILL_RESERVE_SECONDS', '120'))
+BACKFILL_CHECKPOINT_SECONDS = float(os.environ.get('BACKFILL_CHECKPOINT_SECONDS', '15'))
+
+# Failed batches are retried by later invocations up to this many times
+BACKFILL_MAX_ATTEMPTS = int(os.environ.get('BACKFILL_MAX_ATTEMPTS', '3'))
+
+# Invoke the function again (asynchronously) while batches remain
+BACKFILL_CONTINUE = os.environ.get('BACKFILL_CONTINUE', 'true').lower() == 'true'
+
+DATE_PLACEHOLDER = re.compile(r'\{date(?::([^}]*))?\}')
+JOB_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+# Event fields that define a job's plan; a resumed job must repeat them
+JOB_INPUTS = ('bucket', 'prefix', 'start_date', 'end_date', 'manifest', 'state_bucket')
+
+# Source offsets name output objects; each object of a batch gets its own
+# 1 TiB window of them, so names stay unique across the batch and its slices
+OBJECT_OFFSET_STRIDE = 1 << 40
+
+# One source object of a plan: listed objects carry size and ETag, manifest
+# entries an optional version ID and no size
+BackfillObject = namedtuple('BackfillObject', ('bucket', 'key', 'size', 'version_id', 'etag'))
+
+
+class BackfillJob:
+    """
+    A validated backfill request and where its plan and progress live
+    """
+
+    __slots__ = ('job_id', 'bucket', 'prefix', 'start_date', 'end_date', 'manifest', 'state_bucket')
+
+    def __init__(self, event):
+        self.job_id = event.get('job_id', '')
+        if not JOB_ID.match(self.job_id):
+            raise ValueError(f"job_id must be 1-64 characters of [A-Za-z0-9._-]: {self.job_id!r}")
+
+        self.manifest = event.get('manifest')
+        self.bucket = event.get('bucket')
+        self.prefix = event.get('prefix', '')
+        self.start_date = parse_date(event.get('start_date'))
+        self.end_date = parse_date(event.get('end_date'))
+
+        if self.manifest:
+            manifest_bucket, _ = parse_s3_uri(self.manifest)
+            self.state_bucket = event.get('state_bucket') or manifest_bucket
+        elif self.bucket:
+            self.state_bucket = event.get('state_bucket') or self.bucket
+        else:
+            raise ValueError("A backfill job needs a bucket (with optional prefix and dates) or a manifest")
+
+        # Anywhere else is AccessDenied halfway through the job
+        allowed = configured_buckets()
+        for bucket in (self.bucket, manifest_bucket if self.manifest else None, self.state_bucket):
+            if bucket and bucket not in allowed:
+                raise ValueError(
+                    f"Bucket {bucket} is not a configured source bucket; backfill jobs can only "
+                    f"list, read manifests and keep state in: {', '.join(sorted(allowed))}"
+                )
+
+        if DATE_PLACEHOLDER.search(self.prefix) and not (self.start_date and self.end_date):
+            raise ValueError("A {date} prefix needs start_date and end_date")
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ValueError(f"start_date {self.start_date} is after end_date {self.end_date}")
+
+    @property
+    def state_prefix(self):
+        return f"{BACKFILL_STATE_PREFIX}{self.job_id}/"
+
+    def describe(self):
+        if self.manifest:
+            return self.manifest
+        dates = f" {self.start_date or '...'}..{self.end_date or '...'}" if self.start_date or self.end_date else ''
+        return f"s3://{self.bucket}/{self.prefix}{dates}"
+
+
+def configured_buckets():
+    """The source buckets the function's role can read and keep backfill state in"""
+    buckets = {lambda_function.TERRAFORM_STATE_LOGS_BUCKET}
+    for config in lambda_function.LOG_SOURCES.values():
+        buckets.update(config.get('buckets', []))
+    return buckets
+
+
+def parse_date(value):
+    """YYYY-MM-DD (or None) as a date"""
+    return date.fromisoformat(value) if value else None
+
+
+def parse_s3_uri(uri):
+    """s3://bucket/key -> (bucket, key)"""
+    if not uri.startswith('s3://') or '/' not in uri[5:]:
+        raise ValueError(f"Not an s3://bucket/key URI: {uri}")
+    bucket, key = uri[5:].split('/', 1)
+    return bucket, key
+
+
+def is_internal_key(key):
+    """Checkpoint markers and backfill state can share a bucket with routed sources"""
+    if lambda_function.CHECKPOINT_PREFIX and key.startswith(lambda_function.CHECKPOINT_PREFIX):
+        return True
+    return key.startswith(BACKFILL_STATE_PREFIX)
+
+
+def list_inputs(s3, job, pool):
+    """
+    Every source object of a bucket/prefix job, listed in parallel on pool:
+    one listing per day of a {date} prefix, else one per top-level prefix
+    """
+    match = DATE_PLACEHOLDER.search(job.prefix)
+    if match:
+        # Keys are dated by name; LastModified trails the date by the delivery delay
+        date_format = match.group(1) or '%Y-%m-%d'
+        days = (job.end_date - job.start_date).days + 1
+        prefixes = sorted({
+            job.prefix[:match.start()] + (job.start_date + timedelta(days=n)).strftime(date_format)
+            + job.prefix[match.end():]
+            for n in range(days)
+        })
+        since = until = None
+        loose = []
+    else:
+        since = datetime.combine(job.start_date, datetime.min.time(), timezone.utc) if job.start_date else None
+        until = datetime.combine(job.end_date + timedelta(days=1), datetime.min.time(), timezone.utc) if job.end_date else None
+        loose, prefixes = list_top_level(s3, job.bucket, job.prefix)
+        loose = [obj for obj in loose if in_window(obj, since, until)]
+
+    listed = pool.map(lambda prefix: list_prefix(s3, job.bucket, prefix, since, until), prefixes)
+    contents = loose + [obj for objects in listed for obj in objects]
+    return [
+        BackfillObject(job.bucket, obj['Key'], obj['Size'], None, obj['ETag'].strip('"'))
+        for obj in contents
+    ]
+
+
+def list_top_level(s3, bucket, prefix):
+    """Objects directly under prefix and the common prefixes below it"""
+    objects = []
+    prefixes = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, Delimiter='/'):
+        objects.extend(page.get('Contents', []))
+        prefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+    return objects, prefixes
+
+
+def list_prefix(s3, bucket, prefix, since, until):
+    """Every object under prefix last modified in [since, until), all pages"""
+    objects = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        objects.extend(obj for obj in page.get('Contents', []) if in_window(obj, since, until))
+    return objects
+
+
+def in_window(obj, since, until):
+    if since is not None and obj['LastModified'] < since:
+        return False
+    return until is None or obj['LastModified'] < until
+
+
+def read_manifest(s3, uri):
+    """
+    Source objects of a CSV manifest: bucket,key[,version_id] per row with
+    URL-encoded keys, as S3 Batch Operations manifests are written
+    """
+    bucket, key = parse_s3_uri(uri)
+    response = s3.get_object(Bucket=bucket, Key=key)
+    body, _ = open_log_body(response['Body'], response.get('ContentEncoding'))
+    try:
+        text = body.read().decode('utf-8-sig')
+    finally:
+        body.close()
+
+    objects = []
+    for row in csv.reader(io.StringIO(text)):
+        if len(row) < 2 or not row[1]:
+            continue
+        version_id = row[2] if len(row) > 2 and row[2] else None
+        objects.append(BackfillObject(row[0], unquote_plus(row[1]), None, version_id, None))
+    return objects
+
+
+def plan_batches(objects):
+    """
+    Route, sort and group source objects into batches of one log source:
+    [{'source': name, 'objects': [BackfillObject fields, ...]}]
+    Returns (batches, skipped object count)
+    """
+    routed = []
+    skipped = 0
+    for obj in set(objects):
+        source = None if is_internal_key(obj.key) else lambda_function.SOURCES.route(obj.bucket, obj.key)
+        if source is None:
+            skipped += 1
+            continue
+        routed.append((source.name, obj.bucket, obj.key, obj.version_id or '', obj))
+    routed.sort(key=lambda r: r[:4])
+
+    max_bytes = BACKFILL_BATCH_MB * 1024 * 1024
+    batches = []
+    batch_bytes = 0
+    for name, _, _, _, obj in routed:
+        if (
+            not batches
+            or batches[-1]['source'] != name
+            or len(batches[-1]['objects']) >= BACKFILL_BATCH_OBJECTS
+            or batch_bytes >= max_bytes
+        ):
+            batches.append({'source': name, 'objects': []})
+            batch_bytes = 0
+        batches[-1]['objects'].append(list(obj))
+        batch_bytes += obj.size or 0
+    return batches, skipped
+
+
+class BackfillState:
+    """
+    A job's plan (written once) and progress (rewritten as batches
+    complete) as objects under the job's state prefix
+    """
+
+    def __init__(self, s3, job):
+        self.s3 = s3
+        self.bucket = job.state_bucket
+        self.plan_key = f"{job.state_prefix}plan.json.gz"
+        self.progress_key = f"{job.state_prefix}progress.json"
+
+    def _get(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.s3.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in MISSING_OBJECT_CODES:
+                return None
+            raise
+
+    def load_plan(self):
+        data = self._get(self.plan_key)
+        return json.loads(gzip.decompress(data)) if data is not None else None
+
+    def save_plan(self, plan):
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self.plan_key,
+            Body=gzip.compress(json.dumps(plan, separators=(',', ':')).encode('utf-8')),
+            ContentType='application/json',
+            ContentEncoding='gzip'
+        )
+
+    def load_progress(self):
+        data = self._get(self.progress_key)
+        if data is None:
+            return {
+                'done': [], 'next_object': {}, 'attempts': {}, 'objects': 0, 'skipped': 0, 'bytes': 0,
+                'events': 0, 'objects_written': 0, 'bytes_written': 0, 'seconds': 0.0, 'invocations': 0,
+            }
+        return json.loads(data)
+
+    def save_progress(self, progress):
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=self.progress_key,
+            Body=json.dumps(progress).encode('utf-8'),
+            ContentType='application/json'
+        )
+
+
+def transform_batch(job, index, batch, destination, start, remaining_seconds):
+    """
+    Transform a batch, from its object at position start, into consolidated
+    output objects and mark its source objects processed once they are
+    written. Objects already marked (e.g. by the notification path) are
+    skipped. Stops taking objects once less than BACKFILL_RESERVE_SECONDS
+    remain; the slice transformed so far is still delivered and marked, and
+    the rest of the batch resumes from the returned position as a slice of
+    its own.
+    Returns (DeliverySummary, objects transformed, objects skipped, bytes in,
+    position of the next object); raises on any failure, after aborting
+    the slice's pending uploads.
+    """
+    s3 = lambda_function.get_s3()
+    source = lambda_function.SOURCES.get(batch['source'])
+    batch_id = source_object_id(job.state_bucket, f"{job.state_prefix}batch-{index}", job.job_id)
+
+    writer = None
+    transformed = []
+    skipped = 0
+    bytes_in = 0
+    position = start
+    try:
+        while position < len(batch['objects']):
+            if remaining_seconds() < BACKFILL_RESERVE_SECONDS:
+                break
+            obj = BackfillObject(*batch['objects'][position])
+            base = position * OBJECT_OFFSET_STRIDE
+            position += 1
+            get_kwargs = {'VersionId': obj.version_id} if obj.version_id else {}
+            if obj.etag:
+                get_kwargs['IfMatch'] = obj.etag
+
+            version = obj.version_id or obj.etag
+            object_id = source_object_id(obj.bucket, obj.key, version) if version else None
+            if object_id and lambda_function.already_processed(obj.bucket, obj.key, object_id):
+                skipped += 1
+                continue
+
+            response = s3.get_object(Bucket=obj.bucket, Key=obj.key, **get_kwargs)
+            if object_id is None:
+                object_id = source_object_id(obj.bucket, obj.key, response.get('VersionId') or response['ETag'])
+                if lambda_function.already_processed(obj.bucket, obj.key, object_id):
+                    response['Body'].close()
+                    skipped += 1
+                    continue
+
+            bytes_in += response['ContentLength']
+            body, compression = open_log_body(response['Body'], response.get('ContentEncoding'))
+            if compression:
+                lambda_function.invocation_metrics.add('CompressedObjects', 1)
+
+            if writer is None:
+                # Dated by the slice's first object, like a single object's output
+                writer = lambda_function.open_writer(source, destination, batch_id, response['LastModified'])
+
+            for offset, ocsf_event in source.transform(body, obj.bucket, obj.key, stats=lambda_function.invocation_metrics):
+                writer.write(ocsf_event, base + offset)
+            body.close()
+            transformed.append((obj, object_id))
+
+        if writer is not None:
+            writer.close()
+    except Exception:
+        if writer is not None:
+            writer.abort()
+        raise
+
+    delivered = DeliverySummary([writer] if writer is not None else [])
+    if lambda_function.CHECKPOINT_PREFIX:
+        checkpoint = ProcessedObjectCheckpoint(s3, lambda_function.CHECKPOINT_PREFIX)
+        manifest = {'backfill_job': job.job_id, 'batch': index, 'objects': delivered.keys_written}
+        for obj, object_id in transformed:
+            checkpoint.mark_processed(obj.bucket, object_id, obj.key, manifest)
+
+    return delivered, len(transformed), skipped, bytes_in, position
+
+
+def continue_job(event, context):
+    """Invoke this function again, asynchronously, with the same job"""
+    from botocore.session import get_session
+
+    client = get_session().create_client('lambda')
+    client.invoke(
+        FunctionName=context.invoked_function_arn,
+        InvocationType='Event',
+        Payload=json.dumps(event).encode('utf-8')
+    )
+
+
+def lambda_handler(event, context):
+    """
+    Run (or resume) a backfill job until it completes or the invocation
+    nears its timeout; returns the job's progress report
+    """
+    lambda_function.invocation_metrics = metrics = InvocationMetrics()
+    started = time.perf_counter()
+
+    job = BackfillJob(event)
+    s3 = lambda_function.get_s3()
+    destination = lambda_function.security_lake_destination(context)
+    state = BackfillState(s3, job)
+
+    def remaining_seconds():
+        return context.get_remaining_time_in_millis() / 1000
+
+    with ThreadPoolExecutor(max_workers=lambda_function.RECORD_WORKERS) as pool:
+        plan = state.load_plan()
+        if plan is None:
+            listing_started = time.perf_counter()
+            if job.manifest:
+                objects = read_manifest(s3, job.manifest)
+            else:
+                objects = list_inputs(s3, job, pool)
+            batches, unrouted = plan_batches(objects)
+            plan = {
+                'job': event,
+                'batches': batches,
+                'objects': sum(len(b['objects']) for b in batches),
+                'bytes': sum(o[2] or 0 for b in batches for o in b['objects']),
+                'unrouted': unrouted,
+                'listing_seconds': round(time.perf_counter() - listing_started, 1),
+            }
+            state.save_plan(plan)
+            logger.info(
+                f"Planned backfill {job.job_id} of {job.describe()}: {plan['objects']} objects "
+                f"({plan['bytes']} bytes) in {len(batches)} batches, {unrouted} unrouted, "
+                f"listed in {plan['listing_seconds']} s"
+            )
+
+        elif {k: v for k, v in plan['job'].items() if k in JOB_INPUTS} != {k: v for k, v in event.items() if k in JOB_INPUTS}:
+            raise ValueError(f"Backfill {job.job_id} was planned for other inputs: {json.dumps(plan['job'])}")
+
+        progress = state.load_progress()
+        progress['invocations'] += 1
+        done = set(progress['done'])
+        next_object = progress.setdefault('next_object', {})
+        attempts = progress['attempts']
+        batches = plan['batches']
+        pending = [
+            i for i in range(len(batches))
+            if i not in done and attempts.get(str(i), 0) < BACKFILL_MAX_ATTEMPTS
+        ]
+        logger.info(f"Backfill {job.job_id}: {len(done)} of {len(batches)} batches done, {len(pending)} to run")
+
+        # Batches run concurrently but progress is only updated here, on completion
+        completed = {'batches': 0, 'objects': 0, 'bytes': 0, 'events': 0}
+        running = {}
+        last_saved = time.perf_counter()
+        queue = iter(pending)
+        exhausted = False
+
+        while True:
+            while not exhausted and len(running) < lambda_function.RECORD_WORKERS:
+                if remaining_seconds() < BACKFILL_RESERVE_SECONDS:
+                    logger.info(f"Stopping backfill {job.job_id} with {remaining_seconds():.0f} s left")
+                    exhausted = True
+                    break
+                index = next(queue, None)
+                if index is None:
+                    exhausted = True
+                    break
+                running[pool.submit(
+                    transform_batch, job, index, batches[index], destination,
+                    next_object.get(str(index), 0), remaining_seconds
+                )] = index
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = running.pop(future)
+                try:
+                    delivered, transformed, skipped, bytes_in, position = future.result()
+                except Exception as e:
+                    attempts[str(index)] = attempts.get(str(index), 0) + 1
+                    logger.error(
+                        f"Backfill {job.job_id} batch {index} failed "
+                        f"(attempt {attempts[str(index)]} of {BACKFILL_MAX_ATTEMPTS}): {str(e)}",
+                        exc_info=True
+                    )
+                    continue
+
+                if position < len(batches[index]['objects']):
+                    next_object[str(index)] = position
+                else:
+                    done.add(index)
+                    next_object.pop(str(index), None)
+                    completed['batches'] += 1
+                progress['objects'] += transformed
+                progress['skipped'] += skipped
+                progress['bytes'] += bytes_in
+                progress['events'] += delivered.events_written
+                progress['objects_written'] += delivered.objects_written
+                progress['bytes_written'] += delivered.bytes_written
+                completed['objects'] += transformed + skipped
+                completed['bytes'] += bytes_in
+                completed['events'] += delivered.events_written
+                metrics.add('Records', transformed)
+                metrics.add('BytesIn', bytes_in)
+                metrics.add('ObjectsWritten', delivered.objects_written)
+                metrics.add('BytesOut', delivered.bytes_written)
+
+            if time.perf_counter() - last_saved >= BACKFILL_CHECKPOINT_SECONDS:
+                progress['done'] = sorted(done)
+                state.save_progress(progress)
+                last_saved = time.perf_counter()
+
+    elapsed = time.perf_counter() - started
+    progress['done'] = sorted(done)
+    progress['seconds'] = round(progress['seconds'] + elapsed, 1)
+    state.save_progress(progress)
+
+    report = backfill_report(job, plan, progress, completed, elapsed)
+    logger.info(f"Backfill progress: {json.dumps(report)}")
+
+    if lambda_function.METRICS_NAMESPACE:
+        metrics.emit(lambda_function.METRICS_NAMESPACE, {'FunctionName': context.function_name})
+
+    # Continue only while this invocation got somewhere, so failing batches cannot loop
+    if report['status'] == 'in_progress' and BACKFILL_CONTINUE and event.get('continue', True):
+        if completed['objects']:
+            continue_job(event, context)
+            logger.info(f"Continuing backfill {job.job_id} in a new invocation")
+        else:
+            logger.warning(f"Backfill {job.job_id} made no progress, not continuing")
+
+    return report
+
+
+def backfill_report(job, plan, progress, completed, elapsed):
+    """Progress, this invocation's throughput and the remaining backlog of a job"""
+    batches = plan['batches']
+    done = set(progress['done'])
+    failed = [
+        i for i in range(len(batches))
+        if i not in done and progress['attempts'].get(str(i), 0) >= BACKFILL_MAX_ATTEMPTS
+    ]
+    remaining = [i for i in range(len(batches)) if i not in done and i not in failed]
+    # Unfinished batches resume at their next object
+    backlog = [o for i in remaining for o in batches[i]['objects'][progress['next_object'].get(str(i), 0):]]
+    backlog_objects = len(backlog)
+    backlog_bytes = sum(o[2] or 0 for o in backlog)
+    bytes_per_second = completed['bytes'] / elapsed if elapsed else 0
+
+    if remaining:
+        status = 'in_progress'
+    else:
+        status = 'failed' if failed else 'complete'
+
+    return {
+        'job_id': job.job_id,
+        'status': status,
+        'batches': len(batches),
+        'batches_done': len(done),
+        'batches_failed': failed,
+        'objects': plan['objects'],
+        'objects_done': progress['objects'] + progress['skipped'],
+        'objects_already_processed': progress['skipped'],
+        'events': progress['events'],
+        'objects_written': progress['objects_written'],
+        'backlog_objects': backlog_objects,
+        'backlog_mb': round(backlog_bytes / 1048576, 1),
+        'seconds': round(elapsed, 1),
+        'total_seconds': progress['seconds'],
+        'objects_per_sec': round(completed['objects'] / elapsed, 1) if elapsed else 0,
+        'mb_per_sec': round(bytes_per_second / 1048576, 2),
+        'events_per_sec': round(completed['events'] / elapsed, 1) if elapsed else 0,
+        # Manifest plans carry no sizes; their ETA is by object count
+        'eta_seconds': (
+            round(backlog_bytes / bytes_per_second) if backlog_bytes and bytes_per_second
+            else round(backlog_objects * elapsed / completed['objects']) if completed['objects'] and backlog_objects
+            else None
+        ),
+    }
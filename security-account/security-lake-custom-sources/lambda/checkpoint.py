@@ -0,0 +1,64 @@
+"""
+Idempotent Delivery Helpers
+Deterministic source object identity and a processed-object checkpoint
+
+Output keys are derived from the source object (bucket, key and
+version/ETag) instead of the invocation, so an S3 event redelivery or a
+Lambda retry overwrites the same Security Lake objects rather than adding
+duplicates. A small marker object per source object lets retries skip
+inputs that were already delivered without re-reading them.
+"""
+import hashlib
+import json
+import logging
+
+logger = logging.getLogger()
+
+# HEAD on a missing key reports the HTTP status rather than NoSuchKey
+MISSING_OBJECT_CODES = ('404', 'NoSuchKey', 'NotFound')
+
+
+def source_object_id(bucket, key, version):
+    """
+    Stable identifier for one immutable source object
+
+    version is the S3 version ID when the bucket is versioned, otherwise
+    the ETag, so a re-uploaded object gets a new identity.
+    """
+    version = (version or '').strip('"')
+    return hashlib.sha256(f"{bucket}/{key}@{version}".encode('utf-8')).hexdigest()[:32]
+
+
+class ProcessedObjectCheckpoint:
+    """
+    Marker objects under prefix in the source bucket, one per transformed
+    source object, written only after its output has been fully delivered
+    """
+
+    def __init__(self, s3, prefix):
+        self.s3 = s3
+        self.prefix = prefix
+
+    def marker_key(self, object_id):
+        return f"{self.prefix}{object_id}.json"
+
+    def is_processed(self, bucket, object_id):
+        """True when a marker exists; read failures fall back to reprocessing"""
+        from botocore.exceptions import ClientError
+
+        try:
+            self.s3.head_object(Bucket=bucket, Key=self.marker_key(object_id))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') not in MISSING_OBJECT_CODES:
+                logger.warning(f"Checkpoint lookup failed for {object_id}, reprocessing: {str(e)}")
+            return False
+
+    def mark_processed(self, bucket, object_id, source_key, manifest):
+        """Record that source_key was delivered, with its output manifest"""
+        self.s3.put_object(
+            Bucket=bucket,
+            Key=self.marker_key(object_id),
+            Body=json.dumps({'source_key': source_key, **manifest}).encode('utf-8'),
+            ContentType='application/json'
+        )
@@ -0,0 +1,169 @@
+"""
+CloudFront Standard Log Parsing
+Tokenizes CloudFront standard (access) log lines into OCSF HTTP Activity
+
+Format reference:
+https://docs.aws.amazon.com/AmazonCloudFront/latest/DeveloperGuide/standard-logs-reference.html
+"""
+import logging
+from collections import namedtuple
+from urllib.parse import unquote
+
+from log_stream import Iso8601TimestampParser, iter_block_lines, iter_source_blocks
+from ocsf import HttpActivityEventBuilder
+from s3_access_log import to_int
+
+logger = logging.getLogger()
+
+# Tab-separated field order; later fields were added over time and are
+# None on older log lines
+CLOUDFRONT_LOG_FIELDS = (
+    'date',
+    'time',
+    'x_edge_location',
+    'sc_bytes',
+    'c_ip',
+    'cs_method',
+    'cs_host',
+    'cs_uri_stem',
+    'sc_status',
+    'cs_referer',
+    'cs_user_agent',
+    'cs_uri_query',
+    'cs_cookie',
+    'x_edge_result_type',
+    'x_edge_request_id',
+    'x_host_header',
+    'cs_protocol',
+    'cs_bytes',
+    'time_taken',
+    'x_forwarded_for',
+    'ssl_protocol',
+    'ssl_cipher',
+    'x_edge_response_result_type',
+    'cs_protocol_version',
+    'fle_status',
+    'fle_encrypted_fields',
+    'c_port',
+    'time_to_first_byte',
+    'x_edge_detailed_result_type',
+    'sc_content_type',
+    'sc_content_len',
+    'sc_range_start',
+    'sc_range_end',
+)
+
+# Lines shorter than this (through time_taken) are not usable
+CLOUDFRONT_LOG_MIN_FIELDS = CLOUDFRONT_LOG_FIELDS.index('time_taken') + 1
+
+CloudFrontLogRecord = namedtuple(
+    'CloudFrontLogRecord',
+    CLOUDFRONT_LOG_FIELDS,
+    defaults=(None,) * (len(CLOUDFRONT_LOG_FIELDS) - CLOUDFRONT_LOG_MIN_FIELDS)
+)
+
+_FIELD_COUNT = len(CLOUDFRONT_LOG_FIELDS)
+
+# Source-specific fields carried in the OCSF unmapped object
+CLOUDFRONT_UNMAPPED_FIELDS = (
+    'edge_location',
+    'edge_request_id',
+    'edge_result_type',
+    'protocol',
+    'x_forwarded_for',
+)
+
+
+def parse_cloudfront_log_line(line):
+    """
+    Parse one CloudFront log line into a CloudFrontLogRecord
+
+    '-' placeholders become None and fields beyond the known set are
+    ignored. Returns None for '#Version' / '#Fields' headers and short lines.
+    """
+    if line.startswith('#'):
+        return None
+
+    values = line.split('\t', _FIELD_COUNT)[:_FIELD_COUNT]
+    if len(values) < CLOUDFRONT_LOG_MIN_FIELDS:
+        return None
+
+    return CloudFrontLogRecord._make([None if v == '-' else v for v in values])
+
+
+def seconds_to_millis(value):
+    """'0.123' (seconds) -> 123; None for '-' / garbage"""
+    try:
+        return int(float(value) * 1000)
+    except (TypeError, ValueError):
+        return None
+
+
+def transform_cloudfront_log_to_ocsf(data, bucket, key, shard=None, ocsf_version='1.1.0', stats=None):
+    """
+    Transform CloudFront standard logs to OCSF HTTP Activity (class 4002)
+
+    Same streaming contract as the other source transforms: yields
+    (offset, event) pairs for a StreamingBody, bytes or a shard of either,
+    and adds its line totals to stats (InvocationMetrics) when given.
+    """
+    line_count = 0
+    matched_count = 0
+    event_count = 0
+    error_count = 0
+    builder = HttpActivityEventBuilder(ocsf_version, "Amazon CloudFront", "CloudFront Access Logs")
+    timestamps = Iso8601TimestampParser()
+
+    for block_offset, block in iter_source_blocks(data, shard):
+        for line_start, raw_line in iter_block_lines(block):
+            line_count += 1
+            try:
+                record = parse_cloudfront_log_line(raw_line.decode('utf-8'))
+                if record is None:
+                    continue
+                matched_count += 1
+
+                event_time = timestamps.parse(f"{record.date}T{record.time}Z")
+                if event_time is None:
+                    continue
+
+                ocsf_event = builder.build(
+                    event_time,
+                    method=record.cs_method or "",
+                    hostname=record.x_host_header or record.cs_host,
+                    path=record.cs_uri_stem,
+                    query=record.cs_uri_query,
+                    status=to_int(record.sc_status),
+                    src_ip=record.c_ip,
+                    src_port=to_int(record.c_port, None),
+                    dst_ip=None,
+                    dst_port=None,
+                    user_agent=unquote(record.cs_user_agent) if record.cs_user_agent else None,
+                    referrer=record.cs_referer,
+                    http_version=record.cs_protocol_version,
+                    bytes_in=to_int(record.cs_bytes),
+                    bytes_out=to_int(record.sc_bytes),
+                    duration_ms=seconds_to_millis(record.time_taken),
+                    unmapped={
+                        "edge_location": record.x_edge_location or "",
+                        "edge_request_id": record.x_edge_request_id or "",
+                        "edge_result_type": record.x_edge_result_type or "",
+                        "protocol": record.cs_protocol or "",
+                        "x_forwarded_for": record.x_forwarded_for or "",
+                    }
+                )
+
+                event_count += 1
+                yield block_offset + line_start, ocsf_event
+
+            except Exception as e:
+                error_count += 1
+                logger.error(f"Error transforming CloudFront log line: {str(e)}")
+                continue
+
+    logger.info(f"Scanned {line_count} CloudFront log entries in {key}, emitted {event_count} OCSF events")
+    if timestamps.errors:
+        logger.warning(f"Skipped {timestamps.errors} CloudFront log entries with unparseable timestamps in {key}")
+
+    if stats is not None:
+        stats.add_transform(line_count, matched_count, event_count, error_count + timestamps.errors)
@@ -0,0 +1,74 @@
+"""
+Kubernetes Audit Log Parsing
+Decodes Kubernetes audit events (audit.k8s.io/v1 JSON lines) into OCSF API Activity
+
+Accepts kube-apiserver audit log files and CloudWatch Logs exports of EKS
+control plane audit logs, whose lines carry a leading timestamp.
+"""
+import json
+import logging
+
+from log_stream import Iso8601TimestampParser, iter_block_lines, iter_source_blocks
+from ocsf import KubernetesApiActivityEventBuilder
+
+try:
+    import orjson
+except ImportError:  # Optional fast decoder, falls back to stdlib json
+    orjson = None
+
+logger = logging.getLogger()
+
+decode_audit_event = orjson.loads if orjson is not None else json.loads
+
+# RequestReceived duplicates ResponseComplete for the same request; only
+# final stages become events
+EMITTED_STAGES = frozenset(('ResponseComplete', 'Panic'))
+
+
+def transform_k8s_audit_log_to_ocsf(data, bucket, key, shard=None, ocsf_version='1.1.0', stats=None):
+    """
+    Transform Kubernetes audit logs to OCSF API Activity (class 3005)
+
+    Same streaming contract as the other source transforms: yields
+    (offset, event) pairs for a StreamingBody, bytes or a shard of either,
+    and adds its line totals to stats (InvocationMetrics) when given.
+    """
+    line_count = 0
+    matched_count = 0
+    event_count = 0
+    error_count = 0
+    builder = KubernetesApiActivityEventBuilder(ocsf_version)
+    timestamps = Iso8601TimestampParser()
+
+    for block_offset, block in iter_source_blocks(data, shard):
+        for line_start, raw_line in iter_block_lines(block):
+            line_count += 1
+            try:
+                # CloudWatch Logs exports prefix each line with a timestamp
+                brace = raw_line.find(b'{')
+                if brace == -1:
+                    continue
+                audit = decode_audit_event(raw_line[brace:])
+
+                if audit.get('stage') not in EMITTED_STAGES:
+                    continue
+                matched_count += 1
+
+                event_time = timestamps.parse(audit.get('stageTimestamp') or audit.get('requestReceivedTimestamp'))
+                if event_time is None:
+                    continue
+
+                event_count += 1
+                yield block_offset + line_start, builder.build(audit, event_time)
+
+            except Exception as e:
+                error_count += 1
+                logger.error(f"Error transforming Kubernetes audit log line: {str(e)}")
+                continue
+
+    logger.info(f"Scanned {line_count} Kubernetes audit log entries in {key}, emitted {event_count} OCSF events")
+    if timestamps.errors:
+        logger.warning(f"Skipped {timestamps.errors} Kubernetes audit entries with unparseable timestamps in {key}")
+
+    if stats is not None:
+        stats.add_transform(line_count, matched_count, event_count, error_count + timestamps.errors)
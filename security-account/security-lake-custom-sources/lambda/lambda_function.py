@@ -1,84 +1,192 @@
 """
 Security Lake OCSF Transformer
-Transforms Terraform State Access Logs to OCSF format
+Transforms Terraform State Access Logs (and optional CloudFront, ALB and
+Kubernetes audit logs) to OCSF format
 
 NOTE: VPC Flow Logs are handled NATIVELY by AWS Security Lake.
-      This Lambda only transforms custom logs (Terraform State Access).
+      This Lambda only transforms custom logs, routed by a source registry.
 """
+import time
+
+# Cold start timing, logged by the first invocation of each container
+IMPORT_STARTED = time.perf_counter()
+
 import json
 import os
-import boto3
-from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from urllib.parse import unquote_plus
 import logging
 
+from alb_log import ALB_UNMAPPED_FIELDS, transform_alb_log_to_ocsf
+from checkpoint import ProcessedObjectCheckpoint, source_object_id
+from cloudfront_log import CLOUDFRONT_UNMAPPED_FIELDS, transform_cloudfront_log_to_ocsf
+from k8s_audit_log import transform_k8s_audit_log_to_ocsf
+from log_stream import MAX_LINE_BYTES, BoundedRangeStream, iter_source_blocks, open_log_body
+from metrics import InvocationMetrics, instrument_s3_client
+from ocsf import S3ApiActivityEventBuilder
+from parquet_writer import (
+    OcsfParquetWriter,
+    ocsf_api_activity_schema,
+    ocsf_http_activity_schema,
+    ocsf_kubernetes_api_activity_schema,
+)
+from s3_access_log import S3LogTimestampParser, TerraformStateLineFilter, parse_s3_access_log_line, to_int
+from s3_output import DeliverySummary, JsonBatchWriter, delivery_metrics
+from sources import ANY_BUCKET, LogSource, SourceRegistry
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-# AWS clients
-s3 = boto3.client('s3')
-
 # Environment variables
 OCSF_VERSION = os.environ.get('OCSF_VERSION', '1.1.0')
 TERRAFORM_STATE_LOGS_BUCKET = os.environ['TERRAFORM_STATE_LOGS_BUCKET']
 SECURITY_LAKE_CUSTOM_SOURCE_ARN_TERRAFORM = os.environ['SECURITY_LAKE_CUSTOM_SOURCE_ARN_TERRAFORM']
+SECURITY_LAKE_CUSTOM_SOURCE_NAME_TERRAFORM = os.environ.get('SECURITY_LAKE_CUSTOM_SOURCE_NAME_TERRAFORM', 'TerraformStateAccess')
 
+# Output settings: 'json' (default) or 'parquet' (requires pyarrow layer)
+OUTPUT_FORMAT = os.environ.get('OUTPUT_FORMAT', 'json').lower()
+PARQUET_COMPRESSION = os.environ.get('PARQUET_COMPRESSION', 'zstd').lower()
 
-def lambda_handler(event, context):
+# Flush policy: an output object is closed at BATCH_MAX_MB or BATCH_MAX_EVENTS
+# (0 = no event limit), and always at the end of its source object
+BATCH_MAX_MB = int(os.environ.get('BATCH_MAX_MB', '64'))
+BATCH_MAX_EVENTS = int(os.environ.get('BATCH_MAX_EVENTS', '0'))
+MULTIPART_PART_SIZE_MB = int(os.environ.get('MULTIPART_PART_SIZE_MB', '16'))
+
+# Terraform state line selection (comma separated): key substrings, state
+# bucket names and key prefixes; also used as the pre-parse byte filter
+TERRAFORM_STATE_KEY_MARKERS = os.environ.get('TERRAFORM_STATE_KEY_MARKERS', 'terraform,.tfstate')
+TERRAFORM_STATE_BUCKETS = os.environ.get('TERRAFORM_STATE_BUCKETS', '')
+TERRAFORM_STATE_KEY_PREFIXES = os.environ.get('TERRAFORM_STATE_KEY_PREFIXES', '')
+
+TERRAFORM_LINE_FILTER = TerraformStateLineFilter(
+    markers=[v.strip() for v in TERRAFORM_STATE_KEY_MARKERS.split(',')],
+    buckets=[v.strip() for v in TERRAFORM_STATE_BUCKETS.split(',')],
+    key_prefixes=[v.strip() for v in TERRAFORM_STATE_KEY_PREFIXES.split(',')]
+)
+
+# Additional sources routed by this Lambda (JSON), e.g.
+# {"cloudfront": {"buckets": ["cdn-logs"], "prefixes": ["cf/"], "custom_source_name": "CloudFrontAccess"}}
+LOG_SOURCES = json.loads(os.environ.get('LOG_SOURCES') or '{}')
+
+# Processed-object checkpoint markers in the source bucket ('' = disabled)
+CHECKPOINT_PREFIX = os.environ.get('CHECKPOINT_PREFIX', 'ocsf-checkpoints/')
+
+# Concurrency: S3 records processed in parallel per invocation
+RECORD_WORKERS = max(1, int(os.environ.get('RECORD_WORKERS', '4')))
+
+# Sharding: objects of at least SHARD_MIN_MB are split into line-aligned byte
+# ranges transformed by SHARD_WORKERS processes (1 = disabled)
+SHARD_WORKERS = max(1, int(os.environ.get('SHARD_WORKERS', '1')))
+SHARD_MIN_MB = int(os.environ.get('SHARD_MIN_MB', '64'))
+
+# S3 client tuning: fail fast on connect, retry throttling with backoff
+S3_CONNECT_TIMEOUT = float(os.environ.get('S3_CONNECT_TIMEOUT', '2'))
+S3_READ_TIMEOUT = float(os.environ.get('S3_READ_TIMEOUT', '30'))
+S3_MAX_ATTEMPTS = int(os.environ.get('S3_MAX_ATTEMPTS', '5'))
+
+# CloudWatch namespace of the per-invocation EMF metrics ('' = disabled)
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'SecurityLake/OCSFTransformer')
+
+
+def new_s3_client():
     """
-    Main Lambda handler for OCSF transformation
-    Only processes Terraform State Access Logs
+    S3 client from a plain botocore session (boto3 is never imported);
+    botocore is loaded here, on first use, not during container init
     """
-    logger.info(f"Processing {len(event['Records'])} S3 events")
+    from botocore.config import Config
+    from botocore.session import get_session
 
-    for record in event['Records']:
-        try:
-            bucket = record['s3']['bucket']['name']
-            key = unquote_plus(record['s3']['object']['key'])
+    client = get_session().create_client('s3', config=Config(
+        # Shared by all record workers; each needs a GET and an upload connection
+        max_pool_connections=max(10, RECORD_WORKERS * 2),
+        connect_timeout=S3_CONNECT_TIMEOUT,
+        read_timeout=S3_READ_TIMEOUT,
+        retries={'max_attempts': S3_MAX_ATTEMPTS, 'mode': 'standard'},
+        tcp_keepalive=True
+    ))
+    instrument_s3_client(client, lambda: invocation_metrics)
+    return client
 
-            logger.info(f"Processing: s3://{bucket}/{key}")
 
-            # Download S3 object
-            response = s3.get_object(Bucket=bucket, Key=key)
-            data = response['Body'].read()
+# AWS clients, created on first use and reused for the life of the container
+_s3 = None
+_s3_lock = threading.Lock()
 
-            # Transform Terraform State Access Logs
-            if bucket == TERRAFORM_STATE_LOGS_BUCKET or 'terraform-state' in key:
-                ocsf_events = transform_s3_access_log_to_ocsf(data, bucket, key)
-                log_type = "Terraform State Access Logs"
-            else:
-                logger.warning(f"Unknown log type for: {bucket}/{key}")
-                continue
-
-            if not ocsf_events:
-                logger.info(f"No events to send for {key}")
-                continue
 
-            # Send to Security Lake in batches (max 100 per batch)
-            batch_size = 100
-            total_sent = 0
+def get_s3():
+    """The container's S3 client"""
+    global _s3
+    if _s3 is None:
+        with _s3_lock:
+            if _s3 is None:
+                started = time.perf_counter()
+                _s3 = new_s3_client()
+                logger.info(f"Created S3 client in {(time.perf_counter() - started) * 1000:.1f} ms")
+    return _s3
 
-            for i in range(0, len(ocsf_events), batch_size):
-                batch = ocsf_events[i:i + batch_size]
 
-                # Security Lake expects events in JSON format
-                response = s3.put_object(
-                    Bucket=f"aws-security-data-lake-{os.environ['AWS_REGION']}-{context.invoked_function_arn.split(':')[4]}",
-                    Key=f"ext/{log_type.replace(' ', '_')}/{datetime.utcnow().strftime('%Y/%m/%d')}/{context.request_id}-{i}.json",
-                    Body=json.dumps({'events': batch}),
-                    ContentType='application/json'
-                )
+# Resolved from the first invocation's context
+_destination = None
+cold_start = True
 
-                total_sent += len(batch)
-                logger.info(f"Sent batch {i//batch_size + 1}: {len(batch)} events")
+# Metrics of the running invocation, emitted as one EMF record when it ends
+invocation_metrics = None
 
-            logger.info(f"Successfully sent {total_sent} {log_type} events to Security Lake")
 
-        except Exception as e:
-            logger.error(f"Error processing {record}: {str(e)}", exc_info=True)
-            # Continue processing other records
-            continue
+def lambda_handler(event, context):
+    """
+    Main Lambda handler for OCSF transformation
+    Routes each S3 object to its registered log source
+    """
+    global cold_start, invocation_metrics
+    invocation_metrics = InvocationMetrics()
+    if cold_start:
+        cold_start = False
+        logger.info(f"Cold start: module import took {IMPORT_SECONDS * 1000:.1f} ms")
+
+    records = event['Records']
+    logger.info(f"Processing {len(records)} S3 events")
+    invocation_metrics.add('Records', len(records))
+
+    destination = security_lake_destination(context)
+
+    def process(record):
+        return process_record(record, destination)
+
+    # Sharding forks worker processes, which is only safe from a single
+    # threaded process (a lock held by another thread, e.g. in logging or
+    # urllib3, would stay held in the child): records large enough to be
+    # sharded are processed one at a time on this thread, after the pool
+    # below has shut down
+    shardable = [record for record in records if may_shard(record)]
+    pooled = [record for record in records if not may_shard(record)]
+
+    # GET -> transform -> PUT round trips are dominated by S3 latency, so
+    # records are processed concurrently on a bounded pool
+    workers = min(RECORD_WORKERS, len(pooled))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(process, pooled))
+    else:
+        results = [process(record) for record in pooled]
+
+    results += [process_record(record, destination, allow_shard=True) for record in shardable]
+
+    delivered = {}
+    for result in results:
+        if result is not None:
+            log_type, writer = result
+            delivered.setdefault(log_type, []).append(writer)
+
+    for log_type, writers in delivered.items():
+        logger.info(f"Delivery metrics for {log_type}: {json.dumps(delivery_metrics(writers))}")
+
+    if METRICS_NAMESPACE:
+        invocation_metrics.emit(METRICS_NAMESPACE, {'FunctionName': context.function_name})
 
     return {
         'statusCode': 200,
@@ -86,121 +194,401 @@ def lambda_handler(event, context):
     }
 
 
-def transform_s3_access_log_to_ocsf(data, bucket, key):
+def may_shard(record):
     """
-    Transform S3 Access Logs (Terraform State) to OCSF API Activity (class 3005)
+    Whether a record's object could be sharded: sharding is enabled and the
+    notified size (unknown for hand-made records) reaches SHARD_MIN_MB
+    """
+    if SHARD_WORKERS <= 1:
+        return False
+    size = record.get('s3', {}).get('object', {}).get('size')
+    return size is None or size >= SHARD_MIN_MB * 1024 * 1024
+
+
+def process_record(record, destination, allow_shard=False):
+    """
+    Transform one S3 notification record into Security Lake objects.
+
+    Output keys depend only on the source object and source offsets, and
+    a checkpoint marker is written once delivery completes, so redelivered
+    records are skipped and retried ones overwrite rather than duplicate.
+    Returns (log_type, writer), or None when nothing was delivered.
+    Errors are logged and isolated to the record. Large objects are only
+    sharded with allow_shard, which callers pass from a single threaded
+    process.
     """
     try:
-        # S3 access logs are plain text format
-        log_text = data.decode('utf-8')
-        lines = log_text.strip().split('\n')
+        bucket = record['s3']['bucket']['name']
+        s3_object = record['s3']['object']
+        key = unquote_plus(s3_object['key'])
+
+        # Our own checkpoint markers can share a bucket with routed sources
+        if CHECKPOINT_PREFIX and key.startswith(CHECKPOINT_PREFIX):
+            return None
+
+        source = SOURCES.route(bucket, key)
+        if source is None:
+            logger.warning(f"Unknown log type for: {bucket}/{key}")
+            return None
+
+        # Pin the read to the notified version so the identity matches the data
+        get_kwargs = {}
+        if s3_object.get('versionId'):
+            get_kwargs['VersionId'] = s3_object['versionId']
+        elif s3_object.get('eTag'):
+            get_kwargs['IfMatch'] = s3_object['eTag']
+
+        version = s3_object.get('versionId') or s3_object.get('eTag')
+        object_id = source_object_id(bucket, key, version) if version else None
+        if object_id and already_processed(bucket, key, object_id):
+            return None
+
+        logger.info(f"Processing {source.log_type}: s3://{bucket}/{key}")
+
+        # Stream S3 object (never buffered whole in memory)
+        response = get_s3().get_object(Bucket=bucket, Key=key, **get_kwargs)
+        body = response['Body']
+
+        if object_id is None:
+            object_id = source_object_id(bucket, key, response.get('VersionId') or response['ETag'])
+            if already_processed(bucket, key, object_id):
+                body.close()
+                return None
+
+        size = response['ContentLength']
+        invocation_metrics.add('BytesIn', size)
+
+        # Compressed objects are inflated as they stream; byte ranges of a
+        # compressed object cannot be parsed on their own, so never sharded
+        body, compression = open_log_body(body, response.get('ContentEncoding'))
+        if compression:
+            invocation_metrics.add('CompressedObjects', 1)
+
+        if allow_shard and SHARD_WORKERS > 1 and compression is None and size >= SHARD_MIN_MB * 1024 * 1024:
+            body.close()
+            if 'VersionId' not in get_kwargs:
+                get_kwargs['IfMatch'] = response['ETag']
+            delivered, shards = transform_sharded(
+                bucket, key, get_kwargs, size, source, destination, object_id, response['LastModified']
+            )
+        else:
+            writer = open_writer(source, destination, object_id, response['LastModified'])
+            try:
+                for offset, ocsf_event in source.transform(body, bucket, key, stats=invocation_metrics):
+                    writer.write(ocsf_event, offset)
+                writer.close()
+            except Exception:
+                writer.abort()
+                raise
+            delivered, shards = DeliverySummary([writer]), 1
+
+        invocation_metrics.add('ObjectsWritten', delivered.objects_written)
+        invocation_metrics.add('BytesOut', delivered.bytes_written)
+
+        if CHECKPOINT_PREFIX:
+            manifest = {**delivery_metrics([delivered]), 'shards': shards, 'objects': delivered.keys_written}
+            ProcessedObjectCheckpoint(get_s3(), CHECKPOINT_PREFIX).mark_processed(bucket, object_id, key, manifest)
+
+        if not delivered.events_written:
+            logger.info(f"No events to send for {key}")
+            return None
+
+        logger.info(f"Successfully transformed {delivered.events_written} {source.log_type} events for Security Lake")
+        return source.log_type, delivered
+
+    except Exception as e:
+        logger.error(f"Error processing {record}: {str(e)}", exc_info=True)
+        return None
+
+
+def transform_sharded(bucket, key, get_kwargs, size, source, destination, object_id, last_modified):
+    """
+    Transform one large object as SHARD_WORKERS line-aligned byte ranges in
+    parallel processes, each writing its own output objects. Workers are
+    forked, so this is only called while no other thread is running.
+    Returns (merged DeliverySummary, shard count); raises if any shard failed.
+    """
+    shard_size = -(-size // SHARD_WORKERS)
+    ranges = [(start, min(start + shard_size, size)) for start in range(0, size, shard_size)]
+    logger.info(f"Sharding s3://{bucket}/{key} ({size} bytes) into {len(ranges)} byte ranges")
+
+    # Lambda has no /dev/shm, so multiprocessing Pool/Queue cannot be used;
+    # plain Process + Pipe can
+    import multiprocessing
+    mp = multiprocessing.get_context('fork')
+    workers = []
+    for start, end in ranges:
+        receiver, sender = mp.Pipe(duplex=False)
+        process = mp.Process(
+            target=transform_shard,
+            args=(sender, bucket, key, get_kwargs, size, start, end, source, destination, object_id, last_modified)
+        )
+        process.start()
+        sender.close()
+        workers.append((process, receiver))
+
+    summaries = []
+    errors = []
+    for process, receiver in workers:
+        try:
+            status, result = receiver.recv()
+        except EOFError:
+            status, result = 'error', 'worker exited without a result'
+        process.join()
+        receiver.close()
+
+        if status == 'ok':
+            summary, shard_metrics = result
+            summaries.append(summary)
+            invocation_metrics.merge(shard_metrics)
+        else:
+            errors.append(result)
+
+    if errors:
+        raise RuntimeError(f"{len(errors)} of {len(ranges)} shards failed for s3://{bucket}/{key}: {errors[0]}")
 
-        logger.info(f"Processing {len(lines)} S3 access log entries")
+    return DeliverySummary(summaries), len(ranges)
 
-        ocsf_events = []
-        for line in lines:
+
+def transform_shard(conn, bucket, key, get_kwargs, size, start, end, source, destination, object_id, last_modified):
+    """
+    Shard worker (child process): ranged GETs, transform and upload the
+    lines starting in [start, end), then send ('ok', DeliverySummary) or
+    ('error', message) back over conn; an 'ok' result carries the
+    shard's DeliverySummary and InvocationMetrics
+    """
+    global _s3, invocation_metrics
+    # Pooled connections must not be shared across fork
+    _s3 = new_s3_client()
+    invocation_metrics = InvocationMetrics()
+
+    def open_range(first, last):
+        return _s3.get_object(Bucket=bucket, Key=key, Range=f"bytes={first}-{last}", **get_kwargs)['Body']
+
+    writer = None
+    body = None
+    try:
+        # One byte early, so a line starting exactly at start is recognised;
+        # MAX_LINE_BYTES past end covers the line straddling it, and only a
+        # longer line costs a further request
+        read_from = max(0, start - 1)
+        body = BoundedRangeStream(open_range, read_from, end + MAX_LINE_BYTES, size)
+
+        writer = open_writer(source, destination, object_id, last_modified)
+        shard = (read_from, start, end)
+        for offset, ocsf_event in source.transform(body, bucket, key, shard=shard, stats=invocation_metrics):
+            writer.write(ocsf_event, offset)
+        writer.close()
+
+        conn.send(('ok', (DeliverySummary([writer]), invocation_metrics)))
+
+    except Exception as e:
+        logger.error(f"Error transforming bytes {start}-{end} of s3://{bucket}/{key}: {str(e)}", exc_info=True)
+        if writer is not None:
+            writer.abort()
+        conn.send(('error', str(e)))
+
+    finally:
+        if body is not None:
+            body.close()
+        conn.close()
+
+
+def already_processed(bucket, key, object_id):
+    """Checkpoint lookup for a source object (always False when disabled)"""
+    if CHECKPOINT_PREFIX and ProcessedObjectCheckpoint(get_s3(), CHECKPOINT_PREFIX).is_processed(bucket, object_id):
+        logger.info(f"Skipping already transformed s3://{bucket}/{key} ({object_id})")
+        return True
+    return False
+
+
+def open_writer(source, destination, object_id, last_modified):
+    """
+    Create the configured JSON or Parquet writer for one source object;
+    object names are <object_id>-<source offset of the first event>
+    """
+    max_bytes = BATCH_MAX_MB * 1024 * 1024
+    part_size = MULTIPART_PART_SIZE_MB * 1024 * 1024
+
+    if OUTPUT_FORMAT == 'parquet':
+        partition = f"ext/{source.custom_source_name}/{destination.partition}"
+        return OcsfParquetWriter(
+            get_s3(),
+            destination.bucket,
+            lambda day, offset: f"{partition}/eventDay={day}/{object_id}-{offset}.parquet",
+            compression=PARQUET_COMPRESSION,
+            max_bytes=max_bytes,
+            max_events=BATCH_MAX_EVENTS,
+            part_size=part_size,
+            schema=source.parquet_schema()
+        )
+
+    # Dated by the source object, not the wall clock, so retries land on the same key
+    prefix = f"ext/{source.log_type.replace(' ', '_')}/{last_modified.strftime('%Y/%m/%d')}/{object_id}"
+    return JsonBatchWriter(
+        get_s3(),
+        destination.bucket,
+        lambda offset: f"{prefix}-{offset}.json",
+        max_bytes=max_bytes,
+        max_events=BATCH_MAX_EVENTS,
+        part_size=part_size
+    )
+
+
+class SecurityLakeDestination:
+    """
+    Security Lake S3 bucket in this Lambda's region and account, and the
+    region=<region>/accountId=<account> part of the custom source layout:
+    ext/<source>/region=<region>/accountId=<account>/eventDay=<YYYYMMDD>/<object>
+    """
+
+    __slots__ = ('bucket', 'partition')
+
+    def __init__(self, region, account_id):
+        self.bucket = f"aws-security-data-lake-{region}-{account_id}"
+        self.partition = f"region={region}/accountId={account_id}"
+
+
+def security_lake_destination(context):
+    """Destination for this container, resolved from the first invocation's ARN"""
+    global _destination
+    if _destination is None:
+        _destination = SecurityLakeDestination(os.environ['AWS_REGION'], context.invoked_function_arn.split(':')[4])
+    return _destination
+
+
+def transform_s3_access_log_to_ocsf(data, bucket, key, shard=None, stats=None):
+    """
+    Transform S3 Access Logs (Terraform State) to OCSF API Activity (class 3005)
+
+    Accepts a StreamingBody (or bytes), plain or gzip/bzip2/zstd compressed,
+    and yields (offset, event) one at a time, where offset is the byte
+    position of the source line in the decompressed stream. shard is an
+    optional (read_from, start, end) byte range of an uncompressed object,
+    see iter_shard_blocks.
+    Line totals are added to stats (InvocationMetrics) when given.
+    """
+    line_count = 0
+    parsed_count = 0
+    matched_count = 0
+    event_count = 0
+    error_count = 0
+    builder = S3ApiActivityEventBuilder(OCSF_VERSION, bucket)
+    timestamps = S3LogTimestampParser()
+
+    # S3 access logs are plain text (after decompression); lines that cannot mention
+    # Terraform state are rejected at byte level before decode/tokenize
+    for block_offset, block in iter_source_blocks(data, shard):
+        line_count += block.count(b'\n') + (0 if block.endswith(b'\n') else 1)
+
+        for line_start, raw_line in TERRAFORM_LINE_FILTER.candidate_lines(block):
+            if not raw_line.strip():
+                continue
+
+            parsed_count += 1
             try:
-                # Parse S3 access log format
-                # Format: bucket_owner canonical_user_id timestamp remote_ip requester request_id operation key request_uri http_status error_code bytes_sent object_size total_time turnaround_time referrer user_agent version_id
-                parts = line.split(' ')
-                if len(parts) < 10:
+                line = raw_line.decode('utf-8')
+
+                # Parse S3 access log format (bracketed time and quoted fields aware)
+                record = parse_s3_access_log_line(line)
+                if record is None:
                     continue
 
                 # Only process if it's related to terraform state
-                object_key = parts[7] if len(parts) > 7 else ""
-                if 'terraform' not in object_key.lower() and '.tfstate' not in object_key.lower():
+                if not TERRAFORM_LINE_FILTER.matches(record):
                     continue
+                matched_count += 1
+
+                object_key = record.key or ""
 
-                operation = parts[6] if len(parts) > 6 else ""
-                http_status = parts[8] if len(parts) > 8 else "200"
+                operation = record.operation or ""
+                http_status = to_int(record.http_status, 200)
 
                 # Determine severity: High for GetObject on .tfstate files
                 severity_id = 3 if 'GET' in operation and '.tfstate' in object_key else 2
 
-                timestamp_str = parts[2][1:] if len(parts) > 2 else ""  # Remove leading [
-                event_time = parse_s3_log_timestamp(timestamp_str)
-
-                ocsf_event = {
-                    "metadata": {
-                        "version": OCSF_VERSION,
-                        "product": {
-                            "name": "AWS S3 Access Logs",
-                            "vendor_name": "AWS"
-                        },
-                        "event_code": operation,
-                        "profiles": ["cloud"],
-                        "log_name": "S3 Access Logs",
-                        "log_provider": "AWS S3"
-                    },
-                    "class_uid": 3005,  # API Activity
-                    "class_name": "API Activity",
-                    "category_uid": 3,  # Identity & Access Management
-                    "category_name": "Identity & Access Management",
-                    "severity_id": severity_id,
-                    "severity": "High" if severity_id == 3 else "Medium",
-                    "time": event_time,
-                    "api": {
-                        "operation": operation,
-                        "service": {
-                            "name": "s3.amazonaws.com"
-                        },
-                        "response": {
-                            "code": int(http_status) if http_status.isdigit() else 200,
-                            "message": parts[9] if len(parts) > 9 and parts[9] != '-' else None
-                        }
-                    },
-                    "actor": {
-                        "user": {
-                            "uid": parts[4] if len(parts) > 4 else "unknown",
-                            "type": "IAMUser"
-                        }
-                    },
-                    "cloud": {
-                        "provider": "AWS",
-                        "account": {
-                            "uid": parts[0] if len(parts) > 0 else ""
-                        }
-                    },
-                    "src_endpoint": {
-                        "ip": parts[3] if len(parts) > 3 else ""
-                    },
-                    "resources": [
-                        {
-                            "type": "s3-object",
-                            "uid": f"{bucket}/{object_key}",
-                            "name": object_key
-                        }
-                    ],
-                    "http_request": {
-                        "user_agent": parts[-2] if len(parts) > 15 else "unknown",
-                        "http_status": int(http_status) if http_status.isdigit() else 200
-                    },
-                    "unmapped": {
-                        "request_id": parts[5] if len(parts) > 5 else "",
-                        "bytes_sent": int(parts[10]) if len(parts) > 10 and parts[10].isdigit() else 0,
-                        "object_size": int(parts[11]) if len(parts) > 11 and parts[11].isdigit() else 0,
-                        "total_time_ms": int(parts[12]) if len(parts) > 12 and parts[12].isdigit() else 0
-                    }
-                }
-
-                ocsf_events.append(ocsf_event)
+                event_time = timestamps.parse(record.time)
+                if event_time is None:
+                    continue
+
+                ocsf_event = builder.build(record, object_key, operation, http_status, event_time, severity_id)
+
+                event_count += 1
+                yield block_offset + line_start, ocsf_event
 
             except Exception as e:
+                error_count += 1
                 logger.error(f"Error transforming S3 access log line: {str(e)}")
                 continue
 
-        return ocsf_events
+    logger.info(f"Scanned {line_count} S3 access log entries, fully parsed {parsed_count}, emitted {event_count} OCSF events")
+    if timestamps.errors:
+        logger.warning(f"Skipped {timestamps.errors} S3 access log entries with unparseable timestamps in {key}")
+
+    if stats is not None:
+        stats.add_transform(line_count, matched_count, event_count, error_count + timestamps.errors)
+
+
+# Sources that can be enabled through LOG_SOURCES:
+# name -> (log type, default custom source name, transform, Parquet schema)
+ADDITIONAL_SOURCE_TYPES = {
+    'cloudfront': (
+        "CloudFront Access Logs",
+        'CloudFrontAccess',
+        transform_cloudfront_log_to_ocsf,
+        partial(ocsf_http_activity_schema, CLOUDFRONT_UNMAPPED_FIELDS),
+    ),
+    'alb': (
+        "ALB Access Logs",
+        'ALBAccess',
+        transform_alb_log_to_ocsf,
+        partial(ocsf_http_activity_schema, ALB_UNMAPPED_FIELDS),
+    ),
+    'k8s_audit': (
+        "Kubernetes Audit Logs",
+        'KubernetesAudit',
+        transform_k8s_audit_log_to_ocsf,
+        ocsf_kubernetes_api_activity_schema,
+    ),
+}
+
+
+def build_source_registry():
+    """
+    Terraform state access logs are always routed (the logs bucket, and
+    terraform-state/ keys anywhere); additional sources come from LOG_SOURCES
+    """
+    registry = SourceRegistry()
+
+    terraform_state = LogSource(
+        'terraform_state',
+        "Terraform State Access Logs",
+        SECURITY_LAKE_CUSTOM_SOURCE_NAME_TERRAFORM,
+        transform_s3_access_log_to_ocsf,
+        ocsf_api_activity_schema
+    )
+    registry.register(terraform_state, buckets=(TERRAFORM_STATE_LOGS_BUCKET,))
+    registry.register(terraform_state, buckets=(ANY_BUCKET,), prefixes=('terraform-state/',))
+
+    for name, config in LOG_SOURCES.items():
+        if name not in ADDITIONAL_SOURCE_TYPES:
+            logger.warning(f"Ignoring unknown log source in LOG_SOURCES: {name}")
+            continue
+
+        log_type, default_source_name, transform, schema = ADDITIONAL_SOURCE_TYPES[name]
+        source = LogSource(
+            name,
+            log_type,
+            config.get('custom_source_name') or default_source_name,
+            partial(transform, ocsf_version=OCSF_VERSION),
+            schema
+        )
+        registry.register(source, buckets=config.get('buckets') or (ANY_BUCKET,), prefixes=config.get('prefixes') or ('',))
 
-    except Exception as e:
-        logger.error(f"Error transforming S3 Access Logs: {str(e)}", exc_info=True)
-        return []
+    return registry
 
 
-def parse_s3_log_timestamp(timestamp_str):
-    """Parse S3 access log timestamp"""
-    try:
-        # Format: 06/Feb/2019:00:00:38 +0000
-        dt = datetime.strptime(timestamp_str.split('+')[0].strip(), '%d/%b/%Y:%H:%M:%S')
-        return int(dt.timestamp() * 1000)
-    except Exception:
-        return int(datetime.utcnow().timestamp() * 1000)
+# Built after the transforms above are defined
+SOURCES = build_source_registry()
+
+IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
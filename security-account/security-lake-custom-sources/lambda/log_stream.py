@@ -0,0 +1,345 @@
+"""
+Log Stream Helpers
+Line-aligned block reading and timestamp parsing shared by log source parsers
+
+Parsers consume (offset, block) pairs: blocks of complete raw lines (bytes)
+and the byte offset of each block in the source object, which output keys
+are derived from. Compressed objects (gzip, bzip2, zstd) are recognised by
+their magic bytes and decompressed incrementally; their offsets are
+positions in the decompressed stream.
+"""
+import bz2
+import io
+import zlib
+from calendar import timegm
+
+READ_CHUNK_SIZE = 1024 * 1024  # 1 MiB per StreamingBody read
+
+# Longest log line expected: a shard's ranged GET stops this far past the
+# shard end, and is continued in steps of this size only for a longer line
+MAX_LINE_BYTES = 64 * 1024
+
+# Leading bytes of each supported compressed format; bzip2 is matched on
+# its block (or empty stream) magic too, since "BZh" alone could be text
+SNIFF_SIZE = 10
+BZIP2_STREAM_MAGIC = (b'1AY&SY', b'\x17rE8P\x90')
+ZSTD_FRAME_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Content-Encoding values naming a supported format, used when the magic
+# bytes are not conclusive (e.g. a zstd stream opening with a skippable frame)
+CONTENT_ENCODINGS = {
+    'gzip': 'gzip',
+    'x-gzip': 'gzip',
+    'bzip2': 'bzip2',
+    'x-bzip2': 'bzip2',
+    'zstd': 'zstd',
+}
+
+# Imported on first use by load_zstandard(); not part of the Lambda runtime
+zstandard = None
+
+
+def load_zstandard():
+    """Import zstandard (only required for zstd compressed input)"""
+    global zstandard
+    if zstandard is None:
+        try:
+            import zstandard as module
+        except ImportError:
+            raise RuntimeError("zstd compressed logs require the zstandard package (attach a layer that provides it)")
+        zstandard = module
+    return zstandard
+
+
+def sniff_compression(head, content_encoding=None):
+    """
+    'gzip', 'bzip2', 'zstd' or None (plain text) for an object starting
+    with the bytes head; magic bytes win over the Content-Encoding header
+    """
+    if head[:2] == b'\x1f\x8b':
+        return 'gzip'
+    if head[:3] == b'BZh' and head[3:4].isdigit() and head[4:10] in BZIP2_STREAM_MAGIC:
+        return 'bzip2'
+    if head[:4] == ZSTD_FRAME_MAGIC:
+        return 'zstd'
+    return CONTENT_ENCODINGS.get((content_encoding or '').strip().lower())
+
+
+class PrefixedStream:
+    """Replays the bytes consumed by sniffing, then reads on from the body"""
+
+    __slots__ = ('_head', '_body')
+
+    def __init__(self, head, body):
+        self._head = head
+        self._body = body
+
+    def read(self, size=-1):
+        if not self._head:
+            return self._body.read(size)
+        if size is None or size < 0:
+            data, self._head = self._head + self._body.read(), b''
+            return data
+        if size <= len(self._head):
+            data, self._head = self._head[:size], self._head[size:]
+            return data
+        data, self._head = self._head, b''
+        return data + self._body.read(size - len(data))
+
+    def close(self):
+        close = getattr(self._body, 'close', None)
+        if close:
+            close()
+
+
+class DecompressedStream:
+    """
+    File-like view of a gzip or bzip2 body: read(size) inflates just enough
+    input for at most size bytes, so a highly compressible object is never
+    expanded whole. Concatenated gzip members and bzip2 streams are read
+    through; a stream that ends mid-member raises EOFError.
+    """
+
+    __slots__ = ('_body', '_new_decompressor', '_decompressor', '_input', 'read_size')
+
+    DECOMPRESSORS = {
+        'gzip': lambda: zlib.decompressobj(wbits=31),
+        'bzip2': bz2.BZ2Decompressor,
+    }
+
+    def __init__(self, body, compression, read_size=READ_CHUNK_SIZE):
+        self._body = body
+        self._new_decompressor = self.DECOMPRESSORS[compression]
+        self._decompressor = None
+        self._input = b''
+        self.read_size = read_size
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(self.read_size), b''))
+
+        output = []
+        remaining = size
+        while remaining > 0:
+            if self._decompressor is None:
+                if not self._input:
+                    self._input = self._body.read(self.read_size)
+                    if not self._input:
+                        break
+                self._decompressor = self._new_decompressor()
+
+            decompressor = self._decompressor
+            # zlib hands back unread input; bz2 keeps it and reports needs_input
+            if not self._input and getattr(decompressor, 'needs_input', True):
+                self._input = self._body.read(self.read_size)
+                if not self._input:
+                    raise EOFError("Compressed log stream ended before the end of its last member")
+
+            data = decompressor.decompress(self._input, remaining)
+            self._input = getattr(decompressor, 'unconsumed_tail', b'')
+            if decompressor.eof:
+                # The next member (if any) starts right after this one
+                self._input = decompressor.unused_data
+                self._decompressor = None
+
+            output.append(data)
+            remaining -= len(data)
+
+        return b''.join(output)
+
+    def close(self):
+        close = getattr(self._body, 'close', None)
+        if close:
+            close()
+
+
+class BoundedRangeStream:
+    """
+    File-like view of bytes [first, size) of an object, read through ranged
+    GETs: the first request stops before limit, and each further
+    MAX_LINE_BYTES is requested only once everything before it was read.
+    open_range(first, last) returns the body of bytes first..last (inclusive).
+    """
+
+    __slots__ = ('_open_range', '_body', '_position', '_size', 'step')
+
+    def __init__(self, open_range, first, limit, size, step=MAX_LINE_BYTES):
+        self._open_range = open_range
+        self._position = first
+        self._size = size
+        self.step = step
+        limit = min(limit, size)
+        self._body = open_range(first, limit - 1) if first < limit else None
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(READ_CHUNK_SIZE), b''))
+
+        while True:
+            if self._body is None:
+                if self._position >= self._size:
+                    return b''
+                last = min(self._position + self.step, self._size) - 1
+                self._body = self._open_range(self._position, last)
+
+            data = self._body.read(size)
+            if data:
+                self._position += len(data)
+                return data
+            self.close()
+
+    def close(self):
+        if self._body is not None:
+            self._body.close()
+            self._body = None
+
+
+def open_log_body(body, content_encoding=None):
+    """
+    Readable plain-text view of an S3 StreamingBody or bytes blob, and the
+    compression detected ('gzip', 'bzip2', 'zstd' or None). Only the first
+    bytes are read here; decompression happens as the view is read.
+    """
+    if isinstance(body, (bytes, bytearray)):
+        body = io.BytesIO(body)
+
+    head = body.read(SNIFF_SIZE)
+    compression = sniff_compression(head, content_encoding)
+    stream = PrefixedStream(head, body)
+
+    if compression == 'zstd':
+        reader = load_zstandard().ZstdDecompressor().stream_reader(
+            stream, read_size=READ_CHUNK_SIZE, read_across_frames=True
+        )
+        return reader, compression
+    if compression:
+        return DecompressedStream(stream, compression), compression
+    return stream, compression
+
+
+def iter_log_blocks(body, chunk_size=READ_CHUNK_SIZE, base=0):
+    """
+    Yield (offset, block) for blocks of complete raw log lines (bytes) from
+    an S3 StreamingBody or bytes blob, reading chunk_size bytes at a time so
+    the object is never held whole. offset is the block's position in the
+    source object, whose first byte read is at base. Every block but the
+    last ends with a newline.
+    """
+    if isinstance(body, (bytes, bytearray)):
+        body = io.BytesIO(body)
+
+    offset = base
+    pending = b''
+    for chunk in iter(lambda: body.read(chunk_size), b''):
+        block = pending + chunk
+        cut = block.rfind(b'\n') + 1
+        pending = block[cut:]
+        if cut:
+            yield offset, block[:cut]
+            offset += cut
+
+    if pending:
+        yield offset, pending
+
+
+def iter_shard_blocks(body, read_from, start, end):
+    """
+    Blocks of the lines whose first byte lies in [start, end), from a body
+    read from byte read_from (start - 1, or 0 for the first shard). The
+    partial line before start belongs to the previous shard and is dropped;
+    the line straddling end is read to its newline.
+    """
+    skip_partial = start > read_from
+    for offset, block in iter_log_blocks(body, base=read_from):
+        if skip_partial:
+            cut = block.find(b'\n') + 1
+            if not cut:
+                continue
+            offset, block = offset + cut, block[cut:]
+            skip_partial = False
+            if not block:
+                continue
+
+        if offset >= end:
+            return
+
+        if offset + len(block) > end:
+            cut = block.find(b'\n', end - offset - 1) + 1
+            yield offset, block[:cut] if cut else block
+            return
+
+        yield offset, block
+
+
+def iter_source_blocks(data, shard=None):
+    """
+    Blocks of a whole source object, decompressed if need be, or of one
+    (read_from, start, end) shard of an uncompressed one
+    """
+    if shard is None:
+        return iter_log_blocks(open_log_body(data)[0])
+    return iter_shard_blocks(data, *shard)
+
+
+def iter_block_lines(block):
+    """Yield (start, line) for each non-empty line of a block, without the newline"""
+    start = 0
+    size = len(block)
+    while start < size:
+        end = block.find(b'\n', start)
+        if end == -1:
+            end = size
+        line = block[start:end].rstrip(b'\r')
+        if line:
+            yield start, line
+        start = end + 1
+
+
+class Iso8601TimestampParser:
+    """
+    Parses UTC ISO 8601 times ("2026-10-18T06:12:01.123456Z") to epoch millis
+
+    Fixed-offset slicing instead of strptime; the whole-second part is
+    memoised, since busy logs repeat the same second many times.
+    Unparseable values return None and are counted in .errors.
+    """
+
+    __slots__ = ('_cache', 'max_cache_size', 'errors')
+
+    def __init__(self, max_cache_size=1024):
+        self._cache = {}
+        self.max_cache_size = max_cache_size
+        self.errors = 0
+
+    def parse(self, value):
+        try:
+            # Checked on every value, not just cache misses: a cached second
+            # must not admit other offsets ("...+05:00") or trailing text
+            second = value[:19]
+            tail = value[19:]
+            if len(second) != 19 or second[10] not in 'T ' or tail[-1:] != 'Z':
+                raise ValueError(value)
+            if tail != 'Z' and not (tail[:1] == '.' and tail[1:-1].isdigit()):
+                raise ValueError(value)
+
+            seconds = self._cache.get(second)
+            if seconds is None:
+                seconds = timegm((
+                    int(second[0:4]),    # year
+                    int(second[5:7]),    # month
+                    int(second[8:10]),   # day
+                    int(second[11:13]),  # hour
+                    int(second[14:16]),  # minute
+                    int(second[17:19]),  # second
+                ))
+                if len(self._cache) >= self.max_cache_size:
+                    self._cache.clear()
+                self._cache[second] = seconds
+
+            # Fractional seconds ("", ".5", ".123456") truncated to millis
+            fraction = tail[1:-1][:3]
+            return seconds * 1000 + (int(fraction.ljust(3, '0')) if fraction else 0)
+
+        except (ValueError, TypeError):
+            self.errors += 1
+            return None
@@ -0,0 +1,189 @@
+"""
+Invocation Metrics
+CloudWatch Embedded Metric Format (EMF) records for the transformer
+
+One EMF record per invocation is printed to stdout, which Lambda ships to
+CloudWatch Logs, where the metrics are extracted; no PutMetricData calls
+or extra dependencies. Counters are added once per source object and S3
+latencies once per API call, never per log line.
+"""
+import json
+import math
+import os
+import resource
+import sys
+import threading
+import time
+
+# name -> CloudWatch unit
+COUNTERS = {
+    'Records': 'Count',
+    'LinesScanned': 'Count',
+    'LinesMatched': 'Count',
+    'EventsEmitted': 'Count',
+    'ParseErrors': 'Count',
+    'BytesIn': 'Bytes',
+    'CompressedObjects': 'Count',
+    'BytesOut': 'Bytes',
+    'ObjectsWritten': 'Count',
+}
+
+# S3 operation -> latency histogram metric
+S3_LATENCY_METRICS = {
+    'GetObject': 'GetLatency',
+    'PutObject': 'PutLatency',
+    'UploadPart': 'PutLatency',
+    'CompleteMultipartUpload': 'PutLatency',
+}
+
+# EMF accepts at most 100 distinct values per metric: latencies are
+# bucketed logarithmically, 16 buckets per decade from 0.1 ms to 100 s
+HISTOGRAM_BUCKETS_PER_DECADE = 16
+HISTOGRAM_MIN_MS = 0.1
+HISTOGRAM_MAX_MS = 100000
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def latency_bucket(millis):
+    """Representative value of the histogram bucket holding millis"""
+    millis = min(max(millis, HISTOGRAM_MIN_MS), HISTOGRAM_MAX_MS)
+    step = round(math.log10(millis) * HISTOGRAM_BUCKETS_PER_DECADE)
+    return round(10 ** (step / HISTOGRAM_BUCKETS_PER_DECADE), 2)
+
+
+def current_memory_mb():
+    """Current RSS of this process from /proc/self/statm, or None off Linux"""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(pages * PAGE_SIZE / 1024 / 1024, 1)
+
+
+def container_peak_memory_mb():
+    """
+    Peak RSS of this process or any shard worker it waited for since the
+    execution environment started, not this invocation (Linux: KiB)
+    """
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    )
+    return round(peak / 1024, 1)
+
+
+class InvocationMetrics:
+    """
+    Thread-safe counters and S3 latency histograms for one invocation;
+    picklable, so shard worker processes can hand theirs back to the parent
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # metric -> {bucket ms: count}
+        self.latencies = {name: {} for name in set(S3_LATENCY_METRICS.values())}
+        # Largest RSS sampled during the invocation, in any one process
+        self.memory_mb = current_memory_mb()
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        return {'started': self.started, 'counters': self.counters, 'latencies': self.latencies, 'memory_mb': self.memory_mb}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def add(self, name, value):
+        with self._lock:
+            self.counters[name] += value
+
+    def add_transform(self, scanned, matched, events, errors):
+        """Totals of one source transform (object or shard); also samples RSS"""
+        with self._lock:
+            self.counters['LinesScanned'] += scanned
+            self.counters['LinesMatched'] += matched
+            self.counters['EventsEmitted'] += events
+            self.counters['ParseErrors'] += errors
+        self.sample_memory()
+
+    def sample_memory(self, memory_mb=None):
+        """Raise memory_mb to the current RSS (or the given sample)"""
+        if memory_mb is None:
+            memory_mb = current_memory_mb()
+        if memory_mb is None:
+            return
+        with self._lock:
+            self.memory_mb = max(self.memory_mb or 0, memory_mb)
+
+    def observe_latency(self, name, millis):
+        bucket = latency_bucket(millis)
+        with self._lock:
+            histogram = self.latencies[name]
+            histogram[bucket] = histogram.get(bucket, 0) + 1
+
+    def merge(self, other):
+        """Fold another InvocationMetrics (e.g. from a shard worker) into this one"""
+        with self._lock:
+            for name, value in other.counters.items():
+                self.counters[name] += value
+            for name, histogram in other.latencies.items():
+                merged = self.latencies[name]
+                for bucket, count in histogram.items():
+                    merged[bucket] = merged.get(bucket, 0) + count
+        if other.memory_mb is not None:
+            self.sample_memory(other.memory_mb)
+
+    def to_emf(self, namespace, dimensions):
+        """EMF record with every counter, latency histogram, duration and memory"""
+        metrics = [{'Name': name, 'Unit': unit} for name, unit in COUNTERS.items()]
+        record = {**dimensions, **self.counters}
+
+        for name, histogram in sorted(self.latencies.items()):
+            if histogram:
+                buckets = sorted(histogram)
+                metrics.append({'Name': name, 'Unit': 'Milliseconds'})
+                record[name] = {'Values': buckets, 'Counts': [histogram[b] for b in buckets]}
+
+        metrics.append({'Name': 'Duration', 'Unit': 'Milliseconds'})
+        record['Duration'] = round((time.time() - self.started) * 1000, 1)
+        self.sample_memory()
+        if self.memory_mb is not None:
+            metrics.append({'Name': 'Memory', 'Unit': 'Megabytes'})
+            record['Memory'] = self.memory_mb
+        metrics.append({'Name': 'ContainerPeakMemory', 'Unit': 'Megabytes'})
+        record['ContainerPeakMemory'] = container_peak_memory_mb()
+
+        record['_aws'] = {
+            'Timestamp': int(self.started * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': namespace,
+                'Dimensions': [list(dimensions)],
+                'Metrics': metrics,
+            }],
+        }
+        return record
+
+    def emit(self, namespace, dimensions, stream=None):
+        """Print the EMF record as one stdout line, where Lambda picks it up"""
+        print(json.dumps(self.to_emf(namespace, dimensions)), file=stream or sys.stdout, flush=True)
+
+
+def instrument_s3_client(client, current_metrics):
+    """
+    Time S3 calls through botocore events (retries included) into the
+    InvocationMetrics returned by current_metrics(), if any
+    """
+    def before_call(context, **kwargs):
+        context['metrics_started'] = time.perf_counter()
+
+    def after_call(model, context, **kwargs):
+        name = S3_LATENCY_METRICS.get(model.name)
+        metrics = current_metrics()
+        if name is not None and metrics is not None and 'metrics_started' in context:
+            metrics.observe_latency(name, (time.perf_counter() - context['metrics_started']) * 1000)
+
+    client.meta.events.register('before-call.s3', before_call)
+    client.meta.events.register('after-call.s3', after_call)
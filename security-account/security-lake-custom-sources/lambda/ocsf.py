@@ -0,0 +1,325 @@
+"""
+OCSF Event Construction
+Precompiled builders and byte encoding for OCSF events
+
+Static sub-structures (product, profiles, service) are built once per
+builder and shared by every event it emits; events must be treated as
+read-only once built.
+"""
+import json
+
+from s3_access_log import to_int
+
+try:
+    import orjson
+except ImportError:  # Optional fast encoder, falls back to stdlib json
+    orjson = None
+
+API_ACTIVITY_CLASS_UID = 3005
+API_ACTIVITY_CATEGORY_UID = 3
+HTTP_ACTIVITY_CLASS_UID = 4002
+HTTP_ACTIVITY_CATEGORY_UID = 4
+
+SEVERITY_NAMES = {
+    1: "Informational",
+    2: "Medium",
+    3: "High",
+}
+
+# OCSF HTTP Activity activity_id by request method (anything else: 99 Other)
+HTTP_ACTIVITIES = {
+    'CONNECT': (1, "Connect"),
+    'DELETE': (2, "Delete"),
+    'GET': (3, "Get"),
+    'HEAD': (4, "Head"),
+    'OPTIONS': (5, "Options"),
+    'POST': (6, "Post"),
+    'PUT': (7, "Put"),
+    'TRACE': (8, "Trace"),
+}
+
+# OCSF API Activity activity_id by Kubernetes verb (anything else: 99 Other)
+KUBERNETES_API_ACTIVITIES = {
+    'create': (1, "Create"),
+    'get': (2, "Read"),
+    'list': (2, "Read"),
+    'watch': (2, "Read"),
+    'update': (3, "Update"),
+    'patch': (3, "Update"),
+    'delete': (4, "Delete"),
+    'deletecollection': (4, "Delete"),
+}
+KUBERNETES_EXEC_SUBRESOURCES = frozenset(('exec', 'attach', 'portforward'))
+
+
+if orjson is not None:
+    encode_event = orjson.dumps
+else:
+    _encoder = json.JSONEncoder(separators=(',', ':'))
+
+    def encode_event(event):
+        """Serialize one OCSF event to UTF-8 JSON bytes"""
+        return _encoder.encode(event).encode('utf-8')
+
+
+class S3ApiActivityEventBuilder:
+    """
+    Builds OCSF API Activity (class 3005) events from S3 access log records
+    for a single source bucket
+    """
+
+    __slots__ = ('_version', '_product', '_profiles', '_service', '_uid_prefix')
+
+    def __init__(self, ocsf_version, bucket):
+        self._version = ocsf_version
+        self._product = {
+            "name": "AWS S3 Access Logs",
+            "vendor_name": "AWS"
+        }
+        self._profiles = ["cloud"]
+        self._service = {"name": "s3.amazonaws.com"}
+        self._uid_prefix = f"{bucket}/"
+
+    def build(self, record, object_key, operation, http_status, event_time, severity_id):
+        """Return one OCSF event dict for an S3AccessLogRecord"""
+        return {
+            "metadata": {
+                "version": self._version,
+                "product": self._product,
+                "event_code": operation,
+                "profiles": self._profiles,
+                "log_name": "S3 Access Logs",
+                "log_provider": "AWS S3"
+            },
+            "class_uid": API_ACTIVITY_CLASS_UID,
+            "class_name": "API Activity",
+            "category_uid": API_ACTIVITY_CATEGORY_UID,
+            "category_name": "Identity & Access Management",
+            "severity_id": severity_id,
+            "severity": SEVERITY_NAMES[severity_id],
+            "time": event_time,
+            "api": {
+                "operation": operation,
+                "service": self._service,
+                "response": {
+                    "code": http_status,
+                    "message": record.error_code
+                }
+            },
+            "actor": {
+                "user": {
+                    "uid": record.requester or "unknown",
+                    "type": "IAMUser"
+                }
+            },
+            "cloud": {
+                "provider": "AWS",
+                "account": {
+                    "uid": record.bucket_owner or ""
+                }
+            },
+            "src_endpoint": {
+                "ip": record.remote_ip or ""
+            },
+            "resources": [
+                {
+                    "type": "s3-object",
+                    "uid": self._uid_prefix + object_key,
+                    "name": object_key
+                }
+            ],
+            "http_request": {
+                "user_agent": record.user_agent or "unknown",
+                "http_status": http_status
+            },
+            "unmapped": {
+                "request_id": record.request_id or "",
+                "bytes_sent": to_int(record.bytes_sent),
+                "object_size": to_int(record.object_size),
+                "total_time_ms": to_int(record.total_time)
+            }
+        }
+
+
+class HttpActivityEventBuilder:
+    """
+    Builds OCSF HTTP Activity (class 4002) events from CDN / load balancer
+    access log entries for one product (e.g. CloudFront, ALB)
+    """
+
+    __slots__ = ('_version', '_product', '_profiles', '_log_name', '_log_provider', '_cloud')
+
+    def __init__(self, ocsf_version, product_name, log_name):
+        self._version = ocsf_version
+        self._product = {
+            "name": product_name,
+            "vendor_name": "AWS"
+        }
+        self._profiles = ["cloud"]
+        self._log_name = log_name
+        self._log_provider = product_name
+        self._cloud = {"provider": "AWS"}
+
+    def build(self, event_time, method, hostname, path, query, status, src_ip, src_port, dst_ip, dst_port,
+              user_agent, referrer, http_version, bytes_in, bytes_out, duration_ms, unmapped):
+        """Return one OCSF event dict; unmapped holds source-specific string fields"""
+        activity_id, activity_name = HTTP_ACTIVITIES.get(method, (99, "Other"))
+        severity_id = 2 if status in (401, 403) or status >= 500 else 1
+
+        return {
+            "metadata": {
+                "version": self._version,
+                "product": self._product,
+                "profiles": self._profiles,
+                "log_name": self._log_name,
+                "log_provider": self._log_provider
+            },
+            "class_uid": HTTP_ACTIVITY_CLASS_UID,
+            "class_name": "HTTP Activity",
+            "category_uid": HTTP_ACTIVITY_CATEGORY_UID,
+            "category_name": "Network Activity",
+            "activity_id": activity_id,
+            "activity_name": activity_name,
+            "type_uid": HTTP_ACTIVITY_CLASS_UID * 100 + activity_id,
+            "severity_id": severity_id,
+            "severity": SEVERITY_NAMES[severity_id],
+            "time": event_time,
+            "duration": duration_ms,
+            "http_request": {
+                "http_method": method,
+                "url": {
+                    "hostname": hostname,
+                    "path": path,
+                    "query_string": query
+                },
+                "user_agent": user_agent or "unknown",
+                "referrer": referrer,
+                "version": http_version
+            },
+            "http_response": {
+                "code": status
+            },
+            "src_endpoint": {
+                "ip": src_ip or "",
+                "port": src_port
+            },
+            "dst_endpoint": {
+                "ip": dst_ip,
+                "port": dst_port
+            },
+            "traffic": {
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out
+            },
+            "cloud": self._cloud,
+            "unmapped": unmapped
+        }
+
+
+class KubernetesApiActivityEventBuilder:
+    """
+    Builds OCSF API Activity (class 3005) events from Kubernetes audit
+    events (audit.k8s.io/v1, one JSON object per line)
+    """
+
+    __slots__ = ('_version', '_product', '_profiles', '_service')
+
+    def __init__(self, ocsf_version):
+        self._version = ocsf_version
+        self._product = {
+            "name": "Kubernetes Audit",
+            "vendor_name": "Kubernetes"
+        }
+        self._profiles = ["cloud"]
+        self._service = {"name": "kube-apiserver"}
+
+    def build(self, audit, event_time):
+        """Return one OCSF event dict for a decoded audit event"""
+        verb = audit.get('verb') or ""
+        user = audit.get('user') or {}
+        ref = audit.get('objectRef') or {}
+        status = audit.get('responseStatus') or {}
+        code = status.get('code') or 0
+
+        resource = ref.get('resource') or ""
+        subresource = ref.get('subresource') or ""
+        namespace = ref.get('namespace') or ""
+        name = ref.get('name') or ""
+        username = user.get('username') or "unknown"
+
+        activity_id, activity_name = KUBERNETES_API_ACTIVITIES.get(verb, (99, "Other"))
+
+        # High: secret reads, exec/attach/port-forward and denied requests
+        if (resource == 'secrets' and activity_id == 2) or subresource in KUBERNETES_EXEC_SUBRESOURCES \
+                or code in (401, 403):
+            severity_id = 3
+        elif activity_id in (1, 3, 4):
+            severity_id = 2
+        else:
+            severity_id = 1
+
+        source_ips = audit.get('sourceIPs') or ()
+
+        return {
+            "metadata": {
+                "version": self._version,
+                "product": self._product,
+                "event_code": verb,
+                "uid": audit.get('auditID') or "",
+                "profiles": self._profiles,
+                "log_name": "Kubernetes Audit Logs",
+                "log_provider": "kube-apiserver"
+            },
+            "class_uid": API_ACTIVITY_CLASS_UID,
+            "class_name": "API Activity",
+            "category_uid": API_ACTIVITY_CATEGORY_UID,
+            "category_name": "Identity & Access Management",
+            "activity_id": activity_id,
+            "activity_name": activity_name,
+            "type_uid": API_ACTIVITY_CLASS_UID * 100 + activity_id,
+            "severity_id": severity_id,
+            "severity": SEVERITY_NAMES[severity_id],
+            "time": event_time,
+            "api": {
+                "operation": verb,
+                "request": {
+                    "uid": audit.get('auditID') or ""
+                },
+                "service": self._service,
+                "response": {
+                    "code": code,
+                    "message": status.get('reason') or status.get('status')
+                }
+            },
+            "actor": {
+                "user": {
+                    "name": username,
+                    "uid": user.get('uid') or username,
+                    "type": "ServiceAccount" if username.startswith('system:serviceaccount:') else "User",
+                    "groups": [{"name": group} for group in user.get('groups') or ()]
+                }
+            },
+            "src_endpoint": {
+                "ip": source_ips[0] if source_ips else ""
+            },
+            "resources": [
+                {
+                    "type": f"{resource}/{subresource}" if subresource else resource,
+                    "uid": "/".join(part for part in (namespace, resource, name) if part),
+                    "name": name
+                }
+            ],
+            "http_request": {
+                "user_agent": audit.get('userAgent') or "unknown",
+                "url": {
+                    "path": audit.get('requestURI') or ""
+                }
+            },
+            "unmapped": {
+                "namespace": namespace,
+                "api_group": ref.get('apiGroup') or "",
+                "api_version": ref.get('apiVersion') or "",
+                "level": audit.get('level') or "",
+                "decision": (audit.get('annotations') or {}).get('authorization.k8s.io/decision', "")
+            }
+        }
@@ -0,0 +1,326 @@
+"""
+Parquet Output for Security Lake Custom Sources
+Writes OCSF API Activity (class 3005) events as columnar Parquet objects
+
+pyarrow is not part of the Lambda Python runtime; attach a layer that
+provides it (e.g. AWS SDK for pandas) when OUTPUT_FORMAT=parquet.
+"""
+import logging
+from datetime import datetime, timezone
+
+from s3_output import S3ObjectStream
+
+logger = logging.getLogger()
+
+PARQUET_COMPRESSIONS = ('snappy', 'zstd')
+
+# Imported on first use by load_pyarrow(), so JSON output never loads pyarrow
+pa = None
+pq = None
+
+
+def load_pyarrow():
+    """Import pyarrow (only required for Parquet output)"""
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise RuntimeError("OUTPUT_FORMAT=parquet requires pyarrow (attach a pyarrow Lambda layer)")
+        pq = pyarrow.parquet
+        pa = pyarrow
+
+
+def ocsf_api_activity_schema():
+    """
+    Explicit Arrow schema for the OCSF 3005 events built by the transformer
+    """
+    load_pyarrow()
+    product = pa.struct([
+        ('name', pa.string()),
+        ('vendor_name', pa.string()),
+    ])
+
+    return pa.schema([
+        ('metadata', pa.struct([
+            ('version', pa.string()),
+            ('product', product),
+            ('event_code', pa.string()),
+            ('profiles', pa.list_(pa.string())),
+            ('log_name', pa.string()),
+            ('log_provider', pa.string()),
+        ])),
+        ('class_uid', pa.int32()),
+        ('class_name', pa.string()),
+        ('category_uid', pa.int32()),
+        ('category_name', pa.string()),
+        ('severity_id', pa.int32()),
+        ('severity', pa.string()),
+        ('time', pa.int64()),  # epoch milliseconds, as in the JSON output
+        ('api', pa.struct([
+            ('operation', pa.string()),
+            ('service', pa.struct([('name', pa.string())])),
+            ('response', pa.struct([
+                ('code', pa.int32()),
+                ('message', pa.string()),
+            ])),
+        ])),
+        ('actor', pa.struct([
+            ('user', pa.struct([
+                ('uid', pa.string()),
+                ('type', pa.string()),
+            ])),
+        ])),
+        ('cloud', pa.struct([
+            ('provider', pa.string()),
+            ('account', pa.struct([('uid', pa.string())])),
+        ])),
+        ('src_endpoint', pa.struct([('ip', pa.string())])),
+        ('resources', pa.list_(pa.struct([
+            ('type', pa.string()),
+            ('uid', pa.string()),
+            ('name', pa.string()),
+        ]))),
+        ('http_request', pa.struct([
+            ('user_agent', pa.string()),
+            ('http_status', pa.int32()),
+        ])),
+        ('unmapped', pa.struct([
+            ('request_id', pa.string()),
+            ('bytes_sent', pa.int64()),
+            ('object_size', pa.int64()),
+            ('total_time_ms', pa.int64()),
+        ])),
+    ])
+
+
+def ocsf_http_activity_schema(unmapped_fields):
+    """
+    Explicit Arrow schema for OCSF HTTP Activity (class 4002) events;
+    unmapped_fields names the source-specific string fields
+    """
+    load_pyarrow()
+    return pa.schema([
+        ('metadata', pa.struct([
+            ('version', pa.string()),
+            ('product', pa.struct([
+                ('name', pa.string()),
+                ('vendor_name', pa.string()),
+            ])),
+            ('profiles', pa.list_(pa.string())),
+            ('log_name', pa.string()),
+            ('log_provider', pa.string()),
+        ])),
+        ('class_uid', pa.int32()),
+        ('class_name', pa.string()),
+        ('category_uid', pa.int32()),
+        ('category_name', pa.string()),
+        ('activity_id', pa.int32()),
+        ('activity_name', pa.string()),
+        ('type_uid', pa.int64()),
+        ('severity_id', pa.int32()),
+        ('severity', pa.string()),
+        ('time', pa.int64()),  # epoch milliseconds
+        ('duration', pa.int64()),
+        ('http_request', pa.struct([
+            ('http_method', pa.string()),
+            ('url', pa.struct([
+                ('hostname', pa.string()),
+                ('path', pa.string()),
+                ('query_string', pa.string()),
+            ])),
+            ('user_agent', pa.string()),
+            ('referrer', pa.string()),
+            ('version', pa.string()),
+        ])),
+        ('http_response', pa.struct([('code', pa.int32())])),
+        ('src_endpoint', pa.struct([
+            ('ip', pa.string()),
+            ('port', pa.int32()),
+        ])),
+        ('dst_endpoint', pa.struct([
+            ('ip', pa.string()),
+            ('port', pa.int32()),
+        ])),
+        ('traffic', pa.struct([
+            ('bytes_in', pa.int64()),
+            ('bytes_out', pa.int64()),
+        ])),
+        ('cloud', pa.struct([('provider', pa.string())])),
+        ('unmapped', pa.struct([(field, pa.string()) for field in unmapped_fields])),
+    ])
+
+
+def ocsf_kubernetes_api_activity_schema():
+    """
+    Explicit Arrow schema for the OCSF 3005 events built from Kubernetes
+    audit logs
+    """
+    load_pyarrow()
+    return pa.schema([
+        ('metadata', pa.struct([
+            ('version', pa.string()),
+            ('product', pa.struct([
+                ('name', pa.string()),
+                ('vendor_name', pa.string()),
+            ])),
+            ('event_code', pa.string()),
+            ('uid', pa.string()),
+            ('profiles', pa.list_(pa.string())),
+            ('log_name', pa.string()),
+            ('log_provider', pa.string()),
+        ])),
+        ('class_uid', pa.int32()),
+        ('class_name', pa.string()),
+        ('category_uid', pa.int32()),
+        ('category_name', pa.string()),
+        ('activity_id', pa.int32()),
+        ('activity_name', pa.string()),
+        ('type_uid', pa.int64()),
+        ('severity_id', pa.int32()),
+        ('severity', pa.string()),
+        ('time', pa.int64()),  # epoch milliseconds
+        ('api', pa.struct([
+            ('operation', pa.string()),
+            ('request', pa.struct([('uid', pa.string())])),
+            ('service', pa.struct([('name', pa.string())])),
+            ('response', pa.struct([
+                ('code', pa.int32()),
+                ('message', pa.string()),
+            ])),
+        ])),
+        ('actor', pa.struct([
+            ('user', pa.struct([
+                ('name', pa.string()),
+                ('uid', pa.string()),
+                ('type', pa.string()),
+                ('groups', pa.list_(pa.struct([('name', pa.string())]))),
+            ])),
+        ])),
+        ('src_endpoint', pa.struct([('ip', pa.string())])),
+        ('resources', pa.list_(pa.struct([
+            ('type', pa.string()),
+            ('uid', pa.string()),
+            ('name', pa.string()),
+        ]))),
+        ('http_request', pa.struct([
+            ('user_agent', pa.string()),
+            ('url', pa.struct([('path', pa.string())])),
+        ])),
+        ('unmapped', pa.struct([
+            ('namespace', pa.string()),
+            ('api_group', pa.string()),
+            ('api_version', pa.string()),
+            ('level', pa.string()),
+            ('decision', pa.string()),
+        ])),
+    ])
+
+
+def event_day(event):
+    """Security Lake eventDay partition value (UTC) for an OCSF event"""
+    return datetime.fromtimestamp(event['time'] / 1000, tz=timezone.utc).strftime('%Y%m%d')
+
+
+class OcsfParquetWriter:
+    """
+    Accumulates OCSF events into one Parquet object per eventDay partition,
+    using the given Arrow schema (default: S3 access log API Activity)
+
+    Rows are buffered per row group and streamed to S3 as they are encoded;
+    an object is completed on close() or once it reaches max_bytes or
+    max_events (0 = no event limit), whichever comes first.
+    key_for_partition(day, offset) names each object from the source
+    offset of its first event.
+    """
+
+    def __init__(self, s3, bucket, key_for_partition, compression='zstd', row_group_size=50000,
+                 max_bytes=128 * 1024 * 1024, max_events=0, part_size=16 * 1024 * 1024, schema=None):
+        load_pyarrow()
+        if compression not in PARQUET_COMPRESSIONS:
+            raise ValueError(f"Unsupported Parquet compression: {compression}")
+
+        self.s3 = s3
+        self.bucket = bucket
+        self.key_for_partition = key_for_partition
+        self.compression = compression
+        self.row_group_size = row_group_size
+        self.max_bytes = max_bytes
+        self.max_events = max_events
+        self.part_size = part_size
+        self.schema = schema if schema is not None else ocsf_api_activity_schema()
+
+        # eventDay -> open partition state
+        self._partitions = {}
+        self.objects_written = 0
+        self.events_written = 0
+        self.bytes_written = 0
+        self.keys_written = []
+
+    def write(self, event, offset):
+        """Add one OCSF event read at source offset to its eventDay partition"""
+        day = event_day(event)
+        partition = self._partitions.get(day)
+        if partition is None:
+            partition = self._open(day, offset)
+
+        partition['rows'].append(event)
+        pending = partition['count'] + len(partition['rows'])
+        if self.max_events and pending >= self.max_events:
+            self._finish(day)
+        elif len(partition['rows']) >= self.row_group_size:
+            self._flush_row_group(partition)
+            if partition['sink'].tell() >= self.max_bytes:
+                self._finish(day)
+
+    def close(self):
+        """Flush and upload every open partition; returns events written"""
+        for day in list(self._partitions):
+            self._finish(day)
+        return self.events_written
+
+    def abort(self):
+        """Discard every open partition without completing its object"""
+        for partition in self._partitions.values():
+            partition['sink'].abort()
+        self._partitions = {}
+
+    def _open(self, day, offset):
+        sink = S3ObjectStream(
+            self.s3,
+            self.bucket,
+            self.key_for_partition(day, offset),
+            'application/vnd.apache.parquet',
+            self.part_size
+        )
+        partition = {
+            'sink': sink,
+            'writer': pq.ParquetWriter(sink, self.schema, compression=self.compression),
+            'rows': [],
+            'count': 0,
+        }
+        self._partitions[day] = partition
+        return partition
+
+    def _flush_row_group(self, partition):
+        if not partition['rows']:
+            return
+        batch = pa.RecordBatch.from_pylist(partition['rows'], schema=self.schema)
+        partition['writer'].write_batch(batch)
+        partition['count'] += len(partition['rows'])
+        partition['rows'] = []
+
+    def _finish(self, day):
+        partition = self._partitions.pop(day)
+        self._flush_row_group(partition)
+        partition['writer'].close()
+
+        sink = partition['sink']
+        size = sink.close()
+
+        self.objects_written += 1
+        self.events_written += partition['count']
+        self.bytes_written += size
+        self.keys_written.append(sink.key)
+        logger.info(f"Wrote {partition['count']} events ({size} bytes) to s3://{self.bucket}/{sink.key}")
@@ -0,0 +1,262 @@
+"""
+S3 Server Access Log Parsing
+Tokenizes S3 server access log lines into typed records
+
+Format reference:
+https://docs.aws.amazon.com/AmazonS3/latest/userguide/LogFormat.html
+"""
+import re
+from calendar import timegm
+from collections import namedtuple
+
+# Field order as written by S3; trailing fields were added over time and
+# are None on older log lines
+S3_ACCESS_LOG_FIELDS = (
+    'bucket_owner',
+    'bucket',
+    'time',
+    'remote_ip',
+    'requester',
+    'request_id',
+    'operation',
+    'key',
+    'request_uri',
+    'http_status',
+    'error_code',
+    'bytes_sent',
+    'object_size',
+    'total_time',
+    'turn_around_time',
+    'referer',
+    'user_agent',
+    'version_id',
+    'host_id',
+    'signature_version',
+    'cipher_suite',
+    'authentication_type',
+    'host_header',
+    'tls_version',
+    'access_point_arn',
+    'acl_required',
+)
+
+# Lines shorter than this (through http_status) are not usable
+S3_ACCESS_LOG_MIN_FIELDS = S3_ACCESS_LOG_FIELDS.index('http_status') + 1
+
+S3AccessLogRecord = namedtuple(
+    'S3AccessLogRecord',
+    S3_ACCESS_LOG_FIELDS,
+    defaults=(None,) * (len(S3_ACCESS_LOG_FIELDS) - S3_ACCESS_LOG_MIN_FIELDS)
+)
+
+# Field grammars; a '-' placeholder leaves the capture group empty (None)
+_BARE = r'(?:-(?= |$)|([^ ]+))'
+_QUOTED = r'(?:"-"|-(?= |$)|"((?:[^"\\]|\\.)*)")'
+_BRACKETED = r'\[([^\]]*)\]'
+
+_FIELD_GRAMMAR = {
+    'time': _BRACKETED,
+    'request_uri': _QUOTED,
+    'referer': _QUOTED,
+    'user_agent': _QUOTED,
+}
+
+
+def _compile_s3_access_log_pattern():
+    """Build one anchored regex for the whole line; fields after http_status are optional"""
+    grammars = [_FIELD_GRAMMAR.get(field, _BARE) for field in S3_ACCESS_LOG_FIELDS]
+
+    optional_tail = ''
+    for grammar in reversed(grammars[S3_ACCESS_LOG_MIN_FIELDS:]):
+        optional_tail = f'(?: {grammar}{optional_tail})?'
+
+    return re.compile(' '.join(grammars[:S3_ACCESS_LOG_MIN_FIELDS]) + optional_tail)
+
+
+S3_ACCESS_LOG_PATTERN = _compile_s3_access_log_pattern()
+
+_FIELD_COUNT = len(S3_ACCESS_LOG_FIELDS)
+# Fields after user_agent, the last quoted one
+_TAIL_FIELDS = _FIELD_COUNT - S3_ACCESS_LOG_FIELDS.index('user_agent') - 1
+
+
+def _split_s3_access_log_line(line):
+    """
+    str.split fast path for the common line shape, where request_uri,
+    referer and user_agent are all quoted: list of field values, or None
+    for any other shape (escapes, '-' in a quoted position, empty tokens,
+    odd brackets), which is left to the regex
+    """
+    if '\\' in line:
+        return None
+    # head "request_uri" mid "referer" " " "user_agent" tail
+    segments = line.split('"')
+    if len(segments) != 7 or segments[4] != ' ':
+        return None
+
+    head = segments[0].split(' ')
+    mid = segments[2].split(' ')
+    tail = segments[6].split(' ', _TAIL_FIELDS + 1)
+    if len(head) != 10 or head[9] or len(mid) != 8 or mid[0] or mid[7] or tail[0]:
+        return None
+
+    # "[06/Feb/2019:00:00:38 +0000]" is always two tokens
+    opened, closed = head[2], head[3]
+    if opened[:1] != '[' or closed[-1:] != ']':
+        return None
+    time = opened[1:] + ' ' + closed[:-1]
+    if ']' in time:
+        return None
+
+    del head[9], tail[0], tail[_TAIL_FIELDS:]
+    if '' in head or '' in mid[1:7] or '' in tail:
+        return None
+
+    fields = [
+        head[0], head[1], time, head[4], head[5], head[6], head[7], head[8], segments[1],
+        mid[1], mid[2], mid[3], mid[4], mid[5], mid[6], segments[3], segments[5], *tail
+    ]
+    if len(fields) < _FIELD_COUNT:
+        fields += [None] * (_FIELD_COUNT - len(fields))
+    return [None if v == '-' else v for v in fields]
+
+
+def parse_s3_access_log_line(line):
+    """
+    Parse one S3 server access log line into an S3AccessLogRecord
+
+    Brackets and quotes are stripped, '-' placeholders become None and
+    fields beyond the known grammar are ignored. Lines of the common shape
+    are split with str.split (several times cheaper than the regex); any
+    other shape, e.g. escaped quotes, goes through the single-pass regex,
+    which returns None for lines that do not match the access log grammar.
+    """
+    values = _split_s3_access_log_line(line)
+    if values is not None:
+        return S3AccessLogRecord._make(values)
+
+    match = S3_ACCESS_LOG_PATTERN.match(line)
+    if match is None:
+        return None
+
+    return S3AccessLogRecord._make(match.groups())
+
+
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
+
+
+class S3LogTimestampParser:
+    """
+    Parses access log times ("06/Feb/2019:00:00:38 +0000") to epoch millis
+
+    Fixed-offset slicing instead of strptime, honouring the UTC offset.
+    Access logs repeat the same second many times, so results are memoised
+    per timestamp string in a small cache. Unparseable values return None
+    and are counted in .errors rather than replaced with the current time.
+    """
+
+    __slots__ = ('_cache', 'max_cache_size', 'errors')
+
+    def __init__(self, max_cache_size=1024):
+        self._cache = {}
+        self.max_cache_size = max_cache_size
+        self.errors = 0
+
+    def parse(self, timestamp_str):
+        cached = self._cache.get(timestamp_str)
+        if cached is not None:
+            return cached
+
+        try:
+            if len(timestamp_str) != 26 or timestamp_str[20] != ' ':
+                raise ValueError(timestamp_str)
+
+            seconds = timegm((
+                int(timestamp_str[7:11]),     # year
+                MONTHS[timestamp_str[3:6]],   # month
+                int(timestamp_str[0:2]),      # day
+                int(timestamp_str[12:14]),    # hour
+                int(timestamp_str[15:17]),    # minute
+                int(timestamp_str[18:20]),    # second
+            ))
+
+            # "+HHMM" / "-HHMM": local time = UTC + offset
+            offset = int(timestamp_str[22:24]) * 3600 + int(timestamp_str[24:26]) * 60
+            if timestamp_str[21] == '+':
+                seconds -= offset
+            elif timestamp_str[21] == '-':
+                seconds += offset
+            else:
+                raise ValueError(timestamp_str)
+
+        except (ValueError, KeyError, TypeError):
+            self.errors += 1
+            return None
+
+        if len(self._cache) >= self.max_cache_size:
+            self._cache.clear()
+
+        millis = seconds * 1000
+        self._cache[timestamp_str] = millis
+        return millis
+
+
+class TerraformStateLineFilter:
+    """
+    Selects access log entries that touch Terraform state
+
+    candidate_lines() is a cheap case-insensitive byte search over a block
+    of raw log lines, run before decoding and tokenizing: only lines
+    containing a needle are sliced out, the rest never become Python
+    objects. matches() is the exact check on the parsed record. An entry
+    matches when its key contains a marker, its key starts with a
+    configured prefix or it targets a configured state bucket.
+    """
+
+    __slots__ = ('markers', 'buckets', 'key_prefixes', '_needles')
+
+    def __init__(self, markers=('terraform', '.tfstate'), buckets=(), key_prefixes=()):
+        self.markers = tuple(m.lower() for m in markers if m)
+        self.buckets = frozenset(b for b in buckets if b)
+        self.key_prefixes = tuple(p for p in key_prefixes if p)
+
+        needles = self.markers + tuple(self.buckets) + self.key_prefixes
+        self._needles = tuple({n.lower().encode('utf-8') for n in needles})
+
+    def candidate_lines(self, block):
+        """Yield (start, line) for the lines of a raw bytes block that contain any needle"""
+        lowered = block.lower()
+        starts = set()
+
+        for needle in self._needles:
+            pos = lowered.find(needle)
+            while pos != -1:
+                starts.add(lowered.rfind(b'\n', 0, pos) + 1)
+                end = lowered.find(b'\n', pos)
+                if end == -1:
+                    break
+                pos = lowered.find(needle, end)
+
+        for start in sorted(starts):
+            end = block.find(b'\n', start)
+            if end == -1:
+                end = len(block)
+            yield start, block[start:end].rstrip(b'\r')
+
+    def matches(self, record):
+        """Exact check on a parsed S3AccessLogRecord"""
+        key = record.key or ""
+        if record.bucket in self.buckets:
+            return True
+        if self.key_prefixes and key.startswith(self.key_prefixes):
+            return True
+        key_lower = key.lower()
+        return any(marker in key_lower for marker in self.markers)
+
+
+def to_int(value, default=0):
+    """Convert a numeric access log field, falling back to default for '-'/garbage"""
+    return int(value) if value and value.isdigit() else default
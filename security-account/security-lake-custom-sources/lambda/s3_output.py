@@ -0,0 +1,216 @@
+"""
+Security Lake Output Batching
+Coalesces OCSF events into large S3 objects instead of one PUT per 100 events
+
+Objects are closed when they reach a byte target or event count, and in
+any case once the source object is done. Object keys are chosen by the
+caller from the source byte offset of each object's first event, so a
+retry rewrites the same keys. Payloads larger than one part are
+streamed with S3 multipart upload so memory stays bounded by part size.
+"""
+import logging
+
+from ocsf import encode_event
+
+logger = logging.getLogger()
+
+# S3 multipart minimum for every part except the last
+MIN_PART_SIZE = 5 * 1024 * 1024
+
+
+class S3ObjectStream:
+    """
+    Write-only file-like object backed by S3
+
+    Data is buffered until part_size bytes are pending, at which point a
+    multipart upload is started; small objects fall back to one put_object.
+    """
+
+    def __init__(self, s3, bucket, key, content_type, part_size=16 * 1024 * 1024):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = max(part_size, MIN_PART_SIZE)
+
+        self._buffer = bytearray()
+        self._size = 0
+        self._upload_id = None
+        self._parts = []
+        self.closed = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._size += len(data)
+        if len(self._buffer) >= self.part_size:
+            self._upload_part()
+        return len(data)
+
+    def tell(self):
+        return self._size
+
+    def flush(self):
+        pass
+
+    def close(self):
+        """Complete the upload; returns the object size in bytes"""
+        if self.closed:
+            return self._size
+        self.closed = True
+
+        if self._upload_id is None:
+            self.s3.put_object(
+                Bucket=self.bucket,
+                Key=self.key,
+                Body=bytes(self._buffer),
+                ContentType=self.content_type
+            )
+        else:
+            try:
+                if self._buffer:
+                    self._upload_part()
+                self.s3.complete_multipart_upload(
+                    Bucket=self.bucket,
+                    Key=self.key,
+                    UploadId=self._upload_id,
+                    MultipartUpload={'Parts': self._parts}
+                )
+            except Exception:
+                self.abort()
+                raise
+
+        self._buffer = bytearray()
+        return self._size
+
+    def abort(self):
+        """Abort an in-progress multipart upload so no orphaned parts are billed"""
+        self.closed = True
+        if self._upload_id is not None:
+            self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self._upload_id)
+            self._upload_id = None
+
+    def _upload_part(self):
+        if self._upload_id is None:
+            response = self.s3.create_multipart_upload(
+                Bucket=self.bucket,
+                Key=self.key,
+                ContentType=self.content_type
+            )
+            self._upload_id = response['UploadId']
+
+        part_number = len(self._parts) + 1
+        response = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self._upload_id,
+            PartNumber=part_number,
+            Body=bytes(self._buffer)
+        )
+        self._parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+        self._buffer = bytearray()
+
+
+class JsonBatchWriter:
+    """
+    Writes OCSF events as {"events": [...]} JSON objects of up to
+    max_bytes / max_events (0 = no event limit) each
+
+    key_for_object(offset) names each object from the source offset of
+    its first event.
+    """
+
+    def __init__(self, s3, bucket, key_for_object, max_bytes, max_events=0, part_size=16 * 1024 * 1024):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key_for_object = key_for_object
+        self.max_bytes = max_bytes
+        self.max_events = max_events
+        self.part_size = part_size
+
+        self._stream = None
+        self._count = 0
+        self.objects_written = 0
+        self.events_written = 0
+        self.bytes_written = 0
+        self.keys_written = []
+
+    def write(self, event, offset):
+        """Append one OCSF event read at source offset, rolling to a new object when limits are hit"""
+        encoded = encode_event(event)
+
+        if self._stream is not None and (
+            self._stream.tell() + len(encoded) + 2 > self.max_bytes
+            or (self.max_events and self._count >= self.max_events)
+        ):
+            self._finish_object()
+
+        if self._stream is None:
+            self._stream = S3ObjectStream(
+                self.s3,
+                self.bucket,
+                self.key_for_object(offset),
+                'application/json',
+                self.part_size
+            )
+            self._stream.write(b'{"events": [')
+        else:
+            self._stream.write(b', ')
+
+        self._stream.write(encoded)
+        self._count += 1
+
+    def close(self):
+        """Flush the open object; returns events written"""
+        if self._stream is not None:
+            self._finish_object()
+        return self.events_written
+
+    def abort(self):
+        """Discard the open object without completing it"""
+        if self._stream is not None:
+            self._stream.abort()
+            self._stream = None
+            self._count = 0
+
+    def _finish_object(self):
+        stream = self._stream
+        self._stream = None
+        stream.write(b']}')
+        size = stream.close()
+
+        self.objects_written += 1
+        self.events_written += self._count
+        self.bytes_written += size
+        self.keys_written.append(stream.key)
+        logger.info(f"Wrote {self._count} events ({size} bytes) to s3://{self.bucket}/{stream.key}")
+        self._count = 0
+
+
+class DeliverySummary:
+    """
+    Counters and object keys of finished writers; picklable, so shard
+    worker processes can hand their results back to the parent
+    """
+
+    __slots__ = ('objects_written', 'events_written', 'bytes_written', 'keys_written')
+
+    def __init__(self, writers=()):
+        self.objects_written = sum(w.objects_written for w in writers)
+        self.events_written = sum(w.events_written for w in writers)
+        self.bytes_written = sum(w.bytes_written for w in writers)
+        self.keys_written = [k for w in writers for k in w.keys_written]
+
+
+def delivery_metrics(writers):
+    """Delivery summary across one or more writers or DeliverySummary objects"""
+    objects = sum(w.objects_written for w in writers)
+    total_bytes = sum(w.bytes_written for w in writers)
+    return {
+        'objects_written': objects,
+        'events_written': sum(w.events_written for w in writers),
+        'bytes_written': total_bytes,
+        'bytes_per_object': total_bytes // objects if objects else 0,
+    }
@@ -0,0 +1,115 @@
+"""
+Log Source Registry
+Routes S3 objects to the parser of their custom log source
+
+Sources are registered under bucket names (or ANY_BUCKET) and object key
+prefixes. Each bucket's prefixes are precompiled into a character trie,
+so routing walks the key once, O(key length), however many sources and
+prefixes are registered; the longest matching prefix wins.
+"""
+
+ANY_BUCKET = '*'
+
+
+class LogSource:
+    """
+    One custom log source: a transform generator
+    transform(data, bucket, key, shard=None) -> (offset, OCSF event), the
+    Security Lake custom source name it is delivered under and the Arrow
+    schema factory used for Parquet output
+    """
+
+    __slots__ = ('name', 'log_type', 'custom_source_name', 'transform', 'parquet_schema')
+
+    def __init__(self, name, log_type, custom_source_name, transform, parquet_schema):
+        self.name = name
+        self.log_type = log_type
+        self.custom_source_name = custom_source_name
+        self.transform = transform
+        self.parquet_schema = parquet_schema
+
+    def __repr__(self):
+        return f"LogSource({self.name!r})"
+
+
+class PrefixTrie:
+    """Character trie mapping key prefixes to values, longest match wins"""
+
+    __slots__ = ('_root',)
+
+    def __init__(self):
+        # node = [children by character, value or None]
+        self._root = [{}, None]
+
+    def insert(self, prefix, value):
+        """Map prefix to value; a prefix that is already mapped raises ValueError"""
+        node = self._root
+        for char in prefix:
+            node = node[0].setdefault(char, [{}, None])
+        if node[1] is not None:
+            raise ValueError(f"Prefix {prefix!r} is already routed to {node[1]!r}")
+        node[1] = value
+
+    def get(self, prefix):
+        """Value mapped to exactly prefix, or None"""
+        node = self._root
+        for char in prefix:
+            node = node[0].get(char)
+            if node is None:
+                return None
+        return node[1]
+
+    def longest_match(self, text):
+        node = self._root
+        match = node[1]
+        for char in text:
+            node = node[0].get(char)
+            if node is None:
+                break
+            if node[1] is not None:
+                match = node[1]
+        return match
+
+
+class SourceRegistry:
+    """Bucket and key prefix routing table for LogSource parsers"""
+
+    def __init__(self):
+        self._tries = {}
+        self._sources = {}
+
+    def register(self, source, buckets=(ANY_BUCKET,), prefixes=('',)):
+        """
+        Route keys starting with any of prefixes in any of buckets to source;
+        raises ValueError, before routing anything, when one of these
+        bucket/prefix routes is already registered
+        """
+        for bucket in buckets:
+            trie = self._tries.get(bucket)
+            for prefix in prefixes:
+                existing = trie.get(prefix) if trie is not None else None
+                if existing is not None:
+                    raise ValueError(f"Duplicate route for {source!r}: {bucket}/{prefix} is already routed to {existing!r}")
+
+        self._sources[source.name] = source
+        for bucket in buckets:
+            trie = self._tries.setdefault(bucket, PrefixTrie())
+            for prefix in set(prefixes):
+                trie.insert(prefix, source)
+
+    def route(self, bucket, key):
+        """LogSource for an object, or None; bucket-specific routes take precedence"""
+        trie = self._tries.get(bucket)
+        if trie is not None:
+            source = trie.longest_match(key)
+            if source is not None:
+                return source
+
+        trie = self._tries.get(ANY_BUCKET)
+        return trie.longest_match(key) if trie is not None else None
+
+    def get(self, name):
+        return self._sources.get(name)
+
+    def __iter__(self):
+        return iter(self._sources.values())
@@ -26,6 +26,15 @@ locals {
 
   # Reference to existing bucket (Terraform State Access Logs only)
   terraform_state_logs_bucket_name = "workload-account-terraform-state-access-logs"
+
+  # Security Lake custom source per additional log source type
+  additional_source_types = {
+    cloudfront = { source_name = "CloudFrontAccess", event_class = "HTTP_ACTIVITY" } # OCSF class 4002
+    alb        = { source_name = "ALBAccess", event_class = "HTTP_ACTIVITY" }        # OCSF class 4002
+    k8s_audit  = { source_name = "KubernetesAudit", event_class = "API_ACTIVITY" }   # OCSF class 3005
+  }
+
+  additional_source_buckets = toset([for source in values(var.additional_log_sources) : source.bucket])
 }
 
 ############################################
@@ -51,10 +60,65 @@ resource "aws_securitylake_custom_log_source" "terraform_state_access" {
   }
 }
 
+############################################
+# 1b. Security Lake Custom Sources - Additional log sources
+# Routed by the same Lambda (see additional_log_sources)
+############################################
+resource "aws_securitylake_custom_log_source" "additional" {
+  for_each = var.additional_log_sources
+
+  source_name    = local.additional_source_types[each.key].source_name
+  source_version = "1.0"
+
+  event_classes = [
+    local.additional_source_types[each.key].event_class
+  ]
+
+  configuration {
+    crawler_configuration {
+      role_arn = aws_iam_role.security_lake_crawler.arn
+    }
+
+    provider_identity {
+      external_id = "${each.key}-custom-source-${local.security_account_id}"
+      principal   = aws_iam_role.lambda_ocsf_transformer.arn
+    }
+  }
+}
+
 ############################################
 # 2. Lambda Function for OCSF Transformation
 # transforms Terraform State Access Logs
 ############################################
+locals {
+  # Shared by the transformer and the backfill function
+  transformer_environment = {
+    SECURITY_LAKE_CUSTOM_SOURCE_NAME_TERRAFORM = aws_securitylake_custom_log_source.terraform_state_access.source_name
+    OCSF_VERSION                               = "1.1.0"
+    TERRAFORM_STATE_LOGS_BUCKET                = local.terraform_state_logs_bucket_name
+    OUTPUT_FORMAT                              = var.output_format
+    PARQUET_COMPRESSION                        = var.parquet_compression
+    BATCH_MAX_MB                               = var.batch_max_mb
+    BATCH_MAX_EVENTS                           = var.batch_max_events
+    RECORD_WORKERS                             = var.record_workers
+    TERRAFORM_STATE_BUCKETS                    = join(",", var.terraform_state_bucket_names)
+    TERRAFORM_STATE_KEY_PREFIXES               = join(",", var.terraform_state_key_prefixes)
+    CHECKPOINT_PREFIX                          = var.checkpoint_prefix
+    SHARD_WORKERS                              = var.shard_workers
+    SHARD_MIN_MB                               = var.shard_min_mb
+    METRICS_NAMESPACE                          = var.metrics_namespace
+    LOG_SOURCES = jsonencode({
+      for name, source in var.additional_log_sources : name => {
+        buckets            = [source.bucket]
+        prefixes           = source.prefixes
+        custom_source_name = aws_securitylake_custom_log_source.additional[name].source_name
+      }
+    })
+  }
+
+  backfill_function_name = "SecurityLakeTerraformStateBackfill"
+}
+
 resource "aws_lambda_function" "ocsf_transformer" {
   function_name = "SecurityLakeTerraformStateTransformer"
   description   = "Transform Terraform State access logs to OCSF format for Security Lake"
@@ -62,17 +126,16 @@ resource "aws_lambda_function" "ocsf_transformer" {
   handler       = "lambda_function.lambda_handler"
   role          = aws_iam_role.lambda_ocsf_transformer.arn
   timeout       = 300
-  memory_size   = 512 # Reduced from 1024 since we only process text logs
+  memory_size   = var.lambda_memory_size
 
   filename         = data.archive_file.lambda_zip.output_path
   source_code_hash = data.archive_file.lambda_zip.output_base64sha256
 
+  # pyarrow layer, required when output_format = "parquet"
+  layers = var.lambda_layer_arns
+
   environment {
-    variables = {
-      SECURITY_LAKE_CUSTOM_SOURCE_NAME_TERRAFORM = aws_securitylake_custom_log_source.terraform_state_access.source_name
-      OCSF_VERSION                               = "1.1.0"
-      TERRAFORM_STATE_LOGS_BUCKET                = local.terraform_state_logs_bucket_name
-    }
+    variables = local.transformer_environment
   }
 
   tags = merge(local.common_tags, {
@@ -80,6 +143,41 @@ resource "aws_lambda_function" "ocsf_transformer" {
   })
 }
 
+############################################
+# 2b. Lambda Function for Bulk Backfill
+# Same package and role; invoked on demand with a job (see README)
+############################################
+resource "aws_lambda_function" "ocsf_backfill" {
+  count = var.enable_backfill ? 1 : 0
+
+  function_name = local.backfill_function_name
+  description   = "Backfill historical Terraform State access logs to OCSF format for Security Lake"
+  runtime       = "python3.11"
+  handler       = "backfill.lambda_handler"
+  role          = aws_iam_role.lambda_ocsf_transformer.arn
+  timeout       = 900
+  memory_size   = var.lambda_memory_size
+
+  filename         = data.archive_file.lambda_zip.output_path
+  source_code_hash = data.archive_file.lambda_zip.output_base64sha256
+
+  layers = var.lambda_layer_arns
+
+  environment {
+    variables = merge(local.transformer_environment, {
+      RECORD_WORKERS           = var.backfill_workers
+      BACKFILL_STATE_PREFIX    = var.backfill_state_prefix
+      BACKFILL_BATCH_OBJECTS   = var.backfill_batch_objects
+      BACKFILL_BATCH_MB        = var.backfill_batch_mb
+      BACKFILL_RESERVE_SECONDS = var.backfill_reserve_seconds
+    })
+  }
+
+  tags = merge(local.common_tags, {
+    Name = local.backfill_function_name
+  })
+}
+
 # Package Lambda function
 data "archive_file" "lambda_zip" {
   type        = "zip"
@@ -116,6 +214,43 @@ resource "aws_s3_bucket_notification" "terraform_state_logs" {
   ]
 }
 
+############################################
+# 5b. S3 Event Notifications - Additional log sources
+############################################
+resource "aws_lambda_permission" "allow_s3_additional" {
+  for_each = local.additional_source_buckets
+
+  statement_id  = "AllowExecutionFromS3-${replace(each.value, ".", "-")}"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.ocsf_transformer.function_name
+  principal     = "s3.amazonaws.com"
+  source_arn    = "arn:aws:s3:::${each.value}"
+}
+
+resource "aws_s3_bucket_notification" "additional" {
+  for_each = local.additional_source_buckets
+
+  bucket = each.value
+
+  dynamic "lambda_function" {
+    for_each = flatten([
+      for name, source in var.additional_log_sources : [
+        for prefix in source.prefixes : prefix
+      ] if source.bucket == each.value
+    ])
+
+    content {
+      lambda_function_arn = aws_lambda_function.ocsf_transformer.arn
+      events              = ["s3:ObjectCreated:*"]
+      filter_prefix       = lambda_function.value == "" ? null : lambda_function.value
+    }
+  }
+
+  depends_on = [
+    aws_lambda_permission.allow_s3_additional
+  ]
+}
+
 ############################################
 # 6. CloudWatch Log Group for Lambda
 ############################################
@@ -129,6 +264,18 @@ resource "aws_cloudwatch_log_group" "lambda_logs" {
   })
 }
 
+resource "aws_cloudwatch_log_group" "backfill_logs" {
+  count = var.enable_backfill ? 1 : 0
+
+  name              = "/aws/lambda/${local.backfill_function_name}"
+  retention_in_days = 30
+  kms_key_id        = var.kms_key_arn
+
+  tags = merge(local.common_tags, {
+    Name = "SecurityLakeOCSFBackfillLogs"
+  })
+}
+
 ############################################
 # 7. CloudWatch Alarms for Monitoring
 ############################################
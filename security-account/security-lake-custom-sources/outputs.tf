@@ -25,11 +25,22 @@ output "lambda_cloudwatch_log_group" {
 
 output "custom_sources" {
   description = "Security Lake custom sources information"
-  value = {
+  value = merge({
     terraform_state_access = {
       name    = aws_securitylake_custom_log_source.terraform_state_access.source_name
       version = aws_securitylake_custom_log_source.terraform_state_access.source_version
       id      = aws_securitylake_custom_log_source.terraform_state_access.id
     }
-  }
+    }, {
+    for name, source in aws_securitylake_custom_log_source.additional : name => {
+      name    = source.source_name
+      version = source.source_version
+      id      = source.id
+    }
+  })
+}
+
+output "backfill_function_name" {
+  description = "Name of the backfill Lambda function (null when enable_backfill is false)"
+  value       = var.enable_backfill ? aws_lambda_function.ocsf_backfill[0].function_name : null
 }
@@ -17,3 +17,146 @@ variable "security_lake_data_lake_arn" {
   type        = string
   default     = ""
 }
+
+variable "output_format" {
+  description = "Security Lake output format for transformed events: json or parquet (parquet requires a pyarrow layer)"
+  type        = string
+  default     = "json"
+
+  validation {
+    condition     = contains(["json", "parquet"], var.output_format)
+    error_message = "output_format must be \"json\" or \"parquet\"."
+  }
+}
+
+variable "parquet_compression" {
+  description = "Parquet compression codec when output_format is parquet: snappy or zstd"
+  type        = string
+  default     = "zstd"
+
+  validation {
+    condition     = contains(["snappy", "zstd"], var.parquet_compression)
+    error_message = "parquet_compression must be \"snappy\" or \"zstd\"."
+  }
+}
+
+variable "batch_max_mb" {
+  description = "Close a Security Lake output object once it reaches this size in MB (objects are always flushed at the end of an invocation)"
+  type        = number
+  default     = 64
+}
+
+variable "batch_max_events" {
+  description = "Close a Security Lake output object once it holds this many events (0 = no event limit)"
+  type        = number
+  default     = 0
+}
+
+variable "record_workers" {
+  description = "Number of S3 notification records the OCSF transformer processes concurrently per invocation"
+  type        = number
+  default     = 4
+}
+
+variable "terraform_state_bucket_names" {
+  description = "Terraform state bucket names; access log entries for these buckets are always transformed"
+  type        = list(string)
+  default     = []
+}
+
+variable "terraform_state_key_prefixes" {
+  description = "Object key prefixes that identify Terraform state in shared buckets (in addition to keys containing 'terraform' or '.tfstate')"
+  type        = list(string)
+  default     = []
+}
+
+variable "additional_log_sources" {
+  description = "Additional custom sources transformed by the same Lambda, keyed by type (cloudfront, alb, k8s_audit): the bucket their logs land in and the key prefixes routed to that parser. Buckets must not be the Terraform state logs bucket"
+  type = map(object({
+    bucket   = string
+    prefixes = optional(list(string), [""])
+  }))
+  default = {}
+
+  validation {
+    condition     = alltrue([for name in keys(var.additional_log_sources) : contains(["cloudfront", "alb", "k8s_audit"], name)])
+    error_message = "additional_log_sources keys must be \"cloudfront\", \"alb\" or \"k8s_audit\"."
+  }
+
+  validation {
+    condition     = length(flatten([for source in values(var.additional_log_sources) : [for prefix in source.prefixes : "${source.bucket}/${prefix}"]])) == length(distinct(flatten([for source in values(var.additional_log_sources) : [for prefix in source.prefixes : "${source.bucket}/${prefix}"]])))
+    error_message = "additional_log_sources must not route the same bucket and prefix to more than one source."
+  }
+}
+
+variable "checkpoint_prefix" {
+  description = "Prefix in the Terraform state logs bucket for processed-object checkpoint markers, so redelivered S3 events are skipped (empty string disables); expired by the bucket's ocsf_checkpoint_prefix lifecycle rule in cross-account-roles, so keep the two equal"
+  type        = string
+  default     = "ocsf-checkpoints/"
+}
+
+variable "metrics_namespace" {
+  description = "CloudWatch namespace for the per-invocation Embedded Metric Format metrics (empty string disables)"
+  type        = string
+  default     = "SecurityLake/OCSFTransformer"
+}
+
+variable "shard_workers" {
+  description = "Worker processes used to transform one large access log object in parallel byte ranges (1 = disabled); match to the vCPUs given by lambda_memory_size"
+  type        = number
+  default     = 1
+}
+
+variable "shard_min_mb" {
+  description = "Minimum access log object size in MB before it is split across shard_workers"
+  type        = number
+  default     = 64
+}
+
+variable "lambda_memory_size" {
+  description = "OCSF transformer memory in MB; vCPUs scale with memory (about 6 vCPUs at 10240)"
+  type        = number
+  default     = 512
+}
+
+variable "lambda_layer_arns" {
+  description = "Lambda layer ARNs for the OCSF transformer (e.g. AWS SDK for pandas layer providing pyarrow; zstandard for zstd compressed logs)"
+  type        = list(string)
+  default     = []
+}
+
+variable "enable_backfill" {
+  description = "Deploy the backfill Lambda, which transforms historical logs listed from a bucket/prefix/date range or an S3 manifest (invoked on demand, never by S3 events)"
+  type        = bool
+  default     = false
+}
+
+variable "backfill_workers" {
+  description = "Backfill batches transformed concurrently per invocation (RECORD_WORKERS of the backfill Lambda)"
+  type        = number
+  default     = 8
+}
+
+variable "backfill_batch_objects" {
+  description = "Source log objects per backfill batch; each batch is delivered as consolidated Security Lake objects"
+  type        = number
+  default     = 200
+}
+
+variable "backfill_batch_mb" {
+  description = "Maximum source MB per backfill batch"
+  type        = number
+  default     = 256
+}
+
+variable "backfill_reserve_seconds" {
+  description = "The backfill Lambda stops starting batches and source objects with this many seconds left, delivers the batches in flight, checkpoints and invokes itself to resume; keep one source object plus a batch's output upload well within it"
+  type        = number
+  default     = 120
+}
+
+variable "backfill_state_prefix" {
+  description = "Prefix, in the bucket of each backfill job, for its plan and progress checkpoint; expired in the Terraform state logs bucket by the ocsf_backfill_state_prefix lifecycle rule in cross-account-roles, so keep the two equal"
+  type        = string
+  default     = "ocsf-backfill/"
+}
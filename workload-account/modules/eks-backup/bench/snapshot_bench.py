@@ -0,0 +1,953 @@
+#!/usr/bin/env python3
+"""
+Local Benchmark Harness for the EKS Backup Lambdas
+
+Drives the functions in lambda_functions/ against a stubbed EC2: a real
+botocore client whose calls are answered in memory by before-call hooks,
+so paginators, parameter validation and ClientError handling behave as
+they do against AWS, with optional per-call latency and no AWS account.
+
+Usage:
+    pip install -r bench/requirements.txt
+
+    # Volume discovery on a 3000-node cluster with 20 ms per EC2 call
+    python bench/snapshot_bench.py discovery --nodes 3000 --latency-ms 20
+
+    # Snapshot creation for 500 volumes, per volume and per instance
+    python bench/snapshot_bench.py create --nodes 200 --latency-ms 50
+    python bench/snapshot_bench.py create --nodes 200 --latency-ms 50 --mode instance
+
+    # Change detection on a mostly idle cluster (80% of volumes without writes)
+    python bench/snapshot_bench.py skip --nodes 1000 --idle-ratio 0.8
+
+    # Retention over 50k snapshots, flat and grandfather-father-son
+    python bench/snapshot_bench.py retention --snapshots 50000
+    python bench/snapshot_bench.py retention --snapshots 50000 --daily 7 --weekly 4 --monthly 12
+
+    # Velero bucket cleanup, prefix mode vs the full-bucket scan
+    python bench/snapshot_bench.py cleanup --kopia-objects 500000 --latency-ms 20
+
+    # Inventory-driven cleanup from generated CSV / Parquet reports
+    python bench/snapshot_bench.py inventory --kopia-objects 500000
+    python bench/snapshot_bench.py inventory --kopia-objects 500000 --engine python
+    python bench/snapshot_bench.py inventory --kopia-objects 500000 --format Parquet
+"""
+import argparse
+import bisect
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote_plus
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda_functions')
+
+REGION = 'us-east-1'
+CLUSTER_NAME = 'bench-cluster'
+CLUSTER_TAG = f'kubernetes.io/cluster/{CLUSTER_NAME}'
+VELERO_BUCKET = 'bench-velero-backups'
+INVENTORY_BUCKET = 'bench-backup-inventory'
+
+
+class FakeHttpResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+
+
+class FakeAws:
+    """
+    Answers the calls of boto3 clients it is installed on from _op_<Operation>
+    methods, after latency_ms, counting calls per operation
+    """
+
+    def __init__(self, latency_ms=0):
+        self.latency_ms = latency_ms
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def install(self, client):
+        service = client.meta.service_model.service_id.hyphenize()
+        client.meta.events.register(f'before-parameter-build.{service}', self._capture_params)
+        client.meta.events.register(f'before-call.{service}', self._dispatch)
+        return client
+
+    def _capture_params(self, params, context, **kwargs):
+        context['fake_params'] = dict(params)
+
+    def _dispatch(self, model, context, **kwargs):
+        with self._lock:
+            self.calls[model.name] = self.calls.get(model.name, 0) + 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+        params = context.get('fake_params', {})
+        try:
+            handler = getattr(self, f'_op_{model.name}')
+            return FakeHttpResponse(200), handler(params)
+        except FakeEc2Error as e:
+            return FakeHttpResponse(400), {'Error': {'Code': e.code, 'Message': str(e)}, 'ResponseMetadata': {}}
+
+
+class FakeEc2(FakeAws):
+    """
+    In-memory EC2 instances, volumes and snapshots (and the CloudWatch
+    VolumeWriteOps of the volumes) served to boto3 EC2/CloudWatch clients
+
+    Filters follow EC2 semantics (OR within a filter's values, AND across
+    filters, tag:<key> filters), results are paginated with NextToken and
+    more than max_filter_values values in one filter is rejected, as EC2 does.
+    """
+
+    # operation -> (result key, default page size when MaxResults is absent)
+    PAGINATED = {
+        'DescribeInstances': ('Reservations', 1000),
+        'DescribeVolumes': ('Volumes', 500),
+        'DescribeSnapshots': ('Snapshots', 1000),
+    }
+
+    def __init__(self, latency_ms=0, max_filter_values=200):
+        super().__init__(latency_ms)
+        self.max_filter_values = max_filter_values
+        self.instances = []
+        self.volumes = []
+        self.snapshots = []
+        # VolumeId -> [(timestamp, write ops)]
+        self.write_ops = {}
+        # Filtered snapshot lists reused across the pages of one listing
+        self._snapshot_cache = {}
+        self.deleted = set()
+
+    def _filtered(self, items, params, id_key, fields):
+        ids = params.get(id_key + 's')
+        if ids:
+            wanted = set(ids)
+            items = [item for item in items if item[id_key] in wanted]
+
+        for item_filter in params.get('Filters', []):
+            values = item_filter['Values']
+            if len(values) > self.max_filter_values:
+                raise FakeEc2Error('FilterLimitExceeded', f"The maximum number of filter values is {self.max_filter_values}")
+            name = item_filter['Name']
+            wanted = set(values)
+            if name.startswith('tag:'):
+                key = name[4:]
+                items = [item for item in items if tag_value(item, key) in wanted]
+            else:
+                field = fields[name]
+                items = [item for item in items if wanted.intersection(field(item))]
+        return items
+
+    def _page(self, operation, items, params):
+        result_key, default_size = self.PAGINATED[operation]
+        start = int(params.get('NextToken') or 0)
+        size = params.get('MaxResults') or default_size
+        page = {result_key: items[start:start + size], 'ResponseMetadata': {}}
+        if start + size < len(items):
+            page['NextToken'] = str(start + size)
+        return page
+
+    def _op_DescribeInstances(self, params):
+        instances = self._filtered(self.instances, params, 'InstanceId', {
+            'instance-state-name': lambda i: [i['State']['Name']],
+        })
+        page = self._page('DescribeInstances', instances, params)
+        page['Reservations'] = [{'Instances': [instance]} for instance in page['Reservations']]
+        return page
+
+    def _op_DescribeVolumes(self, params):
+        volumes = self._filtered(self.volumes, params, 'VolumeId', {
+            'attachment.instance-id': lambda v: [a['InstanceId'] for a in v['Attachments']],
+            'status': lambda v: [v['State']],
+        })
+        return self._page('DescribeVolumes', volumes, params)
+
+    def _op_DescribeSnapshots(self, params):
+        key = json.dumps([params.get('Filters'), params.get('SnapshotIds')], sort_keys=True)
+        snapshots = self._snapshot_cache.get(key)
+        if snapshots is None:
+            snapshots = self._filtered(self.snapshots, params, 'SnapshotId', {
+                'volume-id': lambda s: [s['VolumeId']],
+                'status': lambda s: [s['State']],
+            })
+            self._snapshot_cache[key] = snapshots
+        return self._page('DescribeSnapshots', snapshots, params)
+
+    def _op_DeleteSnapshot(self, params):
+        with self._lock:
+            self.deleted.add(params['SnapshotId'])
+        return {'ResponseMetadata': {}}
+
+    def _new_snapshot(self, volume, params, tags):
+        with self._lock:
+            snapshot_id = f'snap-{len(self.snapshots):017x}'
+            snapshot = {
+                'SnapshotId': snapshot_id,
+                'VolumeId': volume['VolumeId'],
+                'VolumeSize': volume['Size'],
+                'State': 'pending',
+                'StartTime': datetime.now(timezone.utc),
+                'Description': params.get('Description', ''),
+                'Tags': list(tags),
+            }
+            self.snapshots.append(snapshot)
+            self._snapshot_cache = {}
+        return snapshot
+
+    def _volume(self, volume_id):
+        for volume in self.volumes:
+            if volume['VolumeId'] == volume_id:
+                return volume
+        raise FakeEc2Error('InvalidVolume.NotFound', f"The volume '{volume_id}' does not exist.")
+
+    @staticmethod
+    def _unique_tags(tags):
+        # EC2 rejects a request whose tags repeat a key
+        keys = [tag['Key'] for tag in tags]
+        if len(keys) != len(set(keys)):
+            raise FakeEc2Error('InvalidParameterValue', 'Duplicate tag key in request')
+        return tags
+
+    def _op_CreateSnapshot(self, params):
+        tags = [t for spec in params.get('TagSpecifications', []) for t in spec['Tags']]
+        return self._new_snapshot(self._volume(params['VolumeId']), params, self._unique_tags(tags))
+
+    def _op_CreateSnapshots(self, params):
+        instance_id = params['InstanceSpecification']['InstanceId']
+        tags = [t for spec in params.get('TagSpecifications', []) for t in spec['Tags']]
+        snapshots = []
+        for volume in self.volumes:
+            if any(a['InstanceId'] == instance_id for a in volume['Attachments']):
+                copied = volume.get('Tags', []) if params.get('CopyTagsFromSource') == 'volume' else []
+                snapshots.append(self._new_snapshot(volume, params, self._unique_tags(copied + tags)))
+        return {'Snapshots': snapshots, 'ResponseMetadata': {}}
+
+    def _op_GetMetricData(self, params):
+        results = []
+        for query in params['MetricDataQueries']:
+            volume_id = query['MetricStat']['Metric']['Dimensions'][0]['Value']
+            points = [
+                (timestamp, value) for timestamp, value in self.write_ops.get(volume_id, [])
+                if params['StartTime'] <= timestamp < params['EndTime']
+            ]
+            results.append({
+                'Id': query['Id'],
+                'Timestamps': [timestamp for timestamp, _ in points],
+                'Values': [value for _, value in points],
+                'StatusCode': 'Complete',
+            })
+        return {'MetricDataResults': results, 'ResponseMetadata': {}}
+
+    def _op_CreateTags(self, params):
+        by_id = {snapshot['SnapshotId']: snapshot for snapshot in self.snapshots}
+        for resource_id in params['Resources']:
+            # Existing keys are overwritten
+            new_keys = {tag['Key'] for tag in self._unique_tags(params['Tags'])}
+            tags = by_id[resource_id]['Tags']
+            tags[:] = [tag for tag in tags if tag['Key'] not in new_keys] + params['Tags']
+        return {'ResponseMetadata': {}}
+
+
+class FakeS3(FakeAws):
+    """
+    In-memory S3 buckets with ListObjectsV2 prefix/delimiter listing in key
+    order, 1000 entries per page, GetObject, HeadObject and DeleteObjects
+    """
+
+    def __init__(self, latency_ms=0):
+        super().__init__(latency_ms)
+        # bucket -> sorted keys, and (bucket, key) -> (LastModified, body)
+        self.keys = {}
+        self.objects = {}
+        # Keys deleted from any bucket; they stay in the index
+        self.deleted = set()
+
+    def add_objects(self, bucket, objects, body=b''):
+        for key, last_modified in objects.items():
+            self.objects[bucket, key] = (last_modified, body)
+        self.keys[bucket] = sorted(set(self.keys.get(bucket, [])).union(objects))
+
+    def put(self, bucket, key, body):
+        self.add_objects(bucket, {key: datetime.now(timezone.utc)}, body)
+
+    def _object(self, params):
+        found = self.objects.get((params['Bucket'], params['Key']))
+        if found is None or params['Key'] in self.deleted:
+            raise FakeEc2Error('NoSuchKey', 'The specified key does not exist.')
+        return found
+
+    def _op_GetObject(self, params):
+        last_modified, body = self._object(params)
+        return {'Body': io.BytesIO(body), 'ContentLength': len(body), 'LastModified': last_modified, 'ResponseMetadata': {}}
+
+    def _op_HeadObject(self, params):
+        last_modified, body = self._object(params)
+        return {'ContentLength': len(body), 'LastModified': last_modified, 'ResponseMetadata': {}}
+
+    def _op_ListObjectsV2(self, params):
+        keys = self.keys.get(params['Bucket'], [])
+        prefix = params.get('Prefix', '')
+        delimiter = params.get('Delimiter')
+        limit = params.get('MaxKeys') or 1000
+        token = params.get('ContinuationToken')
+
+        start = bisect.bisect_left(keys, prefix)
+        if params.get('StartAfter'):
+            start = max(start, bisect.bisect_right(keys, params['StartAfter']))
+        if token:
+            # The token is the last key or common prefix returned
+            start = bisect.bisect_right(keys, token)
+            if delimiter and token.endswith(delimiter):
+                start = bisect.bisect_left(keys, token[:-1] + chr(ord(delimiter) + 1))
+
+        contents, prefixes, last = [], [], None
+        while start < len(keys) and len(contents) + len(prefixes) < limit:
+            key = keys[start]
+            if not key.startswith(prefix):
+                break
+            cut = key.find(delimiter, len(prefix)) if delimiter else -1
+            if cut >= 0:
+                common = key[:cut + 1]
+                prefixes.append({'Prefix': common})
+                last = common
+                start = bisect.bisect_left(keys, common[:-1] + chr(ord(delimiter) + 1))
+                continue
+            if key not in self.deleted:
+                contents.append({'Key': key, 'LastModified': self.objects[params['Bucket'], key][0], 'Size': 1024})
+            last = key
+            start += 1
+
+        truncated = start < len(keys) and keys[start].startswith(prefix)
+        page = {'IsTruncated': truncated, 'KeyCount': len(contents) + len(prefixes), 'ResponseMetadata': {}}
+        if contents:
+            page['Contents'] = contents
+        if prefixes:
+            page['CommonPrefixes'] = prefixes
+        if truncated:
+            page['NextContinuationToken'] = last
+        return page
+
+    def _op_DeleteObjects(self, params):
+        keys = [obj['Key'] for obj in params['Delete']['Objects']]
+        with self._lock:
+            self.deleted.update(keys)
+        return {'Deleted': [{'Key': key} for key in keys], 'ResponseMetadata': {}}
+
+
+class FakeEc2Error(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def tag_value(item, key):
+    for tag in item.get('Tags', []):
+        if tag['Key'] == key:
+            return tag['Value']
+    return None
+
+
+def build_cluster(ec2, nodes, volumes_per_node, pvcs, other_nodes, seed=0):
+    """
+    nodes cluster instances with a root volume and volumes_per_node data
+    volumes each, pvcs cluster-tagged volumes (a third of them detached)
+    and other_nodes unrelated instances; returns the expected volume IDs
+    """
+    rng = random.Random(seed)
+    expected = set()
+
+    def new_volume(instance_id, tags):
+        volume_id = f'vol-{rng.getrandbits(64):017x}'
+        ec2.volumes.append({
+            'VolumeId': volume_id,
+            'Size': rng.choice((20, 50, 100)),
+            'State': 'in-use' if instance_id else 'available',
+            'Attachments': [{'InstanceId': instance_id, 'State': 'attached'}] if instance_id else [],
+            'Tags': tags,
+        })
+        return volume_id
+
+    cluster_instances = []
+    for n in range(nodes + other_nodes):
+        instance_id = f'i-{rng.getrandbits(64):017x}'
+        owned = n < nodes
+        tags = [{'Key': CLUSTER_TAG if owned else 'kubernetes.io/cluster/other', 'Value': 'owned'}]
+        ec2.instances.append({
+            'InstanceId': instance_id,
+            'State': {'Name': rng.choice(('running', 'running', 'running', 'stopped')) if owned else 'running'},
+            'Tags': tags,
+        })
+        for _ in range(1 + (volumes_per_node if owned else 0)):
+            volume_id = new_volume(instance_id, [{'Key': 'Name', 'Value': f'node-{n}'}])
+            if owned:
+                expected.add(volume_id)
+        if owned:
+            cluster_instances.append(instance_id)
+
+    for n in range(pvcs):
+        attached_to = rng.choice(cluster_instances) if cluster_instances and n % 3 else None
+        expected.add(new_volume(attached_to, [
+            {'Key': CLUSTER_TAG, 'Value': 'owned'},
+            {'Key': 'kubernetes.io/created-for/pvc/name', 'Value': f'data-{n}'},
+        ]))
+
+    rng.shuffle(ec2.instances)
+    rng.shuffle(ec2.volumes)
+    return expected
+
+
+def new_ec2_client(fake, service='ec2'):
+    import boto3
+
+    client = boto3.client(
+        service, region_name=REGION, aws_access_key_id='testing', aws_secret_access_key='testing'
+    )
+    return fake.install(client)
+
+
+def legacy_find_cluster_volumes(ec2, cluster_name):
+    """The previous discovery: one unpaginated call per query, all instance IDs in one filter"""
+    cluster_filter = {'Name': 'tag:kubernetes.io/cluster/' + cluster_name, 'Values': ['owned']}
+    try:
+        response = ec2.describe_instances(
+            Filters=[cluster_filter, {'Name': 'instance-state-name', 'Values': ['running', 'stopped']}]
+        )
+        instance_ids = [i['InstanceId'] for r in response['Reservations'] for i in r['Instances']]
+        volumes = ec2.describe_volumes(
+            Filters=[{'Name': 'attachment.instance-id', 'Values': instance_ids}]
+        )['Volumes']
+        volumes += ec2.describe_volumes(Filters=[cluster_filter])['Volumes']
+        return list({v['VolumeId']: v for v in volumes}.values())
+    except Exception as e:
+        return {'error': str(e)}
+
+
+def legacy_create_volume_snapshot(ec2, volume, cluster_name):
+    """The previous creation path: create_snapshot, then create_tags"""
+    volume_id = volume['VolumeId']
+    description = f"EKS-{cluster_name}-{volume_id}-{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}"
+    response = ec2.create_snapshot(VolumeId=volume_id, Description=description)
+    ec2.create_tags(Resources=[response['SnapshotId']], Tags=[
+        {'Key': 'Name', 'Value': description},
+        {'Key': 'EKSCluster', 'Value': cluster_name},
+        {'Key': 'VolumeId', 'Value': volume_id},
+        {'Key': 'BackupType', 'Value': 'EKS-EBS-Automated'},
+    ])
+    return response
+
+
+def legacy_cleanup_old_snapshots(ec2, cluster_name, retention_days):
+    """The previous retention: one describe_snapshots call, serial deletes"""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    response = ec2.describe_snapshots(OwnerIds=['self'], Filters=[
+        {'Name': 'tag:EKSCluster', 'Values': [cluster_name]},
+        {'Name': 'tag:BackupType', 'Values': ['EKS-EBS-Automated']},
+    ])
+    return [s for s in response['Snapshots'] if s['StartTime'] < cutoff]
+
+
+def build_snapshot_history(ec2, snapshots, volumes, now, seed=0):
+    """snapshots automated snapshots spread over volumes, one per volume per day going back"""
+    rng = random.Random(seed)
+    per_volume = -(-snapshots // volumes)
+    for n in range(snapshots):
+        volume = n % volumes
+        age = n // volumes
+        ec2.snapshots.append({
+            'SnapshotId': f'snap-{n:017x}',
+            'VolumeId': f'vol-{volume:017x}',
+            'State': 'completed' if age else rng.choice(('completed', 'pending')),
+            'StartTime': now - timedelta(days=age, minutes=rng.randint(0, 120)),
+            'Tags': [
+                {'Key': 'EKSCluster', 'Value': CLUSTER_NAME},
+                {'Key': 'BackupType', 'Value': 'EKS-EBS-Automated'},
+            ],
+        })
+    rng.shuffle(ec2.snapshots)
+    return per_volume
+
+
+def build_velero_bucket(s3, days, objects_per_backup, namespaces, kopia_objects, retention_days, seed=0):
+    """
+    Daily and weekly Velero backups over days, plus a Kopia repository of
+    undated blobs, with nothing written within 10 minutes of the cutoff so
+    that both cleanups agree however long they run; recent objects under
+    old dates (a rewritten backup file, an unrelated dated name) must survive
+    """
+    rng = random.Random(seed)
+    now = datetime.now().replace(second=0, microsecond=0)
+    cutoff = now - timedelta(days=retention_days)
+
+    def written(moment):
+        if abs(moment - cutoff) < timedelta(minutes=10):
+            moment += timedelta(minutes=20)
+        return moment.replace(tzinfo=timezone.utc)
+
+    objects = {}
+    for day in range(days):
+        started = (now - timedelta(days=day)).replace(hour=1, minute=0)
+        schedules = ['daily-backup'] + (['weekly-backup'] if started.weekday() == 6 else [])
+        for schedule in schedules:
+            name = f"{schedule}-{started.strftime('%Y%m%d%H%M%S')}"
+            for n in range(objects_per_backup):
+                moment = started + timedelta(minutes=rng.randint(0, 45))
+                objects[f'backups/backups/{name}/{name}-{n:05d}.json.gz'] = written(moment)
+
+    for n in range(kopia_objects):
+        moment = now - timedelta(minutes=rng.randint(0, days * 24 * 60))
+        objects[f'backups/kopia/ns-{n % namespaces:03d}/p{rng.getrandbits(64):016x}'] = written(moment)
+
+    oldest = min(objects, default=None)
+    if oldest is not None:
+        objects[oldest.rsplit('/', 1)[0] + '/velero-backup.json'] = written(now)
+    objects['backups/restores/restore-check-20200101/restore.json'] = written(now)
+    objects['backups/2020-01-01-export/notes.txt'] = written(now)
+
+    s3.add_objects(VELERO_BUCKET, objects)
+    return objects
+
+
+def write_inventory(s3, objects, file_format, rows_per_file, report_time):
+    """
+    S3 Inventory report of VELERO_BUCKET's objects in INVENTORY_BUCKET, laid
+    out as S3 delivers it, next to an older report and a newer incomplete one
+    """
+    base = f'inventory/{VELERO_BUCKET}/backup-cleanup/'
+    items = sorted(objects.items())
+    files = []
+    for n, start in enumerate(range(0, len(items), rows_per_file)):
+        chunk = items[start:start + rows_per_file]
+        if file_format == 'Parquet':
+            import pyarrow
+            import pyarrow.parquet
+
+            table = pyarrow.table({
+                'bucket': [VELERO_BUCKET] * len(chunk),
+                'key': [key for key, _ in chunk],
+                'size': pyarrow.array([1024] * len(chunk), type=pyarrow.int64()),
+                'last_modified_date': pyarrow.array(
+                    [modified for _, modified in chunk], type=pyarrow.timestamp('ms', tz='UTC')
+                ),
+            })
+            sink = io.BytesIO()
+            pyarrow.parquet.write_table(table, sink)
+            body, suffix = sink.getvalue(), 'parquet'
+        else:
+            text = io.StringIO()
+            writer = csv.writer(text, quoting=csv.QUOTE_ALL, lineterminator='\n')
+            for key, modified in chunk:
+                writer.writerow([VELERO_BUCKET, quote_plus(key), 1024, modified.strftime('%Y-%m-%dT%H:%M:%S.000Z')])
+            body, suffix = gzip.compress(text.getvalue().encode(), compresslevel=6), 'csv.gz'
+
+        key = f'{base}data/{report_time:%Y%m%d}-{n:04d}.{suffix}'
+        s3.put(INVENTORY_BUCKET, key, body)
+        files.append({'key': key, 'size': len(body), 'MD5checksum': hashlib.md5(body).hexdigest()})
+
+    manifest = json.dumps({
+        'sourceBucket': VELERO_BUCKET,
+        'destinationBucket': f'arn:aws:s3:::{INVENTORY_BUCKET}',
+        'version': '2016-11-30',
+        'fileFormat': file_format,
+        'fileSchema': 'Bucket, Key, Size, LastModifiedDate' if file_format == 'CSV' else (
+            'message s3.inventory { required binary bucket (UTF8); required binary key (UTF8); '
+            'optional int64 size; optional int64 last_modified_date (TIMESTAMP_MILLIS); }'
+        ),
+        'files': files,
+    }).encode()
+
+    # The report read; a day older one; a newer one still being delivered
+    older = report_time - timedelta(days=1)
+    newer = report_time + timedelta(minutes=30)
+    for moment, complete in ((report_time, True), (older, True), (newer, False)):
+        folder = f"{base}{moment.strftime('%Y-%m-%dT%H-%MZ')}/"
+        s3.put(INVENTORY_BUCKET, folder + 'manifest.json', manifest if moment == report_time else b'{}')
+        if complete:
+            s3.put(INVENTORY_BUCKET, folder + 'manifest.checksum', hashlib.md5(manifest).hexdigest().encode())
+
+    return sum(f['size'] for f in files)
+
+
+def import_lambda(name):
+    sys.path.insert(0, os.path.abspath(LAMBDA_DIR))
+    module = __import__(name)
+    module.logger.setLevel('WARNING')
+    return module
+
+
+def run_discovery(args):
+    ebs_snapshot = import_lambda('ebs_snapshot')
+    ebs_snapshot.DISCOVERY_WORKERS = args.workers
+
+    fake = FakeEc2(latency_ms=args.latency_ms)
+    expected = build_cluster(fake, args.nodes, args.volumes_per_node, args.pvcs, args.other_nodes)
+    ec2 = new_ec2_client(fake)
+
+    started = time.perf_counter()
+    legacy = legacy_find_cluster_volumes(ec2, CLUSTER_NAME)
+    legacy_seconds = time.perf_counter() - started
+
+    fake.calls = {}
+    started = time.perf_counter()
+    volumes = ebs_snapshot.find_cluster_volumes(ec2, CLUSTER_NAME)
+    elapsed = time.perf_counter() - started
+    found = {v['VolumeId'] for v in volumes}
+
+    return {
+        'scenario': 'discovery',
+        'nodes': args.nodes,
+        'latency_ms': args.latency_ms,
+        'workers': ebs_snapshot.DISCOVERY_WORKERS,
+        'expected_volumes': len(expected),
+        'volumes_found': len(found),
+        'missing': len(expected - found),
+        'unexpected': len(found - expected),
+        'ec2_calls': fake.calls,
+        'seconds': round(elapsed, 3),
+        'legacy_volumes_found': legacy['error'] if isinstance(legacy, dict) else len(legacy),
+        'legacy_seconds': round(legacy_seconds, 3),
+    }
+
+
+def run_create(args):
+    ebs_snapshot = import_lambda('ebs_snapshot')
+    ebs_snapshot.SNAPSHOT_MODE = args.mode
+    ebs_snapshot.SNAPSHOT_WORKERS = args.workers
+
+    fake = FakeEc2(latency_ms=args.latency_ms)
+    build_cluster(fake, args.nodes, args.volumes_per_node, args.pvcs, other_nodes=0)
+    ec2 = new_ec2_client(fake)
+    volumes = ebs_snapshot.find_cluster_volumes(ec2, CLUSTER_NAME)
+
+    fake.calls = {}
+    started = time.perf_counter()
+    for volume in volumes[:args.legacy_sample]:
+        legacy_create_volume_snapshot(ec2, volume, CLUSTER_NAME)
+    legacy_per_volume = (time.perf_counter() - started) / max(1, min(args.legacy_sample, len(volumes)))
+    legacy_calls = sum(fake.calls.values())
+
+    fake.snapshots = []
+    fake.calls = {}
+    started = time.perf_counter()
+    created = ebs_snapshot.create_snapshots(ec2, volumes, CLUSTER_NAME)
+    elapsed = time.perf_counter() - started
+
+    tagged = sum(1 for snapshot in fake.snapshots if tag_value(snapshot, 'EKSCluster') == CLUSTER_NAME)
+    volumes_by_id = {volume['VolumeId']: volume for volume in volumes}
+    tags_copied = sum(
+        1 for snapshot in fake.snapshots
+        if all(tag in snapshot['Tags'] for tag in ebs_snapshot.copyable_tags(volumes_by_id[snapshot['VolumeId']].get('Tags', [])))
+    )
+    return {
+        'scenario': 'create',
+        'mode': args.mode,
+        'workers': args.workers,
+        'latency_ms': args.latency_ms,
+        'volumes': len(volumes),
+        'snapshots': len(created),
+        'tagged_on_create': tagged,
+        'volume_tags_copied': tags_copied,
+        'ec2_calls': fake.calls,
+        'calls_per_volume': round(sum(fake.calls.values()) / max(1, len(volumes)), 2),
+        'seconds': round(elapsed, 3),
+        'volumes_per_sec': round(len(volumes) / elapsed, 1),
+        'legacy_calls_per_volume': round(legacy_calls / max(1, min(args.legacy_sample, len(volumes))), 2),
+        'legacy_seconds_estimate': round(legacy_per_volume * len(volumes), 3),
+        'missing': len(volumes) - len({s['VolumeId'] for s in created}),
+    }
+
+
+def run_skip(args):
+    ebs_snapshot = import_lambda('ebs_snapshot')
+    ebs_snapshot.SNAPSHOT_WORKERS = args.workers
+
+    fake = FakeEc2(latency_ms=args.latency_ms)
+    build_cluster(fake, args.nodes, args.volumes_per_node, args.pvcs, other_nodes=0)
+    ec2 = new_ec2_client(fake)
+    cloudwatch = new_ec2_client(fake, 'cloudwatch')
+    volumes = ebs_snapshot.find_cluster_volumes(ec2, CLUSTER_NAME)
+
+    # Yesterday's run snapshotted everything; since then active volumes were written to
+    rng = random.Random(1)
+    now = datetime.now(timezone.utc)
+    last_run = now - timedelta(days=1)
+    expected_active = set()
+    for volume in volumes:
+        snapshot = fake._new_snapshot(volume, {}, [
+            {'Key': 'EKSCluster', 'Value': CLUSTER_NAME},
+            {'Key': 'BackupType', 'Value': 'EKS-EBS-Automated'},
+        ])
+        snapshot['State'] = 'completed'
+        snapshot['StartTime'] = last_run
+        if volume['State'] != 'in-use':
+            continue
+        active = rng.random() >= args.idle_ratio
+        if active:
+            expected_active.add(volume['VolumeId'])
+        fake.write_ops[volume['VolumeId']] = [
+            (now - timedelta(hours=hours), rng.randint(1, 500) if active and hours < 12 else 0.0)
+            for hours in range(1, 48)
+        ]
+
+    fake.calls = {}
+    started = time.perf_counter()
+    to_snapshot, skipped = ebs_snapshot.filter_unchanged_volumes(ec2, cloudwatch, volumes, CLUSTER_NAME)
+    detection_seconds = time.perf_counter() - started
+    created = ebs_snapshot.create_snapshots(ec2, to_snapshot, CLUSTER_NAME)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'scenario': 'skip',
+        'volumes': len(volumes),
+        'idle_ratio': args.idle_ratio,
+        'latency_ms': args.latency_ms,
+        'snapshotted': len(to_snapshot),
+        'skipped': len(skipped),
+        'snapshots_created': len(created),
+        'missed_changes': len(expected_active - {v['VolumeId'] for v in to_snapshot}),
+        'ec2_calls': fake.calls,
+        'detection_seconds': round(detection_seconds, 3),
+        'seconds': round(elapsed, 3),
+        'full_run_seconds_estimate': round(elapsed / max(1, len(to_snapshot)) * len(volumes), 3),
+    }
+
+
+def run_retention(args):
+    import_lambda('ebs_snapshot')
+    from snapshot_retention import RetentionPolicy, apply_retention
+
+    now = datetime.now(timezone.utc)
+    fake = FakeEc2(latency_ms=args.latency_ms)
+    days = build_snapshot_history(fake, args.snapshots, args.volumes, now)
+    ec2 = new_ec2_client(fake)
+
+    fake.calls = {}
+    legacy = legacy_cleanup_old_snapshots(ec2, CLUSTER_NAME, args.retention_days)
+
+    policy = RetentionPolicy(args.retention_days, args.daily, args.weekly, args.monthly)
+    fake.calls = {}
+    started = time.perf_counter()
+    deleted = apply_retention(ec2, CLUSTER_NAME, policy, workers=args.workers, now=now)
+    elapsed = time.perf_counter() - started
+
+    # Every volume keeps all snapshots inside the window, plus its GFS picks
+    remaining = [s for s in fake.snapshots if s['SnapshotId'] not in fake.deleted]
+    cutoff = now - timedelta(days=args.retention_days)
+    wrongly_deleted = sum(
+        1 for s in fake.snapshots
+        if s['SnapshotId'] in fake.deleted and (s['StartTime'] >= cutoff or s['State'] == 'pending')
+    )
+
+    return {
+        'scenario': 'retention',
+        'policy': repr(policy),
+        'snapshots': args.snapshots,
+        'volumes': args.volumes,
+        'days_of_history': days,
+        'latency_ms': args.latency_ms,
+        'workers': args.workers,
+        'deleted': deleted,
+        'kept': len(remaining),
+        'kept_per_volume': round(len(remaining) / args.volumes, 1),
+        'wrongly_deleted': wrongly_deleted,
+        'ec2_calls': fake.calls,
+        'seconds': round(elapsed, 3),
+        'deletes_per_sec': round(deleted / elapsed, 1),
+        'legacy_deletable_seen': len(legacy),
+        'legacy_serial_seconds_estimate': round(len(legacy) * args.latency_ms / 1000, 1),
+    }
+
+
+def run_cleanup(args):
+    backup_cleanup = import_lambda('backup_cleanup')
+    backup_cleanup.S3_LIST_WORKERS = args.list_workers
+    backup_cleanup.DELETE_WORKERS = args.delete_workers
+
+    results = {}
+    for mode, cleanup in (('scan', backup_cleanup.cleanup_s3_objects), ('prefix', backup_cleanup.cleanup_s3_prefixes)):
+        fake = FakeS3(latency_ms=args.latency_ms)
+        total = len(build_velero_bucket(
+            fake, args.days, args.objects_per_backup, args.namespaces, args.kopia_objects, args.retention_days
+        ))
+        s3 = new_ec2_client(fake, service='s3')
+
+        started = time.perf_counter()
+        deleted = cleanup(s3, VELERO_BUCKET, args.retention_days, 'Velero')
+        results[mode] = (deleted, fake.deleted, dict(fake.calls), time.perf_counter() - started)
+
+    scan_deleted, scan_keys, scan_calls, scan_seconds = results['scan']
+    deleted, keys, calls, seconds = results['prefix']
+    return {
+        'scenario': 'cleanup',
+        'objects': total,
+        'latency_ms': args.latency_ms,
+        'list_workers': args.list_workers,
+        'delete_workers': args.delete_workers,
+        'deleted': deleted,
+        's3_calls': calls,
+        'seconds': round(seconds, 3),
+        'scan_deleted': scan_deleted,
+        'scan_s3_calls': scan_calls,
+        'scan_seconds': round(scan_seconds, 3),
+        'speedup': round(scan_seconds / seconds, 1),
+        'mismatched': len(keys ^ scan_keys),
+    }
+
+
+def run_inventory(args):
+    # Both paths compare against the wall clock, in UTC as on Lambda
+    os.environ['TZ'] = 'UTC'
+    time.tzset()
+
+    backup_cleanup = import_lambda('backup_cleanup')
+    import s3_inventory
+
+    backup_cleanup.DELETE_WORKERS = args.delete_workers
+    backup_cleanup.INVENTORY_BUCKET = INVENTORY_BUCKET
+    if args.engine == 'python':
+        if args.format == 'Parquet':
+            raise SystemExit('Parquet inventory reports need pyarrow')
+        s3_inventory.load_pyarrow = lambda: False
+    elif not s3_inventory.load_pyarrow():
+        raise SystemExit('--engine arrow needs pyarrow installed')
+
+    results = {}
+    for mode, cleanup in (('scan', backup_cleanup.cleanup_s3_objects), ('inventory', backup_cleanup.cleanup_s3_inventory)):
+        fake = FakeS3(latency_ms=args.latency_ms)
+        objects = build_velero_bucket(
+            fake, args.days, args.objects_per_backup, args.namespaces, args.kopia_objects, args.retention_days
+        )
+        report_bytes = write_inventory(
+            fake, objects, args.format, args.rows_per_file, datetime.utcnow() - timedelta(hours=2)
+        )
+        # Rewritten after the report, which still shows their old timestamps
+        overwritten = sorted(objects)[::1000]
+        fake.add_objects(VELERO_BUCKET, {key: datetime.now(timezone.utc) for key in overwritten})
+        s3 = new_ec2_client(fake, service='s3')
+        fake.calls = {}
+
+        started = time.perf_counter()
+        deleted = cleanup(s3, VELERO_BUCKET, args.retention_days, 'Velero')
+        results[mode] = (deleted, fake.deleted, dict(fake.calls), time.perf_counter() - started)
+
+    scan_deleted, scan_keys, scan_calls, scan_seconds = results['scan']
+    deleted, keys, calls, seconds = results['inventory']
+    return {
+        'scenario': 'inventory',
+        'format': args.format,
+        'engine': args.engine,
+        'objects': len(objects),
+        'report_mb': round(report_bytes / 2 ** 20, 1),
+        'overwritten_since_report': len(overwritten),
+        'latency_ms': args.latency_ms,
+        'delete_workers': args.delete_workers,
+        'deleted': deleted,
+        's3_calls': calls,
+        'seconds': round(seconds, 3),
+        'rows_per_sec': round(len(objects) / seconds),
+        'scan_deleted': scan_deleted,
+        'scan_s3_calls': scan_calls,
+        'scan_seconds': round(scan_seconds, 3),
+        'speedup': round(scan_seconds / seconds, 1),
+        'mismatched': len(keys ^ scan_keys),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='scenario', required=True)
+
+    discovery = sub.add_parser('discovery', help='find_cluster_volumes against a large stubbed cluster')
+    discovery.add_argument('--nodes', type=int, default=3000, help='Cluster instances')
+    discovery.add_argument('--volumes-per-node', type=int, default=1, help='Data volumes per node, besides the root volume')
+    discovery.add_argument('--pvcs', type=int, default=2000, help='Cluster-tagged PVC volumes')
+    discovery.add_argument('--other-nodes', type=int, default=500, help='Instances of other clusters')
+    discovery.add_argument('--latency-ms', type=float, default=20, help='Latency per EC2 call')
+    discovery.add_argument('--workers', type=int, default=8, help='DISCOVERY_WORKERS')
+    discovery.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    create = sub.add_parser('create', help='create_snapshots for every volume of a stubbed cluster')
+    create.add_argument('--nodes', type=int, default=200, help='Cluster instances')
+    create.add_argument('--volumes-per-node', type=int, default=1, help='Data volumes per node, besides the root volume')
+    create.add_argument('--pvcs', type=int, default=100, help='Cluster-tagged PVC volumes')
+    create.add_argument('--mode', choices=('volume', 'instance'), default='volume', help='SNAPSHOT_MODE')
+    create.add_argument('--workers', type=int, default=8, help='SNAPSHOT_WORKERS')
+    create.add_argument('--latency-ms', type=float, default=50, help='Latency per EC2 call')
+    create.add_argument('--legacy-sample', type=int, default=20, help='Volumes timed through the serial two-call path')
+    create.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    skip = sub.add_parser('skip', help='Change detection on a mostly idle stubbed cluster')
+    skip.add_argument('--nodes', type=int, default=1000, help='Cluster instances')
+    skip.add_argument('--volumes-per-node', type=int, default=1, help='Data volumes per node, besides the root volume')
+    skip.add_argument('--pvcs', type=int, default=500, help='Cluster-tagged PVC volumes (a third detached)')
+    skip.add_argument('--idle-ratio', type=float, default=0.8, help='Share of attached volumes without writes')
+    skip.add_argument('--workers', type=int, default=8, help='SNAPSHOT_WORKERS')
+    skip.add_argument('--latency-ms', type=float, default=50, help='Latency per AWS call')
+    skip.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    retention = sub.add_parser('retention', help='Snapshot retention over a large stubbed snapshot history')
+    retention.add_argument('--snapshots', type=int, default=50000, help='Automated snapshots in the account')
+    retention.add_argument('--volumes', type=int, default=500, help='Volumes they belong to (one snapshot per day each)')
+    retention.add_argument('--retention-days', type=int, default=30, help='RETENTION_DAYS')
+    retention.add_argument('--daily', type=int, default=0, help='RETENTION_DAILY')
+    retention.add_argument('--weekly', type=int, default=0, help='RETENTION_WEEKLY')
+    retention.add_argument('--monthly', type=int, default=0, help='RETENTION_MONTHLY')
+    retention.add_argument('--workers', type=int, default=16, help='DELETE_WORKERS')
+    retention.add_argument('--latency-ms', type=float, default=5, help='Latency per EC2 call')
+    retention.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    cleanup = sub.add_parser('cleanup', help='Velero bucket cleanup, prefix mode against the full scan')
+    cleanup.add_argument('--days', type=int, default=120, help='Days of daily (and weekly) backups in the bucket')
+    cleanup.add_argument('--objects-per-backup', type=int, default=100, help='Objects per Velero backup')
+    cleanup.add_argument('--namespaces', type=int, default=16, help='Kopia repositories (one per namespace)')
+    cleanup.add_argument('--kopia-objects', type=int, default=200000, help='Undated Kopia blobs across the repositories')
+    cleanup.add_argument('--retention-days', type=int, default=30, help='RETENTION_DAYS')
+    cleanup.add_argument('--list-workers', type=int, default=8, help='S3_LIST_WORKERS')
+    cleanup.add_argument('--delete-workers', type=int, default=8, help='DELETE_WORKERS')
+    cleanup.add_argument('--latency-ms', type=float, default=20, help='Latency per S3 call')
+    cleanup.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    inventory = sub.add_parser('inventory', help='Velero bucket cleanup from a generated S3 Inventory report, against the full scan')
+    inventory.add_argument('--format', choices=('CSV', 'Parquet'), default='CSV', help='Inventory report format')
+    inventory.add_argument('--engine', choices=('arrow', 'python'), default='arrow', help='Filter with pyarrow or the csv module')
+    inventory.add_argument('--rows-per-file', type=int, default=250000, help='Objects per inventory data file')
+    inventory.add_argument('--days', type=int, default=120, help='Days of daily (and weekly) backups in the bucket')
+    inventory.add_argument('--objects-per-backup', type=int, default=100, help='Objects per Velero backup')
+    inventory.add_argument('--namespaces', type=int, default=16, help='Kopia repositories (one per namespace)')
+    inventory.add_argument('--kopia-objects', type=int, default=200000, help='Undated Kopia blobs across the repositories')
+    inventory.add_argument('--retention-days', type=int, default=30, help='RETENTION_DAYS')
+    inventory.add_argument('--delete-workers', type=int, default=8, help='DELETE_WORKERS')
+    inventory.add_argument('--latency-ms', type=float, default=20, help='Latency per S3 call')
+    inventory.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    args = parser.parse_args()
+    if args.scenario == 'inventory':
+        result = run_inventory(args)
+    elif args.scenario == 'cleanup':
+        result = run_cleanup(args)
+    elif args.scenario == 'retention':
+        result = run_retention(args)
+    elif args.scenario == 'create':
+        result = run_create(args)
+    elif args.scenario == 'skip':
+        result = run_skip(args)
+    else:
+        result = run_discovery(args)
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for name, value in result.items():
+            print(f"{name:>24}: {value}")
+
+    return 1 if result.get('missing') or result.get('missed_changes') or result.get('wrongly_deleted') or result.get('mismatched') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
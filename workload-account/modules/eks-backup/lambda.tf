@@ -20,6 +20,13 @@ resource "aws_lambda_function" "ebs_snapshot" {
     variables = {
       CLUSTER_NAME = var.cluster_name
       RETENTION_DAYS = var.backup_retention_days
+      SNAPSHOT_MODE = var.ebs_snapshot_mode
+      SNAPSHOT_WORKERS = var.ebs_snapshot_concurrency
+      SKIP_UNCHANGED_VOLUMES = var.ebs_snapshot_skip_unchanged
+      SKIP_UNCHANGED_MAX_AGE_DAYS = var.ebs_snapshot_skip_max_age_days
+      RETENTION_DAILY = var.snapshot_retention_daily
+      RETENTION_WEEKLY = var.snapshot_retention_weekly
+      RETENTION_MONTHLY = var.snapshot_retention_monthly
     }
   }
 
@@ -42,6 +49,10 @@ data "archive_file" "ebs_snapshot_zip" {
     })
     filename = "index.py"
   }
+  source {
+    content  = file("${path.module}/lambda_functions/snapshot_retention.py")
+    filename = "snapshot_retention.py"
+  }
 }
 
 # EventBridge rule for scheduled EBS snapshots
@@ -99,9 +110,19 @@ resource "aws_lambda_function" "backup_cleanup" {
       VELERO_BUCKET = aws_s3_bucket.velero_backups.bucket
       ETCD_BUCKET = aws_s3_bucket.etcd_backups.bucket
       RETENTION_DAYS = var.backup_retention_days
+      RETENTION_DAILY = var.snapshot_retention_daily
+      RETENTION_WEEKLY = var.snapshot_retention_weekly
+      RETENTION_MONTHLY = var.snapshot_retention_monthly
+      S3_CLEANUP_MODE = var.backup_cleanup_s3_mode
+      S3_LIST_WORKERS = var.backup_cleanup_list_concurrency
+      INVENTORY_BUCKET = var.backup_cleanup_s3_mode == "inventory" ? aws_s3_bucket.backup_inventory[0].bucket : ""
+      INVENTORY_PREFIX = "inventory"
+      INVENTORY_CONFIG_ID = "backup-cleanup"
     }
   }
 
+  layers = var.backup_cleanup_layers
+
   tags = merge(var.tags, {
     Name      = "${var.cluster_name}-backup-cleanup"
     Purpose   = "EKSBackup"
@@ -178,6 +199,29 @@ resource "aws_iam_role_policy_attachment" "backup_cleanup_lambda" {
   policy_arn = aws_iam_policy.backup_cleanup_lambda.arn
 }
 
+# Read access to the S3 Inventory reports of the backup buckets
+resource "aws_iam_role_policy" "backup_cleanup_inventory" {
+  count = var.backup_cleanup_s3_mode == "inventory" ? 1 : 0
+  role  = aws_iam_role.backup_cleanup_lambda.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Effect = "Allow"
+        Action = [
+          "s3:ListBucket",
+          "s3:GetObject"
+        ]
+        Resource = [
+          aws_s3_bucket.backup_inventory[0].arn,
+          "${aws_s3_bucket.backup_inventory[0].arn}/*"
+        ]
+      }
+    ]
+  })
+}
+
 # Create the backup cleanup Lambda deployment package
 data "archive_file" "backup_cleanup_zip" {
   type        = "zip"
@@ -188,6 +232,14 @@ data "archive_file" "backup_cleanup_zip" {
     })
     filename = "index.py"
   }
+  source {
+    content  = file("${path.module}/lambda_functions/snapshot_retention.py")
+    filename = "snapshot_retention.py"
+  }
+  source {
+    content  = file("${path.module}/lambda_functions/s3_inventory.py")
+    filename = "s3_inventory.py"
+  }
 }
 
 # EventBridge rule for backup cleanup
@@ -1,13 +1,57 @@
+import bisect
 import boto3
 import json
 import logging
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import os
+import re
+import threading
+
+from s3_inventory import expired_keys, is_supported, latest_manifest
+from snapshot_retention import RetentionPolicy, apply_retention
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# GFS retention on top of RETENTION_DAYS for EBS snapshots (0 = off),
+# see snapshot_retention; shared with the ebs-snapshot Lambda
+RETENTION_DAILY = int(os.environ.get('RETENTION_DAILY', '0'))
+RETENTION_WEEKLY = int(os.environ.get('RETENTION_WEEKLY', '0'))
+RETENTION_MONTHLY = int(os.environ.get('RETENTION_MONTHLY', '0'))
+DELETE_WORKERS = int(os.environ.get('DELETE_WORKERS', '8'))
+
+# How expired objects are found in the Velero and ETCD buckets: 'scan' lists
+# every object in one pass, 'prefix' discovers the top-level prefixes and lists
+# them in parallel, 'inventory' reads the newest S3 Inventory report
+S3_CLEANUP_MODE = os.environ.get('S3_CLEANUP_MODE', 'scan')
+S3_LIST_WORKERS = int(os.environ.get('S3_LIST_WORKERS', '8'))
+S3_PREFIX_DEPTH = int(os.environ.get('S3_PREFIX_DEPTH', '3'))
+# Level of the prefixes named after their backup's date (Velero's
+# 'backups/backups/<backup-name>/'); dates elsewhere are ignored, 0 = none
+S3_PREFIX_DATE_DEPTH = int(os.environ.get('S3_PREFIX_DATE_DEPTH', '3'))
+# DeleteObjects limit, and delete batches queued per delete worker
+S3_DELETE_BATCH = 1000
+S3_DELETE_QUEUE_PER_WORKER = 4
+
+# Where S3 Inventory delivers the buckets' reports; without a report younger
+# than INVENTORY_MAX_AGE_HOURS, inventory mode falls back to 'scan'. Keys the
+# report lists as expired are re-checked against the bucket before deletion.
+INVENTORY_BUCKET = os.environ.get('INVENTORY_BUCKET', '')
+INVENTORY_PREFIX = os.environ.get('INVENTORY_PREFIX', 'inventory')
+INVENTORY_CONFIG_ID = os.environ.get('INVENTORY_CONFIG_ID', 'backup-cleanup')
+INVENTORY_MAX_AGE_HOURS = int(os.environ.get('INVENTORY_MAX_AGE_HOURS', '24'))
+
+# A date ending the prefix's last segment, Velero 'daily-backup-20240115010000/'
+# or ETCD '2024-01-15/', or spanning its last three segments, ETCD '2024/01/15/'
+PREFIX_DATE = re.compile(
+    r'(?:^|/|[^/]*[-_.])(20\d{2})-?(\d{2})-?(\d{2})'
+    r'(?:[-T_]?(\d{2})[-:]?(\d{2})[-:]?(\d{2}))?/$'
+    r'|(?:^|/)(20\d{2})/(\d{2})/(\d{2})/$'
+)
+
 def lambda_handler(event, context):
     """
     Lambda function to clean up old backup files and snapshots
@@ -21,8 +65,14 @@ def lambda_handler(event, context):
         logger.info(f"Starting backup cleanup for cluster: {cluster_name}")
 
         # Initialize AWS clients
-        s3 = boto3.client('s3')
-        ec2 = boto3.client('ec2')
+        s3 = boto3.client('s3', config=Config(
+            retries={'max_attempts': 10, 'mode': 'adaptive'},
+            max_pool_connections=max(10, S3_LIST_WORKERS + DELETE_WORKERS)
+        ))
+        ec2 = boto3.client('ec2', config=Config(
+            retries={'max_attempts': 10, 'mode': 'adaptive'},
+            max_pool_connections=max(10, DELETE_WORKERS)
+        ))
 
         cleanup_results = {
             'velero_objects_deleted': 0,
@@ -30,13 +80,20 @@ def lambda_handler(event, context):
             'snapshots_deleted': 0
         }
 
+        if S3_CLEANUP_MODE == 'prefix':
+            cleanup_s3 = cleanup_s3_prefixes
+        elif S3_CLEANUP_MODE == 'inventory':
+            cleanup_s3 = cleanup_s3_inventory
+        else:
+            cleanup_s3 = cleanup_s3_objects
+
         # Clean up Velero backups
-        cleanup_results['velero_objects_deleted'] = cleanup_s3_objects(
+        cleanup_results['velero_objects_deleted'] = cleanup_s3(
             s3, velero_bucket, retention_days, 'Velero'
         )
 
         # Clean up ETCD backups
-        cleanup_results['etcd_objects_deleted'] = cleanup_s3_objects(
+        cleanup_results['etcd_objects_deleted'] = cleanup_s3(
             s3, etcd_bucket, retention_days, 'ETCD'
         )
 
@@ -105,9 +162,246 @@ def cleanup_s3_objects(s3, bucket_name, retention_days, backup_type):
         logger.error(f"Error cleaning up {backup_type} objects in {bucket_name}: {str(e)}")
         return 0
 
+def cleanup_s3_prefixes(s3, bucket_name, retention_days, backup_type):
+    """
+    Clean up S3 objects older than retention period, listing the bucket's
+    prefixes in parallel. Prefixes at S3_PREFIX_DATE_DEPTH named after a
+    date past the cutoff are not listed; every listed object is still
+    checked against the cutoff, so a misleading name cannot delete newer
+    objects.
+    """
+    cutoff_date = datetime.now() - timedelta(days=retention_days)
+    deleter = BatchDeleter(s3, bucket_name, backup_type, DELETE_WORKERS)
+    skipped = dated = inspected = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, S3_LIST_WORKERS)) as pool:
+            # Breadth-first discovery, one delimited listing per prefix
+            frontier = ['']
+            leaves = []
+            for depth in range(1, S3_PREFIX_DEPTH + 1):
+                levels = pool.map(
+                    lambda prefix: list_prefix_level(s3, bucket_name, prefix, cutoff_date, deleter),
+                    frontier
+                )
+                frontier = []
+                for prefix in (p for level in levels for p in level):
+                    prefix_time = prefix_date(prefix) if depth == S3_PREFIX_DATE_DEPTH else None
+                    if prefix_time is None:
+                        if depth < S3_PREFIX_DEPTH:
+                            frontier.append(prefix)
+                        else:
+                            leaves.append(prefix)
+                            inspected += 1
+                    elif prefix_time >= cutoff_date:
+                        skipped += 1
+                    else:
+                        leaves.append(prefix)
+                        dated += 1
+
+            list(pool.map(
+                lambda prefix: expire_prefix(s3, bucket_name, prefix, cutoff_date, deleter),
+                leaves
+            ))
+
+    except Exception as e:
+        logger.error(f"Error cleaning up {backup_type} objects in {bucket_name}: {str(e)}")
+
+    finally:
+        deleted_count = deleter.close()
+
+    logger.info(
+        f"Deleted {deleted_count} old {backup_type} objects from {bucket_name}: "
+        f"{skipped} recent prefixes skipped, {dated} dated before the cutoff and {inspected} undated listed"
+    )
+    return deleted_count
+
+def cleanup_s3_inventory(s3, bucket_name, retention_days, backup_type):
+    """
+    Clean up S3 objects older than retention period as listed by the
+    bucket's newest S3 Inventory report, falling back to a full listing
+    when there is no usable report. The report's timestamps can be a day
+    old, so each key is deleted only if the bucket still lists it as
+    expired (see still_expired).
+    """
+    manifest = None
+    if INVENTORY_BUCKET:
+        try:
+            manifest = latest_manifest(
+                s3, INVENTORY_BUCKET, INVENTORY_PREFIX, bucket_name,
+                INVENTORY_CONFIG_ID, INVENTORY_MAX_AGE_HOURS
+            )
+        except Exception as e:
+            logger.error(f"Error reading inventory reports of {bucket_name}: {str(e)}")
+
+    if manifest is None or not is_supported(manifest):
+        logger.info(f"No usable inventory report for {bucket_name}, listing {backup_type} objects")
+        return cleanup_s3_objects(s3, bucket_name, retention_days, backup_type)
+
+    # Inventory timestamps are UTC
+    cutoff_date = datetime.utcnow() - timedelta(days=retention_days)
+    deleter = BatchDeleter(s3, bucket_name, backup_type, DELETE_WORKERS)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, S3_LIST_WORKERS)) as pool:
+            for keys in expired_keys(s3, manifest, cutoff_date):
+                keys.sort()
+                checked = pool.map(
+                    lambda chunk: still_expired(s3, bucket_name, chunk, cutoff_date),
+                    [keys[start:start + S3_DELETE_BATCH] for start in range(0, len(keys), S3_DELETE_BATCH)]
+                )
+                for current in checked:
+                    for key in current:
+                        deleter.add(key)
+
+    except Exception as e:
+        logger.error(f"Error cleaning up {backup_type} objects in {bucket_name} from inventory: {str(e)}")
+
+    finally:
+        deleted_count = deleter.close()
+
+    logger.info(
+        f"Deleted {deleted_count} old {backup_type} objects from {bucket_name} "
+        f"({manifest['fileFormat']} inventory of {manifest['reportTime']})"
+    )
+    return deleted_count
+
+def still_expired(s3, bucket_name, keys, cutoff_date):
+    """
+    The sorted keys whose current LastModified is still before cutoff_date
+    (naive UTC); keys overwritten or removed since the inventory report
+    are dropped
+
+    Each ListObjectsV2 call starts at the first unchecked key and asks for
+    as many keys as are pending under its parent prefix, so the files of
+    one backup are checked with one call per 1000 and a lone key with a
+    one-key listing. Listing needs no read access to the backups.
+    """
+    expired = []
+    index = 0
+    while index < len(keys):
+        key = keys[index]
+        parent = key[:key.rfind('/') + 1]
+        end = bisect.bisect_left(keys, parent + '\U0010ffff', index)
+
+        page = s3.list_objects_v2(
+            Bucket=bucket_name,
+            Prefix=parent,
+            StartAfter=key[:-1] + chr(ord(key[-1]) - 1),
+            MaxKeys=min(S3_DELETE_BATCH, end - index)
+        )
+        contents = page.get('Contents', [])
+        listed = {obj['Key']: obj['LastModified'] for obj in contents}
+        # Pending keys up to the last one listed are settled; all of them
+        # under parent when the listing reached its end
+        if not page.get('IsTruncated'):
+            settled = end
+        elif contents:
+            settled = bisect.bisect_right(keys, contents[-1]['Key'], index, end)
+        else:
+            settled = index
+
+        if settled == index:
+            # Unrelated keys between StartAfter and key (part-10 before
+            # part-2) used up the listing; check key on its own
+            page = s3.list_objects_v2(Bucket=bucket_name, Prefix=key, MaxKeys=1)
+            listed = {obj['Key']: obj['LastModified'] for obj in page.get('Contents', [])}
+            settled = index + 1
+
+        for checked in keys[index:settled]:
+            modified = listed.get(checked)
+            if modified is not None and modified.replace(tzinfo=None) < cutoff_date:
+                expired.append(checked)
+        index = settled
+
+    return expired
+
+def prefix_date(prefix):
+    """
+    Date ending an S3 prefix (see PREFIX_DATE), or None
+    """
+    match = PREFIX_DATE.search(prefix)
+    if match is None:
+        return None
+    parts = match.groups()[:6] if match.group(1) else match.groups()[6:]
+    try:
+        return datetime(*(int(part or 0) for part in parts))
+    except ValueError:
+        return None
+
+def list_prefix_level(s3, bucket_name, prefix, cutoff_date, deleter):
+    """
+    Queue the old objects directly under prefix for deletion and return
+    its sub-prefixes
+    """
+    subprefixes = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, Delimiter='/'):
+        for obj in page.get('Contents', []):
+            if obj['LastModified'].replace(tzinfo=None) < cutoff_date:
+                deleter.add(obj['Key'])
+        subprefixes.extend(p['Prefix'] for p in page.get('CommonPrefixes', []))
+    return subprefixes
+
+def expire_prefix(s3, bucket_name, prefix, cutoff_date, deleter):
+    """
+    Queue the objects under prefix older than the cutoff for deletion
+    """
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            if obj['LastModified'].replace(tzinfo=None) < cutoff_date:
+                deleter.add(obj['Key'])
+
+class BatchDeleter:
+    """
+    Collects keys from any number of listing threads and issues a
+    delete_batch per 1000 keys on a worker pool while listing goes on;
+    listing blocks once too many batches are queued, without holding the
+    lock other listing threads add keys under
+    """
+
+    def __init__(self, s3, bucket_name, backup_type, workers):
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.backup_type = backup_type
+        workers = max(1, workers)
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._queued = threading.BoundedSemaphore(workers * S3_DELETE_QUEUE_PER_WORKER)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._futures = []
+
+    def add(self, key):
+        with self._lock:
+            self._pending.append({'Key': key})
+            if len(self._pending) < S3_DELETE_BATCH:
+                return
+            batch, self._pending = self._pending, []
+        self._submit(batch)
+
+    def _submit(self, batch):
+        self._queued.acquire()
+        future = self._pool.submit(delete_batch, self.s3, self.bucket_name, batch, self.backup_type)
+        future.add_done_callback(lambda _: self._queued.release())
+        with self._lock:
+            self._futures.append(future)
+
+    def close(self):
+        """
+        Delete the last partial batch, wait for all batches and return the
+        number of objects deleted
+        """
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._submit(batch)
+        self._pool.shutdown(wait=True)
+        return sum(future.result() for future in self._futures)
+
 def delete_batch(s3, bucket_name, objects_to_delete, backup_type):
     """
-    Delete a batch of S3 objects
+    Delete a batch of S3 objects, returning how many were deleted
     """
     try:
         response = s3.delete_objects(
@@ -122,42 +416,19 @@ def delete_batch(s3, bucket_name, objects_to_delete, backup_type):
             for error in response['Errors']:
                 logger.error(f"Failed to delete {backup_type} object {error['Key']}: {error['Message']}")
 
+        return len(objects_to_delete) - len(response.get('Errors', []))
+
     except Exception as e:
         logger.error(f"Error deleting batch of {backup_type} objects: {str(e)}")
+        return 0
 
 def cleanup_ebs_snapshots(ec2, cluster_name, retention_days):
     """
-    Clean up EBS snapshots older than retention period
+    Clean up EBS snapshots the retention policy no longer keeps
     """
-    deleted_count = 0
-    cutoff_date = datetime.now() - timedelta(days=retention_days)
-
     try:
-        # Find snapshots created by the backup process
-        snapshots_response = ec2.describe_snapshots(
-            OwnerIds=['self'],
-            Filters=[
-                {
-                    'Name': 'tag:EKSCluster',
-                    'Values': [cluster_name]
-                },
-                {
-                    'Name': 'tag:BackupType',
-                    'Values': ['EKS-EBS-Automated']
-                }
-            ]
-        )
-
-        for snapshot in snapshots_response['Snapshots']:
-            snapshot_date = snapshot['StartTime'].replace(tzinfo=None)
-
-            if snapshot_date < cutoff_date:
-                try:
-                    ec2.delete_snapshot(SnapshotId=snapshot['SnapshotId'])
-                    deleted_count += 1
-                    logger.info(f"Deleted old snapshot: {snapshot['SnapshotId']}")
-                except Exception as e:
-                    logger.error(f"Failed to delete snapshot {snapshot['SnapshotId']}: {str(e)}")
+        policy = RetentionPolicy(retention_days, RETENTION_DAILY, RETENTION_WEEKLY, RETENTION_MONTHLY)
+        deleted_count = apply_retention(ec2, cluster_name, policy, DELETE_WORKERS)
 
         logger.info(f"Deleted {deleted_count} old EBS snapshots")
         return deleted_count
@@ -1,20 +1,62 @@
 import boto3
 import json
 import logging
-from datetime import datetime, timedelta
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 import os
 
+from snapshot_retention import RetentionPolicy, apply_retention, index_by_volume, list_backup_snapshots
+
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+# EC2 accepts at most 200 values per filter
+INSTANCE_ID_FILTER_CHUNK = 200
+
+# Concurrent EC2 describe calls during volume discovery
+DISCOVERY_WORKERS = int(os.environ.get('DISCOVERY_WORKERS', '8'))
+
+# Snapshot creation: 'volume' (one tagged snapshot per volume) or 'instance'
+# (one crash-consistent multi-volume set per attached instance)
+SNAPSHOT_MODE = os.environ.get('SNAPSHOT_MODE', 'volume').lower()
+
+# Concurrent snapshot create calls; throttled calls are retried with
+# adaptive client-side rate limiting and exponential backoff
+SNAPSHOT_WORKERS = int(os.environ.get('SNAPSHOT_WORKERS', '8'))
+EC2_MAX_ATTEMPTS = int(os.environ.get('EC2_MAX_ATTEMPTS', '10'))
+
+# Change detection: skip volumes with no writes (CloudWatch VolumeWriteOps)
+# since their last snapshot, unless that snapshot is older than the max age
+SKIP_UNCHANGED_VOLUMES = os.environ.get('SKIP_UNCHANGED_VOLUMES', 'false').lower() == 'true'
+SKIP_UNCHANGED_MAX_AGE_DAYS = int(os.environ.get('SKIP_UNCHANGED_MAX_AGE_DAYS', '7'))
+
+# GFS retention on top of RETENTION_DAYS: newest snapshot per volume of the
+# last N days / ISO weeks / months (0 = off), deleted by DELETE_WORKERS threads
+RETENTION_DAILY = int(os.environ.get('RETENTION_DAILY', '0'))
+RETENTION_WEEKLY = int(os.environ.get('RETENTION_WEEKLY', '0'))
+RETENTION_MONTHLY = int(os.environ.get('RETENTION_MONTHLY', '0'))
+DELETE_WORKERS = int(os.environ.get('DELETE_WORKERS', '8'))
+
+# GetMetricData limits: 500 queries and 100,800 datapoints per request
+METRIC_QUERIES_PER_REQUEST = 500
+METRIC_DATAPOINTS_PER_REQUEST = 100800
+WRITE_OPS_PERIOD_SECONDS = 3600
+
+# Tags set by this Lambda; copied volume tags never override them
+SNAPSHOT_TAG_KEYS = ('Name', 'EKSCluster', 'VolumeId', 'BackupType', 'CreatedBy', 'CreatedDate')
+
 def lambda_handler(event, context):
     """
     Lambda function to create EBS snapshots for EKS cluster volumes
     """
     try:
         # Initialize AWS clients
-        ec2 = boto3.client('ec2')
+        ec2 = boto3.client('ec2', config=Config(
+            retries={'max_attempts': EC2_MAX_ATTEMPTS, 'mode': 'adaptive'},
+            max_pool_connections=max(10, SNAPSHOT_WORKERS, DISCOVERY_WORKERS)
+        ))
         eks = boto3.client('eks')
 
         cluster_name = os.environ['CLUSTER_NAME']
@@ -39,27 +81,30 @@ def lambda_handler(event, context):
                 })
             }
 
+        # Leave volumes without writes since their last snapshot alone
+        volumes_skipped = []
+        if SKIP_UNCHANGED_VOLUMES:
+            cloudwatch = boto3.client('cloudwatch')
+            volumes, volumes_skipped = filter_unchanged_volumes(ec2, cloudwatch, volumes, cluster_name)
+
         # Create snapshots for each volume
-        snapshots_created = []
-        for volume in volumes:
-            try:
-                snapshot = create_volume_snapshot(ec2, volume, cluster_name)
-                if snapshot:
-                    snapshots_created.append(snapshot)
-                    logger.info(f"Created snapshot {snapshot['SnapshotId']} for volume {volume['VolumeId']}")
-            except Exception as e:
-                logger.error(f"Failed to create snapshot for volume {volume['VolumeId']}: {str(e)}")
+        snapshots_created = create_snapshots(ec2, volumes, cluster_name)
 
         # Clean up old snapshots
         cleanup_old_snapshots(ec2, cluster_name, retention_days)
 
-        logger.info(f"EBS snapshot process completed. Created {len(snapshots_created)} snapshots")
+        logger.info(
+            f"EBS snapshot process completed. Created {len(snapshots_created)} snapshots, "
+            f"skipped {len(volumes_skipped)} unchanged volumes"
+        )
 
         return {
             'statusCode': 200,
             'body': json.dumps({
                 'message': f'Successfully created {len(snapshots_created)} snapshots',
                 'snapshots_created': len(snapshots_created),
+                'volumes_snapshotted': len(volumes),
+                'volumes_skipped': len(volumes_skipped),
                 'cluster_name': cluster_name
             })
         }
@@ -77,68 +122,223 @@ def lambda_handler(event, context):
 def find_cluster_volumes(ec2, cluster_name):
     """
     Find all EBS volumes associated with the EKS cluster
+
+    Volumes attached to the cluster's instances and volumes carrying the
+    cluster tag are queried concurrently, every call paginated, and merged
+    by VolumeId
     """
-    volumes = []
+    cluster_filter = {
+        'Name': 'tag:kubernetes.io/cluster/' + cluster_name,
+        'Values': ['owned']
+    }
 
     try:
-        # Get all instances with the cluster tag
-        instances_response = ec2.describe_instances(
-            Filters=[
-                {
-                    'Name': 'tag:kubernetes.io/cluster/' + cluster_name,
-                    'Values': ['owned']
-                },
-                {
-                    'Name': 'instance-state-name',
-                    'Values': ['running', 'stopped']
-                }
+        with ThreadPoolExecutor(max_workers=DISCOVERY_WORKERS) as pool:
+            # Tag-based lookup runs while the instances are listed
+            tagged = pool.submit(describe_all_volumes, ec2, [cluster_filter])
+
+            instance_ids = list_cluster_instance_ids(ec2, cluster_filter)
+            if not instance_ids:
+                logger.info(f"No instances found for cluster: {cluster_name}")
+
+            # Volumes attached to these instances, one query per filter-sized chunk
+            attached = [
+                pool.submit(describe_all_volumes, ec2, [{'Name': 'attachment.instance-id', 'Values': chunk}])
+                for chunk in chunked(instance_ids, INSTANCE_ID_FILTER_CHUNK)
             ]
-        )
 
-        instance_ids = []
-        for reservation in instances_response['Reservations']:
+            # Merge and deduplicate volumes
+            unique_volumes = {}
+            for future in attached + [tagged]:
+                for volume in future.result():
+                    unique_volumes[volume['VolumeId']] = volume
+
+        logger.info(f"Found {len(unique_volumes)} volumes on {len(instance_ids)} instances")
+        return list(unique_volumes.values())
+
+    except Exception as e:
+        logger.error(f"Error finding cluster volumes: {str(e)}")
+        return []
+
+def list_cluster_instance_ids(ec2, cluster_filter):
+    """
+    IDs of the cluster's running and stopped instances, across all pages
+    """
+    instance_ids = []
+    paginator = ec2.get_paginator('describe_instances')
+    pages = paginator.paginate(
+        Filters=[
+            cluster_filter,
+            {
+                'Name': 'instance-state-name',
+                'Values': ['running', 'stopped']
+            }
+        ],
+        PaginationConfig={'PageSize': 1000}
+    )
+
+    for page in pages:
+        for reservation in page['Reservations']:
             for instance in reservation['Instances']:
                 instance_ids.append(instance['InstanceId'])
 
-        if not instance_ids:
-            logger.info(f"No instances found for cluster: {cluster_name}")
-            return volumes
-
-        # Get volumes attached to these instances
-        volumes_response = ec2.describe_volumes(
-            Filters=[
-                {
-         'Name': 'attachment.instance-id',
-                    'Values': instance_ids
-                }
-            ]
-        )
+    return instance_ids
 
-        volumes = volumes_response['Volumes']
+def describe_all_volumes(ec2, filters):
+    """
+    Every volume matching filters, across all pages
+    """
+    volumes = []
+    paginator = ec2.get_paginator('describe_volumes')
+    for page in paginator.paginate(Filters=filters, PaginationConfig={'PageSize': 500}):
+        volumes.extend(page['Volumes'])
+    return volumes
 
-        # Also look for volumes with cluster tags directly
-        cluster_volumes_response = ec2.describe_volumes(
-            Filters=[
-                {
-                    'Name': 'tag:kubernetes.io/cluster/' + cluster_name,
-                    'Values': ['owned']
-                }
-            ]
-        )
+def chunked(items, size):
+    """
+    Consecutive slices of items of at most size elements
+    """
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
-        # Merge and deduplicate volumes
-        all_volumes = volumes + cluster_volumes_response['Volumes']
-        unique_volumes = {v['VolumeId']: v for v in all_volumes}.values()
+def filter_unchanged_volumes(ec2, cloudwatch, volumes, cluster_name):
+    """
+    Split volumes into (to snapshot, skipped)
+
+    A volume is skipped when its last snapshot by this Lambda is younger
+    than SKIP_UNCHANGED_MAX_AGE_DAYS and CloudWatch reports no write
+    operations since then (detached volumes report no datapoints at all).
+    EBS direct APIs only compare two snapshots, so they cannot see writes
+    made after the last one. In 'instance' mode a node's volumes stay
+    together: if one changed, the whole crash-consistent set is taken.
+    """
+    now = datetime.now(timezone.utc)
+    max_age = timedelta(days=SKIP_UNCHANGED_MAX_AGE_DAYS)
+    last_snapshots = latest_snapshot_by_volume(ec2, cluster_name)
 
-        return list(unique_volumes)
+    candidates = {}
+    for volume in volumes:
+        snapshot = last_snapshots.get(volume['VolumeId'])
+        if snapshot is not None and now - snapshot['StartTime'] < max_age:
+            candidates[volume['VolumeId']] = snapshot['StartTime']
 
+    try:
+        writes = volume_write_ops_since(cloudwatch, candidates, now)
     except Exception as e:
-        logger.error(f"Error finding cluster volumes: {str(e)}")
-        return []
+        logger.error(f"Error reading volume write metrics, snapshotting every volume: {str(e)}")
+        return volumes, []
+
+    def unchanged(volume):
+        volume_id = volume['VolumeId']
+        if volume_id not in candidates:
+            return False
+        if volume_id in writes:
+            return writes[volume_id] == 0
+        return volume.get('State') == 'available'
+
+    changed = [v for v in volumes if not unchanged(v)]
+    if SNAPSHOT_MODE == 'instance':
+        changed_instances = {attached_instance_id(v) for v in changed} - {None}
+        changed = [v for v in volumes if not unchanged(v) or attached_instance_id(v) in changed_instances]
+
+    changed_ids = {v['VolumeId'] for v in changed}
+    skipped = [v for v in volumes if v['VolumeId'] not in changed_ids]
+
+    logger.info(f"Change detection: {len(changed)} volumes to snapshot, {len(skipped)} unchanged")
+    return changed, skipped
+
+def latest_snapshot_by_volume(ec2, cluster_name):
+    """
+    Newest usable snapshot created by this Lambda for each VolumeId
+    """
+    latest = {}
+    for volume_id, snapshots in index_by_volume(list_backup_snapshots(ec2, cluster_name)).items():
+        usable = [snapshot for snapshot in snapshots if snapshot.get('State') != 'error']
+        if usable:
+            latest[volume_id] = usable[0]
+    return latest
+
+def volume_write_ops_since(cloudwatch, since_by_volume, now):
+    """
+    Sum of VolumeWriteOps per volume since the given time, for volumes
+    CloudWatch has datapoints for; batched into few GetMetricData calls
+    """
+    if not since_by_volume:
+        return {}
+
+    period = timedelta(seconds=WRITE_OPS_PERIOD_SECONDS)
+    volume_ids = list(since_by_volume)
+    # Whole periods, and the one holding the snapshot start counts as changed
+    start = min(since_by_volume.values()) - period
+    points_per_volume = int((now - start) / period) + 1
+    batch_size = max(1, min(METRIC_QUERIES_PER_REQUEST, METRIC_DATAPOINTS_PER_REQUEST // points_per_volume))
+
+    writes = {}
+    paginator = cloudwatch.get_paginator('get_metric_data')
+    for batch in chunked(volume_ids, batch_size):
+        queries = [
+            {
+                'Id': f"v{index}",
+                'MetricStat': {
+                    'Metric': {
+                        'Namespace': 'AWS/EBS',
+                        'MetricName': 'VolumeWriteOps',
+                        'Dimensions': [{'Name': 'VolumeId', 'Value': volume_id}]
+                    },
+                    'Period': WRITE_OPS_PERIOD_SECONDS,
+                    'Stat': 'Sum'
+                },
+                'ReturnData': True
+            }
+            for index, volume_id in enumerate(batch)
+        ]
+
+        for page in paginator.paginate(MetricDataQueries=queries, StartTime=start, EndTime=now):
+            for result in page['MetricDataResults']:
+                volume_id = batch[int(result['Id'][1:])]
+                since = since_by_volume[volume_id] - period
+                for timestamp, value in zip(result['Timestamps'], result['Values']):
+                    if timestamp >= since:
+                        writes[volume_id] = writes.get(volume_id, 0) + value
+
+    return writes
+
+def create_snapshots(ec2, volumes, cluster_name):
+    """
+    Snapshot every volume on a bounded pool of SNAPSHOT_WORKERS threads
+
+    In 'instance' mode the volumes of each attached instance are captured
+    as one crash-consistent set with create_snapshots; detached volumes,
+    and every volume in 'volume' mode, get one create_snapshot call.
+    Snapshots are tagged at creation, so each volume costs one API call;
+    an instance set adds one create_tags call per distinct set of copied
+    volume tags.
+    """
+    tasks = []
+    if SNAPSHOT_MODE == 'instance':
+        by_instance = {}
+        for volume in volumes:
+            instance_id = attached_instance_id(volume)
+            if instance_id:
+                by_instance.setdefault(instance_id, []).append(volume)
+            else:
+                tasks.append((create_volume_snapshot, volume))
+        tasks.extend((create_instance_snapshots, (instance_id, group)) for instance_id, group in by_instance.items())
+    else:
+        tasks = [(create_volume_snapshot, volume) for volume in volumes]
+
+    snapshots_created = []
+    with ThreadPoolExecutor(max_workers=max(1, SNAPSHOT_WORKERS)) as pool:
+        futures = [pool.submit(create, ec2, target, cluster_name) for create, target in tasks]
+        for future in futures:
+            snapshots_created.extend(future.result())
+
+    return snapshots_created
 
 def create_volume_snapshot(ec2, volume, cluster_name):
     """
-    Create a snapshot for a given EBS volume
+    Create a snapshot for a given EBS volume, tagged on creation
+    Returns a list with the snapshot, or an empty list on failure
     """
     try:
         volume_id = volume['VolumeId']
@@ -147,92 +347,137 @@ def create_volume_snapshot(ec2, volume, cluster_name):
         # Create snapshot description
         description = f"EKS-{cluster_name}-{volume_id}-{timestamp}"
 
-        # Create the snapshot
+        tags = snapshot_tags(description, cluster_name, volume_id)
+
+        # Copy existing volume tags
+        tags.extend(copyable_tags(volume.get('Tags', [])))
+
+        # Create and tag the snapshot in one call
         response = ec2.create_snapshot(
             VolumeId=volume_id,
-            Description=description
+            Description=description,
+            TagSpecifications=[{'ResourceType': 'snapshot', 'Tags': tags}]
         )
 
-        snapshot_id = response['SnapshotId']
+        logger.info(f"Created snapshot {response['SnapshotId']} for volume {volume_id}")
+        return [response]
 
-        # Tag the snapshot
-        tags = [
-            {
-                'Key': 'Name',
-                'Value': description
-            },
-            {
-                'Key': 'EKSCluster',
-                'Value': cluster_name
-            },
-            {
-                'Key': 'VolumeId',
-                'Value': volume_id
-            },
-            {
-                'Key': 'BackupType',
-                'Value': 'EKS-EBS-Automated'
-            },
-            {
-                'Key': 'CreatedBy',
-                'Value': 'EKS-Backup-Lambda'
-            },
-            {
-                'Key': 'CreatedDate',
-                'Value': datetime.now().isoformat()
-            }
-        ]
+    except Exception as e:
+        logger.error(f"Error creating snapshot for volume {volume['VolumeId']}: {str(e)}")
+        return []
 
-        # Copy existing volume tags
-        if 'Tags' in volume:
-            for tag in volume['Tags']:
-                if tag['Key'] not in ['Name', 'EKSCluster', 'VolumeId', 'BackupType', 'CreatedBy', 'CreatedDate']:
-                    tags.append(tag)
-
-        ec2.create_tags(
-            Resources=[snapshot_id],
-            Tags=tags
+def create_instance_snapshots(ec2, target, cluster_name):
+    """
+    Create one crash-consistent snapshot set of all volumes attached to an
+    instance; the VolumeId of each snapshot is its own VolumeId attribute
+    Returns the snapshots, or an empty list on failure
+    """
+    instance_id, volumes = target
+    try:
+        timestamp = datetime.now().strftime('%Y-%m-%d-%H-%M-%S')
+        description = f"EKS-{cluster_name}-{instance_id}-{timestamp}"
+
+        tags = snapshot_tags(description, cluster_name)
+        tags.append({'Key': 'InstanceId', 'Value': instance_id})
+
+        response = ec2.create_snapshots(
+            InstanceSpecification={'InstanceId': instance_id, 'ExcludeBootVolume': False},
+            Description=description,
+            TagSpecifications=[{'ResourceType': 'snapshot', 'Tags': tags}]
         )
 
-        return response
+        snapshots = response['Snapshots']
+        logger.info(f"Created {len(snapshots)} crash-consistent snapshots for instance {instance_id}")
+        copy_volume_tags(ec2, snapshots, volumes)
+        return snapshots
 
     except Exception as e:
-        logger.error(f"Error creating snapshot for volume {volume['VolumeId']}: {str(e)}")
-        return None
+        volume_ids = ', '.join(v['VolumeId'] for v in volumes)
+        logger.error(f"Error creating snapshots for instance {instance_id} ({volume_ids}): {str(e)}")
+        return []
+
+def snapshot_tags(description, cluster_name, volume_id=None):
+    """
+    Tags this Lambda sets on every snapshot it creates
+    """
+    tags = [
+        {
+            'Key': 'Name',
+            'Value': description
+        },
+        {
+            'Key': 'EKSCluster',
+            'Value': cluster_name
+        },
+        {
+            'Key': 'BackupType',
+            'Value': 'EKS-EBS-Automated'
+        },
+        {
+            'Key': 'CreatedBy',
+            'Value': 'EKS-Backup-Lambda'
+        },
+        {
+            'Key': 'CreatedDate',
+            'Value': datetime.now().isoformat()
+        }
+    ]
+
+    if volume_id:
+        tags.append({'Key': 'VolumeId', 'Value': volume_id})
+
+    return tags
+
+def copyable_tags(tags):
+    """
+    Volume tags that may be copied to a snapshot (not ours, not aws: reserved)
+    """
+    return [
+        tag for tag in tags
+        if tag['Key'] not in SNAPSHOT_TAG_KEYS and not tag['Key'].startswith('aws:')
+    ]
+
+def copy_volume_tags(ec2, snapshots, volumes):
+    """
+    Copy each volume's copyable tags to its snapshot of a multi-volume set,
+    one create_tags call per distinct tag set
+
+    CopyTagsFromSource='volume' copies every volume tag, and EC2 rejects
+    the whole set when one repeats a key of ours (e.g. a node volume's
+    Name), so the copy is explicit and filtered as in 'volume' mode. A
+    failed copy is logged; the snapshots keep the tags set on creation.
+    """
+    tags_by_volume = {volume['VolumeId']: copyable_tags(volume.get('Tags', [])) for volume in volumes}
+
+    snapshots_by_tags = {}
+    for snapshot in snapshots:
+        tags = tags_by_volume.get(snapshot['VolumeId'])
+        if tags:
+            key = tuple(sorted((tag['Key'], tag['Value']) for tag in tags))
+            snapshots_by_tags.setdefault(key, []).append(snapshot['SnapshotId'])
+
+    for key, snapshot_ids in snapshots_by_tags.items():
+        try:
+            ec2.create_tags(Resources=snapshot_ids, Tags=[{'Key': k, 'Value': v} for k, v in key])
+        except Exception as e:
+            logger.error(f"Error copying volume tags to snapshots {', '.join(snapshot_ids)}: {str(e)}")
+
+def attached_instance_id(volume):
+    """
+    Instance a volume is attached to, or None when detached
+    """
+    for attachment in volume.get('Attachments', []):
+        if attachment.get('State') in ('attached', 'attaching'):
+            return attachment['InstanceId']
+    return None
 
 def cleanup_old_snapshots(ec2, cluster_name, retention_days):
     """
-    Clean up snapshots older than retention period
+    Clean up snapshots the retention policy no longer keeps
     """
     try:
-        cutoff_date = datetime.now() - timedelta(days=retention_days)
-
-        # Find snapshots created by this backup process
-        snapshots_response = ec2.describe_snapshots(
-            OwnerIds=['self'],
-            Filters=[
-                {
-                    'Name': 'tag:EKSCluster',
-                    'Values': [cluster_name]
-                },
-                {
-                    'Name': 'tag:BackupType',
-                    'Values': ['EKS-EBS-Automated']
-                }
-            ]
-        )
-
-        deleted_count = 0
-        for snapshot in snapshots_response['Snapshots']:
-            snapshot_date = snapshot['StartTime'].replace(tzinfo=None)
-
-            if snapshot_date < cutoff_date:
-                try:
-                    ec2.delete_snapshot(SnapshotId=snapshot['SnapshotId'])
-                    deleted_count += 1
-                    logger.info(f"Deleted old snapshot: {snapshot['SnapshotId']}")
-                except Exception as e:
-                    logger.error(f"Failed to delete snapshot {snapshot['SnapshotId']}: {str(e)}")
+        policy = RetentionPolicy(retention_days, RETENTION_DAILY, RETENTION_WEEKLY, RETENTION_MONTHLY)
+        deleted_count = apply_retention(ec2, cluster_name, policy, DELETE_WORKERS)
 
         logger.info(f"Cleaned up {deleted_count} old snapshots")
 
@@ -0,0 +1,179 @@
+"""
+S3 Inventory reader for the backup-cleanup Lambda
+
+Finds the newest inventory report of a bucket and streams the keys of
+objects last modified before a cutoff out of its CSV or Parquet files,
+so expired backups can be deleted without listing the bucket. CSV files
+are decompressed and filtered on the fly (ISO-8601 timestamps compare as
+strings); Parquet files, and CSV when pyarrow is installed (e.g. from a
+Lambda layer), are filtered a record batch at a time with pyarrow.compute.
+"""
+import csv
+import gzip
+import io
+import json
+import logging
+import re
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from urllib.parse import unquote_plus
+
+logger = logging.getLogger()
+
+# Optional: loaded by load_pyarrow(), absent from the plain Lambda runtime
+pa = pc = pq = pa_csv = None
+
+# Report folders are named after their delivery time, e.g. 2024-01-15T01-00Z
+REPORT_FOLDER = re.compile(r'/(\d{4}-\d{2}-\d{2}T\d{2}-\d{2}Z)/$')
+REPORT_TIME_FORMAT = '%Y-%m-%dT%H-%MZ'
+# Reports not yet complete are retried against the previous delivery
+MAX_REPORTS_TRIED = 3
+
+EPOCH = datetime(1970, 1, 1)
+TICKS_PER_SECOND = {'s': 1, 'ms': 10 ** 3, 'us': 10 ** 6, 'ns': 10 ** 9}
+
+# Records per pyarrow batch and CSV block size
+BATCH_ROWS = 65536
+CSV_BLOCK_SIZE = 8 << 20
+
+def load_pyarrow():
+    """
+    Import pyarrow on first use; False when it is not installed
+    """
+    global pa, pc, pq, pa_csv
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.compute
+            import pyarrow.csv
+            import pyarrow.parquet
+        except ImportError:
+            return False
+        pa, pc, pq, pa_csv = pyarrow, pyarrow.compute, pyarrow.parquet, pyarrow.csv
+    return True
+
+def latest_manifest(s3, inventory_bucket, inventory_prefix, source_bucket, config_id, max_age_hours):
+    """
+    Manifest of the newest complete inventory report of source_bucket, or
+    None when there is none younger than max_age_hours
+    """
+    prefix = '/'.join(p for p in (inventory_prefix.strip('/'), source_bucket, config_id) if p) + '/'
+    folders = []
+    paginator = s3.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=inventory_bucket, Prefix=prefix, Delimiter='/'):
+        for common_prefix in page.get('CommonPrefixes', []):
+            match = REPORT_FOLDER.search(common_prefix['Prefix'])
+            if match:
+                folders.append((match.group(1), common_prefix['Prefix']))
+
+    oldest = datetime.utcnow() - timedelta(hours=max_age_hours)
+    for name, folder in sorted(folders, reverse=True)[:MAX_REPORTS_TRIED]:
+        if datetime.strptime(name, REPORT_TIME_FORMAT) < oldest:
+            logger.warning(f"Newest inventory report of {source_bucket} ({name}) is older than {max_age_hours}h")
+            return None
+        try:
+            # manifest.checksum is written last, once the report is complete
+            s3.head_object(Bucket=inventory_bucket, Key=folder + 'manifest.checksum')
+            body = s3.get_object(Bucket=inventory_bucket, Key=folder + 'manifest.json')['Body']
+        except Exception as e:
+            logger.warning(f"Skipping inventory report {folder}: {str(e)}")
+            continue
+        manifest = json.loads(body.read())
+        manifest['reportTime'] = name
+        return manifest
+
+    logger.warning(f"No inventory report of {source_bucket} under s3://{inventory_bucket}/{prefix}")
+    return None
+
+def is_supported(manifest):
+    """
+    Whether expired_keys can read the report's files here
+    """
+    file_format = manifest.get('fileFormat')
+    if file_format == 'CSV':
+        return 'LastModifiedDate' in csv_columns(manifest)
+    if file_format == 'Parquet':
+        return load_pyarrow()
+    return False
+
+def csv_columns(manifest):
+    return [name.strip() for name in manifest.get('fileSchema', '').split(',')]
+
+def expired_keys(s3, manifest, cutoff_date):
+    """
+    Yield lists of keys last modified before cutoff_date (naive UTC), one
+    inventory file at a time
+    """
+    inventory_bucket = manifest['destinationBucket'].split(':::')[-1]
+    for inventory_file in manifest['files']:
+        body = s3.get_object(Bucket=inventory_bucket, Key=inventory_file['key'])['Body']
+        if manifest['fileFormat'] == 'Parquet':
+            yield from parquet_expired_keys(body, cutoff_date)
+        elif load_pyarrow():
+            yield from arrow_csv_expired_keys(body, csv_columns(manifest), cutoff_date)
+        else:
+            yield from csv_expired_keys(body, csv_columns(manifest), cutoff_date)
+
+def csv_expired_keys(body, columns, cutoff_date):
+    """
+    Row-by-row filter of a gzipped inventory CSV without pyarrow
+    """
+    key_index = columns.index('Key')
+    modified_index = columns.index('LastModifiedDate')
+    cutoff = cutoff_date.strftime('%Y-%m-%dT%H:%M:%S')
+
+    batch = []
+    with gzip.open(body, 'rt', newline='') as rows:
+        for row in csv.reader(rows):
+            if row[modified_index] < cutoff:
+                batch.append(unquote_plus(row[key_index]))
+                if len(batch) >= BATCH_ROWS:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+def arrow_csv_expired_keys(body, columns, cutoff_date):
+    """
+    Streaming, vectorized filter of a gzipped inventory CSV
+    """
+    cutoff = cutoff_date.strftime('%Y-%m-%dT%H:%M:%S')
+    reader = pa_csv.open_csv(
+        pa.input_stream(body, compression='gzip'),
+        read_options=pa_csv.ReadOptions(column_names=columns, block_size=CSV_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=['Key', 'LastModifiedDate'],
+            column_types={'Key': pa.string(), 'LastModifiedDate': pa.string()}
+        )
+    )
+    for batch in reader:
+        expired = pc.filter(batch.column(0), pc.less(batch.column(1), cutoff))
+        if len(expired):
+            # CSV inventory keys are URL-encoded
+            yield [unquote_plus(key) for key in expired.to_pylist()]
+
+def epoch_ticks(moment, unit):
+    """
+    Naive UTC datetime as an integer timestamp in unit ('s', 'ms', 'us', 'ns')
+    """
+    elapsed = moment - EPOCH
+    micros = (elapsed.days * 86400 + elapsed.seconds) * 10 ** 6 + elapsed.microseconds
+    return micros * TICKS_PER_SECOND[unit] // 10 ** 6
+
+def parquet_expired_keys(body, cutoff_date):
+    """
+    Vectorized filter of an inventory Parquet file, spooled to /tmp since
+    Parquet needs random access
+    """
+    with tempfile.TemporaryFile() as spool:
+        shutil.copyfileobj(body, spool, io.DEFAULT_BUFFER_SIZE * 64)
+        spool.seek(0)
+        parquet = pq.ParquetFile(spool)
+        for batch in parquet.iter_batches(batch_size=BATCH_ROWS, columns=['key', 'last_modified_date']):
+            # Compared as integers in the column's unit, whatever its time zone
+            cutoff = epoch_ticks(cutoff_date, batch.column(1).type.unit)
+            modified = pc.cast(batch.column(1), pa.int64())
+            expired = pc.filter(batch.column(0), pc.less(modified, cutoff))
+            if len(expired):
+                yield expired.to_pylist()
@@ -0,0 +1,161 @@
+"""
+EBS snapshot retention shared by the ebs-snapshot and backup-cleanup Lambdas
+
+Snapshots created by the backup process are listed across all pages,
+indexed by volume (newest first) and matched against a retention policy:
+everything younger than retention_days is kept, plus, per volume, the
+newest snapshot of each of the last `daily` days, `weekly` ISO weeks and
+`monthly` months that have one (grandfather-father-son). The rest is
+deleted on a bounded pool of threads.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger()
+
+# Snapshot still referenced (e.g. by an AMI) or already gone
+SNAPSHOT_IN_USE_CODES = ('InvalidSnapshot.InUse',)
+SNAPSHOT_MISSING_CODES = ('InvalidSnapshot.NotFound',)
+
+class RetentionPolicy:
+    """
+    Flat retention_days, optionally extended with GFS counts (0 = off)
+    """
+
+    def __init__(self, retention_days, daily=0, weekly=0, monthly=0):
+        self.retention_days = retention_days
+        self.daily = daily
+        self.weekly = weekly
+        self.monthly = monthly
+
+    def __repr__(self):
+        return (
+            f"RetentionPolicy(retention_days={self.retention_days}, daily={self.daily}, "
+            f"weekly={self.weekly}, monthly={self.monthly})"
+        )
+
+    def snapshots_to_delete(self, index, now=None):
+        """
+        Snapshots of a by-volume index (see index_by_volume) that the policy
+        does not retain; pending snapshots are never deleted
+        """
+        now = now or datetime.now(timezone.utc)
+        cutoff = now - timedelta(days=self.retention_days)
+        buckets = (
+            (self.daily, lambda t: t.date()),
+            (self.weekly, lambda t: t.isocalendar()[:2]),
+            (self.monthly, lambda t: (t.year, t.month)),
+        )
+
+        expired = []
+        for snapshots in index.values():
+            keep = set()
+            for count, period in buckets:
+                if count:
+                    keep.update(newest_per_period(snapshots, period, count))
+
+            for snapshot in snapshots:
+                if snapshot['StartTime'] >= cutoff or snapshot.get('State') == 'pending':
+                    continue
+                if snapshot['SnapshotId'] not in keep:
+                    expired.append(snapshot)
+
+        return expired
+
+def newest_per_period(snapshots, period, count):
+    """
+    IDs of the newest usable snapshot in each of the `count` most recent
+    periods that have one; snapshots are sorted newest first
+    """
+    kept = []
+    seen = set()
+    for snapshot in snapshots:
+        if snapshot.get('State') == 'error':
+            continue
+        key = period(snapshot['StartTime'])
+        if key not in seen:
+            seen.add(key)
+            kept.append(snapshot['SnapshotId'])
+            if len(kept) == count:
+                break
+    return kept
+
+def list_backup_snapshots(ec2, cluster_name):
+    """
+    Every snapshot created by the backup process for the cluster, all pages
+    """
+    snapshots = []
+    paginator = ec2.get_paginator('describe_snapshots')
+    pages = paginator.paginate(
+        OwnerIds=['self'],
+        Filters=[
+            {
+                'Name': 'tag:EKSCluster',
+                'Values': [cluster_name]
+            },
+            {
+                'Name': 'tag:BackupType',
+                'Values': ['EKS-EBS-Automated']
+            }
+        ],
+        PaginationConfig={'PageSize': 1000}
+    )
+
+    for page in pages:
+        snapshots.extend(page['Snapshots'])
+
+    return snapshots
+
+def index_by_volume(snapshots):
+    """
+    VolumeId -> that volume's snapshots, newest first
+    """
+    index = {}
+    for snapshot in snapshots:
+        index.setdefault(snapshot['VolumeId'], []).append(snapshot)
+    for volume_snapshots in index.values():
+        volume_snapshots.sort(key=lambda s: s['StartTime'], reverse=True)
+    return index
+
+def delete_snapshots(ec2, snapshots, workers=8):
+    """
+    Delete snapshots concurrently; the client's adaptive retry mode paces
+    throttled calls. Returns the number deleted.
+    """
+    def delete(snapshot):
+        snapshot_id = snapshot['SnapshotId']
+        try:
+            ec2.delete_snapshot(SnapshotId=snapshot_id)
+            logger.info(f"Deleted old snapshot: {snapshot_id}")
+            return True
+        except Exception as e:
+            code = getattr(e, 'response', {}).get('Error', {}).get('Code')
+            if code in SNAPSHOT_MISSING_CODES:
+                return True
+            if code in SNAPSHOT_IN_USE_CODES:
+                logger.warning(f"Keeping snapshot {snapshot_id}, still in use: {str(e)}")
+            else:
+                logger.error(f"Failed to delete snapshot {snapshot_id}: {str(e)}")
+            return False
+
+    if not snapshots:
+        return 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return sum(pool.map(delete, snapshots))
+
+def apply_retention(ec2, cluster_name, policy, workers=8, now=None):
+    """
+    List, index and expire the cluster's backup snapshots under policy
+    Returns the number of snapshots deleted
+    """
+    snapshots = list_backup_snapshots(ec2, cluster_name)
+    index = index_by_volume(snapshots)
+    expired = policy.snapshots_to_delete(index, now)
+
+    logger.info(
+        f"Retention {policy}: {len(snapshots)} snapshots of {len(index)} volumes, "
+        f"{len(expired)} to delete"
+    )
+    return delete_snapshots(ec2, expired, workers)
@@ -210,6 +210,7 @@ resource "aws_iam_policy" "ebs_snapshot_lambda" {
           "ec2:DescribeVolumes",
           "ec2:DescribeSnapshots",
           "ec2:CreateSnapshot",
+          "ec2:CreateSnapshots",
           "ec2:DeleteSnapshot",
           "ec2:CreateTags",
           "ec2:DescribeInstances"
@@ -223,6 +224,11 @@ resource "aws_iam_policy" "ebs_snapshot_lambda" {
           "eks:ListClusters"
         ]
         Resource = "*"
+      },
+      {
+        Effect   = "Allow"
+        Action   = "cloudwatch:GetMetricData"
+        Resource = "*"
       }
     ]
   })
@@ -296,6 +302,125 @@ resource "aws_s3_bucket_lifecycle_configuration" "etcd_backups" {
   }
 }
 
+############################
+# S3 Inventory for Backup Cleanup
+############################
+
+# Daily inventory reports of the backup buckets, read by the cleanup Lambda
+# instead of listing the buckets (backup_cleanup_s3_mode = "inventory")
+resource "aws_s3_bucket" "backup_inventory" {
+  count  = var.backup_cleanup_s3_mode == "inventory" ? 1 : 0
+  bucket = "${var.cluster_name}-backup-inventory-${data.aws_caller_identity.current.account_id}"
+
+  tags = merge(var.tags, {
+    Name      = "${var.cluster_name}-backup-inventory"
+    Purpose   = "EKSBackup"
+    Component = "BackupCleanup"
+  })
+}
+
+# SSE-S3, since S3 Inventory cannot deliver to a bucket whose default
+# KMS key does not grant it access
+resource "aws_s3_bucket_server_side_encryption_configuration" "backup_inventory" {
+  count  = var.backup_cleanup_s3_mode == "inventory" ? 1 : 0
+  bucket = aws_s3_bucket.backup_inventory[0].id
+
+  rule {
+    apply_server_side_encryption_by_default {
+      sse_algorithm = "AES256"
+    }
+  }
+}
+
+resource "aws_s3_bucket_public_access_block" "backup_inventory" {
+  count  = var.backup_cleanup_s3_mode == "inventory" ? 1 : 0
+  bucket = aws_s3_bucket.backup_inventory[0].id
+
+  block_public_acls       = true
+  block_public_policy     = true
+  ignore_public_acls      = true
+  restrict_public_buckets = true
+}
+
+# Only the newest report is read
+resource "aws_s3_bucket_lifecycle_configuration" "backup_inventory" {
+  count  = var.backup_cleanup_s3_mode == "inventory" ? 1 : 0
+  bucket = aws_s3_bucket.backup_inventory[0].id
+
+  rule {
+    id     = "backup-inventory-lifecycle"
+    status = "Enabled"
+
+    filter {}
+
+    expiration {
+      days = 7
+    }
+  }
+}
+
+resource "aws_s3_bucket_policy" "backup_inventory" {
+  count  = var.backup_cleanup_s3_mode == "inventory" ? 1 : 0
+  bucket = aws_s3_bucket.backup_inventory[0].id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Sid    = "InventoryDelivery"
+        Effect = "Allow"
+        Principal = {
+          Service = "s3.amazonaws.com"
+        }
+        Action   = "s3:PutObject"
+        Resource = "${aws_s3_bucket.backup_inventory[0].arn}/*"
+        Condition = {
+          StringEquals = {
+            "aws:SourceAccount" = data.aws_caller_identity.current.account_id
+            "s3:x-amz-acl"      = "bucket-owner-full-control"
+          }
+          ArnLike = {
+            "aws:SourceArn" = [
+              aws_s3_bucket.velero_backups.arn,
+              aws_s3_bucket.etcd_backups.arn
+            ]
+          }
+        }
+      }
+    ]
+  })
+}
+
+resource "aws_s3_bucket_inventory" "backup_buckets" {
+  for_each = var.backup_cleanup_s3_mode == "inventory" ? {
+    velero = aws_s3_bucket.velero_backups.id
+    etcd   = aws_s3_bucket.etcd_backups.id
+  } : {}
+
+  bucket                   = each.value
+  name                     = "backup-cleanup"
+  included_object_versions = "Current"
+  optional_fields          = ["Size", "LastModifiedDate"]
+
+  schedule {
+    frequency = "Daily"
+  }
+
+  destination {
+    bucket {
+      format     = var.backup_inventory_format
+      bucket_arn = aws_s3_bucket.backup_inventory[0].arn
+      prefix     = "inventory"
+
+      encryption {
+        sse_s3 {}
+      }
+    }
+  }
+
+  depends_on = [aws_s3_bucket_policy.backup_inventory]
+}
+
 ############################
 # Cross-Region Replication for DR
 ############################
@@ -81,6 +81,87 @@ variable "enable_ebs_snapshots" {
   default     = true
 }
 
+variable "ebs_snapshot_mode" {
+  description = "EBS snapshot creation: volume (one snapshot per volume) or instance (crash-consistent multi-volume sets per node)"
+  type        = string
+  default     = "volume"
+
+  validation {
+    condition     = contains(["volume", "instance"], var.ebs_snapshot_mode)
+    error_message = "ebs_snapshot_mode must be volume or instance."
+  }
+}
+
+variable "ebs_snapshot_skip_unchanged" {
+  description = "Skip volumes with no CloudWatch write operations since their last automated snapshot"
+  type        = bool
+  default     = false
+}
+
+variable "ebs_snapshot_skip_max_age_days" {
+  description = "Snapshot unchanged volumes anyway once their last snapshot is this old (keep below backup_retention_days)"
+  type        = number
+  default     = 7
+}
+
+variable "snapshot_retention_daily" {
+  description = "Beyond backup_retention_days, keep each volume's newest EBS snapshot of this many recent days (0 = off)"
+  type        = number
+  default     = 0
+}
+
+variable "snapshot_retention_weekly" {
+  description = "Beyond backup_retention_days, keep each volume's newest EBS snapshot of this many recent ISO weeks (0 = off)"
+  type        = number
+  default     = 0
+}
+
+variable "snapshot_retention_monthly" {
+  description = "Beyond backup_retention_days, keep each volume's newest EBS snapshot of this many recent months (0 = off)"
+  type        = number
+  default     = 0
+}
+
+variable "ebs_snapshot_concurrency" {
+  description = "Concurrent EBS snapshot create calls per run"
+  type        = number
+  default     = 8
+}
+
+variable "backup_cleanup_s3_mode" {
+  description = "How the cleanup Lambda finds expired objects in the Velero and ETCD buckets: scan (one listing of every object), prefix (parallel per-prefix listing, dated backup prefixes pruned by name) or inventory (daily S3 Inventory reports, falling back to scan)"
+  type        = string
+  default     = "scan"
+
+  validation {
+    condition     = contains(["scan", "prefix", "inventory"], var.backup_cleanup_s3_mode)
+    error_message = "backup_cleanup_s3_mode must be scan, prefix or inventory."
+  }
+}
+
+variable "backup_inventory_format" {
+  description = "S3 Inventory report format in backup_cleanup_s3_mode = inventory: CSV, or Parquet (needs pyarrow, e.g. through backup_cleanup_layers)"
+  type        = string
+  default     = "CSV"
+
+  validation {
+    condition     = contains(["CSV", "Parquet"], var.backup_inventory_format)
+    error_message = "backup_inventory_format must be CSV or Parquet."
+  }
+}
+
+variable "backup_cleanup_layers" {
+  description = "Lambda layer ARNs for the cleanup function, e.g. one providing pyarrow for Parquet inventory reports"
+  type        = list(string)
+  default     = []
+}
+
+variable "backup_cleanup_list_concurrency" {
+  description = "Concurrent S3 prefix listings in backup_cleanup_s3_mode = prefix"
+  type        = number
+  default     = 8
+}
+
 variable "enable_etcd_backup" {
   description = "Enable ETCD backup (for self-managed clusters)"
   type        = bool
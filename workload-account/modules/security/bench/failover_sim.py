@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Fail-Close Simulator for the Inspection Controller
+
+Replays firewall health timelines through the controller's own state
+machine (inspection_controller.sample_health / next_state) in virtual
+time: scheduled polls, EventBridge events at every health change and
+the follow-up samples the controller queues for itself, each run taking
+one sample as the Lambda does. Compares the
+single-sample behaviour against the debounced policy on:
+
+    time_to_fail_close   seconds from an outage's start to routing closed
+    exposure_seconds     time the firewall was unhealthy with egress open
+    closed_while_healthy time egress was blocked with the firewall healthy
+    flaps                routing changes
+
+Usage:
+    # Built-in timelines: outage, blips, flapping, mixed
+    python bench/failover_sim.py mixed
+    python bench/failover_sim.py blips --fail-close-samples 3 --sample-interval 5
+
+    # Own timeline: {"duration": 3600, "unhealthy": [[1200, 1800], [2400, 2405]]}
+    python bench/failover_sim.py --timeline timeline.json --json
+"""
+import argparse
+import contextlib
+import heapq
+import io
+import json
+import math
+import os
+import random
+import statistics
+import sys
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+
+# Outages at least this long are expected to fail close
+MIN_OUTAGE_SECONDS = 30
+
+
+def import_controller():
+    for name, value in (
+        ('TGW_ROUTE_TABLE_ID', 'tgw-rtb-sim'),
+        ('EGRESS_ATTACHMENT_ID', 'tgw-attach-sim'),
+        ('FIREWALL_NAME', 'sim-firewall'),
+        ('AWS_DEFAULT_REGION', 'us-east-1'),
+    ):
+        os.environ.setdefault(name, value)
+    sys.path.insert(0, os.path.abspath(LAMBDA_DIR))
+    import inspection_controller
+    return inspection_controller
+
+
+def builtin_timeline(name, duration, seed):
+    """Unhealthy intervals [(start, end)] of a named scenario"""
+    rng = random.Random(seed)
+    unhealthy = []
+    if name in ('blips', 'mixed'):
+        # Transient HealthStatus blips of 1-8 s
+        for _ in range(duration // 120):
+            start = rng.uniform(0, duration - 10)
+            unhealthy.append((start, start + rng.uniform(1, 8)))
+    if name in ('outage', 'mixed'):
+        unhealthy.append((duration / 3, duration / 3 + 600))
+    if name == 'flapping':
+        # An AZ endpoint bouncing: 20 s down every 45 s for half the run
+        start = duration / 4
+        while start < duration * 3 / 4:
+            unhealthy.append((start, start + 20))
+            start += 45
+    return merge_intervals(unhealthy)
+
+
+def merge_intervals(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def simulate(controller, hysteresis, unhealthy, duration, poll_interval, phase, event_delay, apply_delay,
+             follow_up_delay=None):
+    """
+    Route mode changes [(time, mode)] for one replay; follow_up_delay is
+    the queue's delivery latency on top of the follow-up's sample_interval
+    delay (None = no follow-ups)
+    """
+
+    def healthy_at(t):
+        return not any(start <= t < end for start, end in unhealthy)
+
+    invocations = [phase + k * poll_interval for k in range(int(duration // poll_interval) + 1)]
+    if event_delay is not None:
+        for start, end in unhealthy:
+            invocations += [start + event_delay, end + event_delay]
+    invocations = [t for t in invocations if t < duration]
+    heapq.heapify(invocations)
+
+    state = {
+        'mode': 'open', 'healthy_streak': 0, 'unhealthy_streak': 0, 'changed_at': -1e9,
+        'last_healthy': None, 'sampled_at': -1e9, 'version': 0
+    }
+    changes = [(0.0, 'open')]
+
+    while invocations:
+        invoked = heapq.heappop(invocations)
+        state = controller.sample_health(state, healthy_at(invoked), invoked, hysteresis)
+        if state['transitioned']:
+            changes.append((invoked + apply_delay, state['mode']))
+        if follow_up_delay is not None and controller.confirming_fail_close(state, hysteresis):
+            follow_up = invoked + math.ceil(hysteresis.sample_interval) + follow_up_delay
+            if follow_up < duration:
+                heapq.heappush(invocations, follow_up)
+
+    return changes
+
+
+def mode_at(changes, t):
+    return [mode for start, mode in changes if start <= t][-1]
+
+
+def score(changes, unhealthy, duration):
+    """time-to-fail-close per outage, exposure, false closure, flaps"""
+    segments = []
+    for (start, mode), (end, _) in zip(changes, changes[1:] + [(duration, None)]):
+        segments.append((start, min(end, duration), mode))
+
+    def overlap(a_start, a_end, b_start, b_end):
+        return max(0.0, min(a_end, b_end) - max(a_start, b_start))
+
+    unhealthy_total = sum(end - start for start, end in unhealthy)
+    exposure = sum(
+        overlap(s, e, u_start, u_end)
+        for s, e, mode in segments if mode == 'open'
+        for u_start, u_end in unhealthy
+    )
+    closed_total = sum(e - s for s, e, mode in segments if mode == 'closed')
+    closed_while_unhealthy = sum(
+        overlap(s, e, u_start, u_end)
+        for s, e, mode in segments if mode == 'closed'
+        for u_start, u_end in unhealthy
+    )
+
+    detection = []
+    for start, end in unhealthy:
+        if end - start < MIN_OUTAGE_SECONDS:
+            continue
+        if mode_at(changes, start) == 'closed':
+            detection.append(0.0)
+            continue
+        closes = [t for t, mode in changes if mode == 'closed' and start <= t <= end]
+        detection.append(closes[0] - start if closes else None)
+
+    return {
+        'time_to_fail_close': detection,
+        'exposure_seconds': exposure,
+        'unhealthy_seconds': unhealthy_total,
+        'closed_while_healthy': closed_total - closed_while_unhealthy,
+        'flaps': len(changes) - 1,
+    }
+
+
+def run_policy(controller, hysteresis, unhealthy, args):
+    rng = random.Random(args.seed)
+    results = []
+    for _ in range(args.runs):
+        phase = rng.uniform(0, args.poll_interval)
+        event_delay = None if args.no_events else args.event_delay
+        follow_up_delay = None if args.no_follow_ups else args.follow_up_delay
+        with contextlib.redirect_stdout(io.StringIO()):
+            changes = simulate(
+                controller, hysteresis, unhealthy, args.duration, args.poll_interval,
+                phase, event_delay, args.apply_delay, follow_up_delay
+            )
+        results.append(score(changes, unhealthy, args.duration))
+
+    detections = [d for r in results for d in r['time_to_fail_close']]
+    detected = [d for d in detections if d is not None]
+    return {
+        'policy': dict(hysteresis._asdict()),
+        'outages': len(detections) // args.runs,
+        'missed_outages': len(detections) - len(detected),
+        'time_to_fail_close_p50': round(statistics.median(detected), 1) if detected else None,
+        'time_to_fail_close_max': round(max(detected), 1) if detected else None,
+        'exposure_seconds': round(statistics.mean(r['exposure_seconds'] for r in results), 1),
+        'closed_while_healthy': round(statistics.mean(r['closed_while_healthy'] for r in results), 1),
+        'flaps': round(statistics.mean(r['flaps'] for r in results), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('scenario', nargs='?', default='mixed', choices=('outage', 'blips', 'flapping', 'mixed'))
+    parser.add_argument('--timeline', help='JSON timeline file, instead of a built-in scenario')
+    parser.add_argument('--duration', type=int, default=3600, help='Seconds simulated (built-in scenarios)')
+    parser.add_argument('--poll-interval', type=float, default=60, help='Scheduled check interval')
+    parser.add_argument('--event-delay', type=float, default=5, help='Health change to event delivery')
+    parser.add_argument('--no-events', action='store_true', help='Scheduled checks only')
+    parser.add_argument('--follow-up-delay', type=float, default=1, help='Follow-up queue delivery latency')
+    parser.add_argument('--no-follow-ups', action='store_true', help='No follow-up samples (follow_up_samples = false)')
+    parser.add_argument('--apply-delay', type=float, default=1, help='Decision to route change in effect')
+    parser.add_argument('--fail-close-samples', type=int, default=3, help='FAIL_CLOSE_SAMPLES')
+    parser.add_argument('--fail-open-samples', type=int, default=3, help='FAIL_OPEN_SAMPLES')
+    parser.add_argument('--fail-close-cooldown', type=float, default=0, help='FAIL_CLOSE_COOLDOWN_SECONDS')
+    parser.add_argument('--fail-open-cooldown', type=float, default=120, help='FAIL_OPEN_COOLDOWN_SECONDS')
+    parser.add_argument('--sample-interval', type=float, default=10, help='SAMPLE_INTERVAL_SECONDS')
+    parser.add_argument('--runs', type=int, default=50, help='Replays with random poll phases')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+
+    if args.timeline:
+        with open(args.timeline) as f:
+            spec = json.load(f)
+        args.duration = spec['duration']
+        unhealthy = merge_intervals(tuple(i) for i in spec['unhealthy'])
+        scenario = args.timeline
+    else:
+        unhealthy = builtin_timeline(args.scenario, args.duration, args.seed)
+        scenario = args.scenario
+
+    controller = import_controller()
+    single_sample = controller.Hysteresis(1, 1, 0, 0, args.sample_interval)
+    debounced = controller.Hysteresis(
+        args.fail_close_samples, args.fail_open_samples,
+        args.fail_close_cooldown, args.fail_open_cooldown, args.sample_interval
+    )
+
+    result = {
+        'scenario': scenario,
+        'unhealthy_intervals': len(unhealthy),
+        'single_sample': run_policy(controller, single_sample, unhealthy, args),
+        'debounced': run_policy(controller, debounced, unhealthy, args),
+    }
+
+    if args.json:
+        print(json.dumps(result))
+    else:
+        for name, value in result.items():
+            if isinstance(value, dict):
+                print(f"{name}:")
+                for key, item in value.items():
+                    print(f"{key:>26}: {item}")
+            else:
+                print(f"{name:>26}: {value}")
+
+    return 1 if result['debounced']['missed_outages'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,8 @@
 ############################################
 # EventBridge – Firewall Health Events
 ############################################
+# Rules are regional: targets in another region get no engine events here
+# and are poll-only, unless their events are forwarded to this bus
 resource "aws_cloudwatch_event_rule" "firewall_events" {
   name        = "${var.env}-firewall-health-events"
   description = "React to Network Firewall health changes"
@@ -19,6 +21,29 @@ resource "aws_cloudwatch_event_target" "firewall_lambda" {
   arn  = aws_lambda_function.inspection_controller.arn
 }
 
+############################################
+# EventBridge – Firewall Alarm State Changes
+############################################
+# An alarm entering ALARM counts as an unhealthy sample and starts the
+# fail-close confirmation without waiting for the next scheduled poll
+resource "aws_cloudwatch_event_rule" "firewall_alarms" {
+  count       = length(local.firewall_alarm_arns) > 0 ? 1 : 0
+  name        = "${var.env}-firewall-alarm-events"
+  description = "React to firewall CloudWatch alarm state changes"
+
+  event_pattern = jsonencode({
+    source      = ["aws.cloudwatch"]
+    detail-type = ["CloudWatch Alarm State Change"]
+    resources   = local.firewall_alarm_arns
+  })
+}
+
+resource "aws_cloudwatch_event_target" "alarm_lambda" {
+  count = length(local.firewall_alarm_arns) > 0 ? 1 : 0
+  rule  = aws_cloudwatch_event_rule.firewall_alarms[0].name
+  arn   = aws_lambda_function.inspection_controller.arn
+}
+
 ############################################
 # EventBridge – Scheduled Health Poll
 ############################################
@@ -33,6 +58,36 @@ resource "aws_cloudwatch_event_target" "scheduled_lambda" {
   arn  = aws_lambda_function.inspection_controller.arn
 }
 
+############################################
+# SQS – Follow-up Samples
+############################################
+# The controller queues a delayed message to itself after each sample
+# that starts or extends a fail-close streak, so the remaining samples
+# are taken sample_interval_seconds apart instead of on the next polls
+resource "aws_sqs_queue" "follow_up_samples" {
+  count                      = var.follow_up_samples ? 1 : 0
+  name                       = "${var.env}-inspection-follow-up-samples"
+  message_retention_seconds  = 300 # A stale follow-up is no sample worth taking
+  visibility_timeout_seconds = 60  # Twice the controller timeout
+  kms_master_key_id          = "alias/aws/sqs"
+
+  tags = {
+    Name        = "${var.env}-inspection-follow-up-samples"
+    Environment = var.env
+    Purpose     = "fail-close-enforcement"
+  }
+}
+
+resource "aws_lambda_event_source_mapping" "follow_up_samples" {
+  count            = var.follow_up_samples ? 1 : 0
+  event_source_arn = aws_sqs_queue.follow_up_samples[0].arn
+  function_name    = aws_lambda_function.inspection_controller.arn
+  batch_size       = 10
+
+  # The role must be able to receive from the queue first
+  depends_on = [aws_iam_role_policy_attachment.inspection_attach]
+}
+
 ############################################
 # Lambda Permissions – EventBridge
 ############################################
@@ -51,3 +106,12 @@ resource "aws_lambda_permission" "allow_eventbridge_schedule" {
   principal     = "events.amazonaws.com"
   source_arn    = aws_cloudwatch_event_rule.scheduled_check.arn
 }
+
+resource "aws_lambda_permission" "allow_eventbridge_alarms" {
+  count         = length(local.firewall_alarm_arns) > 0 ? 1 : 0
+  statement_id  = "AllowEventBridgeAlarmEvents"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.inspection_controller.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.firewall_alarms[0].arn
+}
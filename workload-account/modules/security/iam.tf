@@ -24,16 +24,29 @@ resource "aws_iam_policy" "inspection_policy" {
 
   policy = jsonencode({
     Version = "2012-10-17"
-    Statement = [
+    Statement = concat([
       {
         Sid    = "ManageTGWRoutes"
         Effect = "Allow"
         Action = [
           "ec2:CreateTransitGatewayRoute",
           "ec2:DeleteTransitGatewayRoute",
+          "ec2:ReplaceTransitGatewayRoute",
           "ec2:SearchTransitGatewayRoutes"
         ]
-        Resource = "arn:aws:ec2:${var.region}:${data.aws_caller_identity.current.account_id}:transit-gateway-route-table/*"
+        Resource = [
+          for r in local.inspection_regions :
+          "arn:aws:ec2:${r}:${data.aws_caller_identity.current.account_id}:transit-gateway-route-table/*"
+        ]
+      },
+      {
+        Sid    = "PersistControllerState"
+        Effect = "Allow"
+        Action = [
+          "dynamodb:GetItem",
+          "dynamodb:PutItem"
+        ]
+        Resource = aws_dynamodb_table.inspection_state.arn
       },
       {
         Sid    = "ReadFirewallHealth"
@@ -56,7 +69,38 @@ resource "aws_iam_policy" "inspection_policy" {
           "arn:aws:logs:${var.region}:${data.aws_caller_identity.current.account_id}:log-group:/aws/lambda/*:log-stream:*"
         ]
       }
-    ]
+      ], var.follow_up_samples ? [
+      {
+        Sid    = "FollowUpSamples"
+        Effect = "Allow"
+        Action = [
+          "sqs:SendMessage",
+          "sqs:ReceiveMessage",
+          "sqs:DeleteMessage",
+          "sqs:GetQueueAttributes"
+        ]
+        Resource = aws_sqs_queue.follow_up_samples[0].arn
+      }
+      ] : [], length(local.per_az_targets) > 0 ? [
+      {
+        Sid      = "ReadAZRoutes"
+        Effect   = "Allow"
+        Action   = ["ec2:DescribeRouteTables"]
+        Resource = "*"
+      },
+      {
+        Sid    = "SteerAZRoutes"
+        Effect = "Allow"
+        Action = [
+          "ec2:CreateRoute",
+          "ec2:ReplaceRoute"
+        ]
+        Resource = [
+          for rtb in distinct(flatten([for t in local.per_az_targets : flatten(values(t.az_route_tables))])) :
+          "arn:aws:ec2:*:${data.aws_caller_identity.current.account_id}:route-table/${rtb}"
+        ]
+      }
+    ] : [])
   })
 }
 
@@ -88,15 +132,26 @@ resource "aws_lambda_function" "inspection_controller" {
   role          = aws_iam_role.inspection_lambda.arn
   filename      = "${path.module}/lambda/inspection_controller.zip"
 
+  # Redeploy when the packaged controller changes
+  source_code_hash = filebase64sha256("${path.module}/lambda/inspection_controller.zip")
+
   # Lambda Configuration
   timeout     = 30
   memory_size = 128
 
   environment {
     variables = {
-      TGW_ROUTE_TABLE_ID   = var.tgw_route_table_id
-      EGRESS_ATTACHMENT_ID = var.egress_attachment_id
-      FIREWALL_NAME        = var.firewall_name
+      TARGETS              = jsonencode(local.inspection_targets)
+      TARGET_CONCURRENCY   = var.target_concurrency
+      ROUTE_UPDATE_MODE    = var.route_update_mode
+      STATE_TABLE          = aws_dynamodb_table.inspection_state.name
+
+      FAIL_CLOSE_SAMPLES          = var.fail_close_samples
+      FAIL_OPEN_SAMPLES           = var.fail_open_samples
+      FAIL_CLOSE_COOLDOWN_SECONDS = var.fail_close_cooldown_seconds
+      FAIL_OPEN_COOLDOWN_SECONDS  = var.fail_open_cooldown_seconds
+      SAMPLE_INTERVAL_SECONDS     = var.sample_interval_seconds
+      FOLLOW_UP_QUEUE_URL         = var.follow_up_samples ? aws_sqs_queue.follow_up_samples[0].url : ""
     }
   }
 
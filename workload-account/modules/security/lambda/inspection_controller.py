@@ -1,95 +1,700 @@
 import boto3
+import json
+import math
 import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from botocore.exceptions import ClientError
 
 ec2 = boto3.client("ec2")
 nfw = boto3.client("network-firewall")
+dynamodb = boto3.client("dynamodb")
+sqs = boto3.client("sqs")
 
-TGW_RT_ID = os.environ["TGW_ROUTE_TABLE_ID"]
-EGRESS_ATTACHMENT_ID = os.environ["EGRESS_ATTACHMENT_ID"]
-FIREWALL_NAME = os.environ["FIREWALL_NAME"]
+# One firewall guarding one or more TGW route tables, optionally in
+# another region. With az_route_tables (AZ -> VPC route table IDs whose
+# default route points at that AZ's firewall endpoint) the target is in
+# per-AZ mode: a degraded AZ is steered to a healthy AZ's endpoint, and
+# egress is only blackholed once no AZ is healthy.
+Target = namedtuple(
+    "Target",
+    ["key", "firewall_name", "route_table_ids", "egress_attachment_id", "az_route_tables", "alarm_arns", "region"]
+)
+
+
+def load_targets():
+    """
+    Targets from the TARGETS JSON list, or the single firewall / route
+    table pair of FIREWALL_NAME and TGW_ROUTE_TABLE_ID.
+    """
+    if os.environ.get("TARGETS"):
+        specs = json.loads(os.environ["TARGETS"])
+    else:
+        specs = [{
+            "firewall_name": os.environ["FIREWALL_NAME"],
+            "route_table_ids": [os.environ["TGW_ROUTE_TABLE_ID"]],
+            "egress_attachment_id": os.environ["EGRESS_ATTACHMENT_ID"],
+        }]
+
+    return [
+        Target(
+            # State table key; a single route table keeps its own ID
+            key="+".join(sorted(spec["route_table_ids"])),
+            firewall_name=spec["firewall_name"],
+            route_table_ids=list(spec["route_table_ids"]),
+            egress_attachment_id=spec["egress_attachment_id"],
+            az_route_tables={az: list(ids) for az, ids in (spec.get("az_route_tables") or {}).items()},
+            alarm_arns=list(spec.get("alarm_arns") or []),
+            region=spec.get("region") or None
+        )
+        for spec in specs
+    ]
+
+
+TARGETS = load_targets()
+TARGET_CONCURRENCY = int(os.environ.get("TARGET_CONCURRENCY", "8"))
+
+# EC2 and Network Firewall clients per target region, None = the Lambda's
+CLIENTS = {None: (ec2, nfw)}
+CLIENTS.update({
+    region: (boto3.client("ec2", region_name=region), boto3.client("network-firewall", region_name=region))
+    for region in {target.region for target in TARGETS} - {None}
+})
+
+# "reconcile": read the default route and change it only when it differs,
+# in one atomic replace; "recreate": delete and re-create it on every run
+ROUTE_UPDATE_MODE = os.environ.get("ROUTE_UPDATE_MODE", "reconcile")
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "NetworkInspection/Controller")
+
+# Debounce state machine, persisted per route table in STATE_TABLE
+# (DynamoDB); without a table every run acts on a single sample
+STATE_TABLE = os.environ.get("STATE_TABLE", "")
+STATE_WRITE_ATTEMPTS = 3
+
+# Consecutive samples before routing flips, minimum time between flips,
+# and the minimum spacing of samples that count toward a streak; each run
+# takes one sample, the next poll, alarm, firewall event or follow-up
+# takes the next
+Hysteresis = namedtuple(
+    "Hysteresis",
+    ["fail_close_samples", "fail_open_samples", "fail_close_cooldown", "fail_open_cooldown", "sample_interval"]
+)
+HYSTERESIS = Hysteresis(
+    fail_close_samples=int(os.environ.get("FAIL_CLOSE_SAMPLES", "3")),
+    fail_open_samples=int(os.environ.get("FAIL_OPEN_SAMPLES", "3")),
+    fail_close_cooldown=float(os.environ.get("FAIL_CLOSE_COOLDOWN_SECONDS", "0")),
+    fail_open_cooldown=float(os.environ.get("FAIL_OPEN_COOLDOWN_SECONDS", "120")),
+    sample_interval=float(os.environ.get("SAMPLE_INTERVAL_SECONDS", "10"))
+)
+
+# SQS delay queue that invokes the controller again sample_interval after
+# a sample that starts or extends a fail-close streak, so fail-close is
+# confirmed within seconds instead of waiting for the next polls
+FOLLOW_UP_QUEUE_URL = os.environ.get("FOLLOW_UP_QUEUE_URL", "")
+
+DEFAULT_ROUTE = "0.0.0.0/0"
 
 
 def lambda_handler(event, context):
     """
     Controls TGW default route fail-open / fail-close
-    based on Network Firewall health.
+    based on Network Firewall health, for every target concurrently.
+    """
+    targets = event_targets(event)
+    with ThreadPoolExecutor(max_workers=max(1, min(TARGET_CONCURRENCY, len(targets)))) as pool:
+        futures = [pool.submit(control_target, target, event) for target in targets]
+
+    reports, failed = [], []
+    for target, future in zip(targets, futures):
+        try:
+            reports.append(future.result())
+        except Exception as e:
+            # One broken target must not hold back the others
+            print(f"Controlling {target.key} ({target.firewall_name}) failed: {e}")
+            failed.append(target.key)
+
+    if failed:
+        raise RuntimeError(f"Inspection controller failed for {', '.join(failed)}")
+    return {"targets": reports}
+
+
+def event_targets(event):
+    """
+    The targets a run controls: those named by follow-up sample messages
+    when invoked from the follow-up queue, otherwise all of them.
+    """
+    records = [r for r in event.get("Records", []) if r.get("eventSource") == "aws:sqs"]
+    if not records:
+        return TARGETS
+    keys = {json.loads(record["body"])["target"] for record in records}
+    return [target for target in TARGETS if target.key in keys]
+
+
+def control_target(target, event):
+    """
+    Decides whether the target's egress is open or closed and brings its
+    route tables (and, in per-AZ mode, its AZ routes) to that state.
+    """
+    started = time.perf_counter()
+    recreate = ROUTE_UPDATE_MODE == "recreate"
+    routes = {rt_id: False if recreate else current_default_route(target, rt_id) for rt_id in target.route_table_ids}
+
+    # Firewall status of the latest sample, for per-AZ steering
+    status = {}
+
+    def sample():
+        status["azs"] = firewall_status(target)
+        return firewall_healthy(target, status["azs"])
+
+    state = None
+    if STATE_TABLE:
+        try:
+            state = debounced_state(target, event, routes, sample)
+        except (ClientError, RuntimeError) as e:
+            # Never let the state table keep the controller from acting
+            print(f"Debounce state unavailable for {target.key}, deciding on one sample: {e}")
+
+    if state:
+        open_egress = state["mode"] == "open"
+        samples = state["samples"]
+        transitioned = state["transitioned"]
+    else:
+        open_egress = sample()
+        samples = 1
+        transitioned = False
+    decided = time.perf_counter()
+
+    actions, mutations = [], 0
+    for rt_id, route in routes.items():
+        if recreate:
+            action = "recreated"
+            changed = restore_egress(target, rt_id) if open_egress else fail_close(target, rt_id)
+        else:
+            action, changed = reconcile_default_route(target, rt_id, route, open_egress)
+        actions.append(action)
+        mutations += changed
+
+    steered, confirming = [], bool(state) and confirming_fail_close(state, HYSTERESIS)
+    if target.az_route_tables and open_egress:
+        if "azs" not in status:
+            status["azs"] = firewall_status(target)
+        steered, changed, azs_confirming = steer_az_routes(target, status["azs"], bool(state))
+        mutations += changed
+        confirming = confirming or azs_confirming
+
+    if confirming:
+        schedule_follow_up(target)
+
+    report = {
+        "target": target.key,
+        "firewall": target.firewall_name,
+        "mode": "open" if open_egress else "closed",
+        "samples": samples,
+        "transitioned": transitioned,
+        "action": ",".join(sorted(set(actions))),
+        "mutations": mutations,
+        "steered_azs": steered,
+        "follow_up": confirming,
+        "decision_ms": round((decided - started) * 1000, 1),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    emit_metrics(report)
+    return report
+
+
+def event_health(target, event):
+    """
+    Health evidence carried by the triggering event: False for a
+    CloudWatch alarm entering ALARM that concerns the target (every
+    alarm, unless the target lists its own), None otherwise (scheduled
+    runs and Network Firewall events only prompt a sample).
+    """
+    if event.get("detail-type") == "CloudWatch Alarm State Change":
+        if target.alarm_arns and not set(event.get("resources", [])) & set(target.alarm_arns):
+            return None
+        if event.get("detail", {}).get("state", {}).get("value") == "ALARM":
+            print(f"Alarm {event['detail'].get('alarmName')} in ALARM")
+            return False
+    return None
+
+
+def debounced_state(target, event, routes, sample):
+    """
+    Feeds this run's health sample into the persisted state machine and
+    saves the result, retrying on concurrent updates by other runs.
+    """
+    evidence = event_health(target, event)
+    healthy = evidence if evidence is not None else sample()
+    return debounce(target.key, healthy, initial_state(target, routes, healthy))
+
+
+def debounce(key, healthy, default):
+    """
+    Applies one sample to the state stored under key (default when there
+    is none yet) and saves it, retrying on concurrent updates by other runs.
+    """
+    for _ in range(STATE_WRITE_ATTEMPTS):
+        state = load_state(key, default)
+        state = sample_health(state, healthy, time.time(), HYSTERESIS)
+        try:
+            save_state(key, state)
+            return state
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+            print("State changed by a concurrent run, re-applying sample")
+
+    raise RuntimeError("Could not persist inspection controller state")
+
+
+def sample_health(state, healthy, now, hysteresis):
+    """
+    Advances the state machine by this run's one sample. A run never waits
+    for confirmation: the streaks persist in the state table and the next
+    scheduled poll, alarm or firewall event advances them. A sample that
+    repeats the last counted one within sample_interval (a burst of events
+    about one change) is not counted again.
+    """
+    counted = (
+        healthy != state["last_healthy"]
+        or now - state["sampled_at"] >= hysteresis.sample_interval
+    )
+    state = next_state(state, healthy, now, hysteresis, counted)
+    state["samples"] = int(counted)
+    if counted:
+        state.update(last_healthy=healthy, sampled_at=now)
+    return state
+
+
+def confirming_fail_close(state, hysteresis):
+    """
+    Whether this run counted an unhealthy sample toward a fail-close that
+    is not confirmed yet, so another sample is due in sample_interval.
+    """
+    return (
+        bool(state["samples"])
+        and state["mode"] == "open"
+        and 0 < state["unhealthy_streak"] < hysteresis.fail_close_samples
+    )
+
+
+def schedule_follow_up(target):
+    """
+    Invokes the controller again for the target, through the delay queue,
+    once the next sample will count. A lost follow-up only leaves the
+    streak to the scheduled poll.
+    """
+    if not FOLLOW_UP_QUEUE_URL:
+        return
+    try:
+        sqs.send_message(
+            QueueUrl=FOLLOW_UP_QUEUE_URL,
+            MessageBody=json.dumps({"target": target.key}),
+            # SQS delays are whole seconds, up to 15 minutes
+            DelaySeconds=min(900, math.ceil(HYSTERESIS.sample_interval))
+        )
+    except ClientError as e:
+        print(f"Follow-up sample for {target.key} not scheduled: {e}")
+
+
+def next_state(state, healthy, now, hysteresis, counted=True):
+    """
+    One step of the fail-close / fail-open state machine. Routing flips
+    after fail_close_samples consecutive unhealthy (fail_open_samples
+    healthy) samples, and no sooner than the cooldown after the last flip;
+    an uncounted sample only lets a cooldown expire.
+    """
+    state = dict(state, transitioned=False)
+    # Streaks are capped so that a steady state needs no writes
+    cap = max(hysteresis.fail_close_samples, hysteresis.fail_open_samples)
+    if counted and healthy:
+        state["healthy_streak"] = min(state["healthy_streak"] + 1, cap)
+        state["unhealthy_streak"] = 0
+    elif counted:
+        state["unhealthy_streak"] = min(state["unhealthy_streak"] + 1, cap)
+        state["healthy_streak"] = 0
+
+    since_change = now - state["changed_at"]
+    if (
+        state["mode"] == "open"
+        and state["unhealthy_streak"] >= hysteresis.fail_close_samples
+        and since_change >= hysteresis.fail_close_cooldown
+    ):
+        print("Fail-close confirmed")
+        state.update(mode="closed", changed_at=now, transitioned=True)
+    elif (
+        state["mode"] == "closed"
+        and state["healthy_streak"] >= hysteresis.fail_open_samples
+        and since_change >= hysteresis.fail_open_cooldown
+    ):
+        print("Fail-open confirmed")
+        state.update(mode="open", changed_at=now, transitioned=True)
+
+    return state
+
+
+def initial_state(target, routes, healthy):
+    """
+    State for a target seen for the first time: the mode its default
+    routes already agree on (all egress or all blackholed), else the mode
+    of its first sample. Routes are unknown in recreate mode, when they
+    cannot be read, or when they are missing or propagated.
     """
-    if firewall_healthy():
-        restore_egress()
+    if all(route_matches(target, route, True) for route in routes.values()):
+        return blank_state("open")
+    if all(route_matches(target, route, False) for route in routes.values()):
+        return blank_state("closed")
+    return blank_state("open" if healthy else "closed")
+
+
+def blank_state(mode):
+    return {
+        "mode": mode, "healthy_streak": 0, "unhealthy_streak": 0, "changed_at": 0.0,
+        "last_healthy": None, "sampled_at": 0.0, "version": 0
+    }
+
+
+def load_state(key, default):
+    resp = dynamodb.get_item(
+        TableName=STATE_TABLE,
+        Key={"RouteTableId": {"S": key}},
+        ConsistentRead=True
+    )
+    item = resp.get("Item")
+    if not item:
+        return default
+
+    return {
+        "mode": item["Mode"]["S"],
+        "healthy_streak": int(item["HealthyStreak"]["N"]),
+        "unhealthy_streak": int(item["UnhealthyStreak"]["N"]),
+        "changed_at": float(item["ChangedAt"]["N"]),
+        # Items written before samples were spaced carry neither
+        "last_healthy": item["LastHealthy"]["BOOL"] if "LastHealthy" in item else None,
+        "sampled_at": float(item["SampledAt"]["N"]) if "SampledAt" in item else 0.0,
+        "version": int(item["Version"]["N"]),
+        "stored": (item["Mode"]["S"], int(item["HealthyStreak"]["N"]), int(item["UnhealthyStreak"]["N"]))
+    }
+
+
+def save_state(key, state):
+    """
+    Writes the state if its mode or streaks changed, conditional on nobody
+    else having written since it was loaded. The time of the last counted
+    sample is only written with them: a sample that leaves a capped streak
+    unchanged cannot be double-counted anyway.
+    """
+    if state.get("stored") == (state["mode"], state["healthy_streak"], state["unhealthy_streak"]):
+        return
+
+    if state["version"]:
+        condition = {"ConditionExpression": "Version = :version",
+                     "ExpressionAttributeValues": {":version": {"N": str(state["version"])}}}
     else:
-        fail_close()
+        condition = {"ConditionExpression": "attribute_not_exists(RouteTableId)"}
 
+    dynamodb.put_item(
+        TableName=STATE_TABLE,
+        Item={
+            "RouteTableId": {"S": key},
+            "Mode": {"S": state["mode"]},
+            "HealthyStreak": {"N": str(state["healthy_streak"])},
+            "UnhealthyStreak": {"N": str(state["unhealthy_streak"])},
+            "ChangedAt": {"N": repr(state["changed_at"])},
+            "SampledAt": {"N": repr(state["sampled_at"])},
+            **({"LastHealthy": {"BOOL": state["last_healthy"]}} if state["last_healthy"] is not None else {}),
+            "Version": {"N": str(state["version"] + 1)}
+        },
+        **condition
+    )
 
-def firewall_healthy():
+
+def firewall_status(target):
     """
-    Returns True only if ALL firewall endpoints are healthy.
-    Any AZ degradation triggers fail-close.
+    Returns {AZ: (healthy, firewall endpoint ID)} of the target's
+    firewall, or None if its status cannot be determined.
     """
+    nfw = CLIENTS[target.region][1]
     try:
-        resp = nfw.describe_firewall(FirewallName=FIREWALL_NAME)
-        sync_states = resp["FirewallStatus"]["SyncStates"]
+        resp = nfw.describe_firewall(FirewallName=target.firewall_name)
+    except ClientError as e:
+        print(f"Firewall health check failed for {target.firewall_name}: {e}")
+        return None
 
-        for az, state in sync_states.items():
-            if state.get("HealthStatus") != "HEALTHY":
-                print(f"Firewall unhealthy in AZ {az}")
-                return False
+    status = {}
+    for az, state in resp["FirewallStatus"].get("SyncStates", {}).items():
+        healthy = state.get("HealthStatus") == "HEALTHY"
+        if not healthy:
+            print(f"Firewall {target.firewall_name} unhealthy in AZ {az}")
+        status[az] = (healthy, state.get("Attachment", {}).get("EndpointId"))
+    return status
 
-        return True
 
+def firewall_healthy(target, status):
+    """
+    Returns True only if ALL firewall endpoints are healthy; in per-AZ
+    mode, if ANY endpoint is. Fail-closed if the status is unknown.
+    """
+    if not status:
+        return False
+    if target.az_route_tables:
+        return any(healthy and endpoint for healthy, endpoint in status.values())
+    return all(healthy for healthy, _ in status.values())
+
+
+def steer_az_routes(target, status, debounced=False):
+    """
+    Per-AZ mode: points each AZ's default route at its own firewall
+    endpoint while that AZ is in service, otherwise at an in-service AZ's
+    endpoint (spread across them). Returns the AZs steered away, the
+    number of mutating calls, and whether an AZ is confirming going out
+    of service.
+
+    With debounced, an AZ goes out of and back into service through the
+    same state machine as the target, its state stored per firewall and
+    AZ; otherwise the latest sample decides.
+    """
+    healthy = {az for az, (ok, endpoint) in (status or {}).items() if ok and endpoint}
+    if not healthy:
+        return [], 0, False
+
+    ec2 = CLIENTS[target.region][0]
+    table_ids = [rtb_id for ids in target.az_route_tables.values() for rtb_id in ids]
+    current = {}
+    for table in ec2.describe_route_tables(RouteTableIds=table_ids)["RouteTables"]:
+        for route in table["Routes"]:
+            if route.get("DestinationCidrBlock") == DEFAULT_ROUTE:
+                current[table["RouteTableId"]] = route.get("VpcEndpointId") or route.get("GatewayId")
+
+    in_service, confirming = healthy, False
+    if debounced:
+        try:
+            in_service, confirming = az_in_service(target, status, current)
+        except (ClientError, RuntimeError) as e:
+            print(f"AZ debounce state unavailable for {target.firewall_name}, steering on one sample: {e}")
+    # An AZ in service keeps its own endpoint through a blip; the others
+    # are spread over endpoints that are in service and healthy right now
+    own = {az for az in in_service if status.get(az, (False, None))[1]}
+    donors = sorted(own & healthy) or sorted(healthy)
+
+    steered, mutations = [], 0
+    for index, (az, rtb_ids) in enumerate(sorted(target.az_route_tables.items())):
+        serving_az = az if az in own else donors[index % len(donors)]
+        if serving_az != az:
+            print(f"Steering AZ {az} of {target.firewall_name} to the AZ {serving_az} endpoint")
+            steered.append(az)
+        endpoint = status[serving_az][1]
+
+        for rtb_id in rtb_ids:
+            if current.get(rtb_id) == endpoint:
+                continue
+            try:
+                ec2.replace_route(RouteTableId=rtb_id, DestinationCidrBlock=DEFAULT_ROUTE, VpcEndpointId=endpoint)
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "InvalidRoute.NotFound":
+                    raise
+                ec2.create_route(RouteTableId=rtb_id, DestinationCidrBlock=DEFAULT_ROUTE, VpcEndpointId=endpoint)
+            mutations += 1
+
+    return steered, mutations, confirming
+
+
+def az_in_service(target, status, current):
+    """
+    AZs whose debounced state keeps them on their own endpoint, one state
+    item per firewall and AZ (shared by targets of the same firewall); an
+    AZ seen for the first time starts in service if its route tables
+    already point at its own endpoint. Also returns whether an AZ is
+    confirming going out of service.
+    """
+    in_service, confirming = set(), False
+    for az, rtb_ids in sorted(target.az_route_tables.items()):
+        healthy, endpoint = status.get(az) or (False, None)
+        own = endpoint and all(current.get(rtb_id) == endpoint for rtb_id in rtb_ids)
+        state = debounce(f"{target.firewall_name}#{az}", bool(healthy and endpoint), blank_state("open" if own else "closed"))
+        if state["transitioned"]:
+            print(f"AZ {az} of {target.firewall_name} {'back in' if state['mode'] == 'open' else 'out of'} service")
+        if state["mode"] == "open":
+            in_service.add(az)
+        confirming = confirming or confirming_fail_close(state, HYSTERESIS)
+    return in_service, confirming
+
+
+def current_default_route(target, rt_id):
+    """
+    Returns the default route of the TGW route table, None if there is
+    none, or False if it cannot be read.
+    """
+    ec2 = CLIENTS[target.region][0]
+    try:
+        resp = ec2.search_transit_gateway_routes(
+            TransitGatewayRouteTableId=rt_id,
+            Filters=[{"Name": "route-search.exact-match", "Values": [DEFAULT_ROUTE]}]
+        )
     except ClientError as e:
-        # Fail-closed if firewall status cannot be determined
-        print(f"Firewall health check failed: {e}")
+        print(f"Default route lookup failed for {rt_id}: {e}")
         return False
 
+    for route in resp["Routes"]:
+        if route["DestinationCidrBlock"] == DEFAULT_ROUTE:
+            return route
+    return None
+
 
-def fail_close():
+def route_matches(target, route, healthy):
+    """
+    Whether the default route already is the egress route (healthy)
+    or an explicit blackhole (unhealthy).
+    """
+    if not route or route.get("Type") != "static":
+        return False
+
+    attachment_ids = [a["TransitGatewayAttachmentId"] for a in route.get("TransitGatewayAttachments", [])]
+    if healthy:
+        return route["State"] == "active" and target.egress_attachment_id in attachment_ids
+    return route["State"] == "blackhole" and not attachment_ids
+
+
+def reconcile_default_route(target, rt_id, route, healthy):
+    """
+    Brings the default route to the desired state with at most one
+    mutating call, replacing it in place so 0.0.0.0/0 never disappears.
+    Returns the action taken and the number of mutating calls.
+    """
+    if route_matches(target, route, healthy):
+        return "unchanged", 0
+
+    ec2 = CLIENTS[target.region][0]
+    if healthy:
+        print(f"Firewall healthy — restoring egress routing in {rt_id}")
+        route_target = {"TransitGatewayAttachmentId": target.egress_attachment_id}
+    else:
+        print(f"Fail-close engaged — blocking internet egress in {rt_id}")
+        route_target = {"Blackhole": True}
+
+    # A propagated route cannot be replaced; a static one overrides it
+    if route is not False and (route is None or route.get("Type") != "static"):
+        try:
+            ec2.create_transit_gateway_route(
+                TransitGatewayRouteTableId=rt_id,
+                DestinationCidrBlock=DEFAULT_ROUTE,
+                **route_target
+            )
+            return "created", 1
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransitGatewayRouteAlreadyExists":
+                raise
+
+    # Also taken when the route could not be read (route is False)
+    try:
+        ec2.replace_transit_gateway_route(
+            TransitGatewayRouteTableId=rt_id,
+            DestinationCidrBlock=DEFAULT_ROUTE,
+            **route_target
+        )
+        return "replaced", 1
+    except ClientError as e:
+        if e.response["Error"]["Code"] != "InvalidRoute.NotFound":
+            raise
+
+    ec2.create_transit_gateway_route(
+        TransitGatewayRouteTableId=rt_id,
+        DestinationCidrBlock=DEFAULT_ROUTE,
+        **route_target
+    )
+    return "created", 2
+
+
+def fail_close(target, rt_id):
     """
     Removes default route and replaces with blackhole.
     """
-    print("Fail-close engaged — blocking internet egress")
+    print(f"Fail-close engaged — blocking internet egress in {rt_id}")
 
-    delete_default_route()
+    ec2 = CLIENTS[target.region][0]
+    delete_default_route(target, rt_id)
 
     try:
         ec2.create_transit_gateway_route(
-            TransitGatewayRouteTableId=TGW_RT_ID,
-            DestinationCidrBlock="0.0.0.0/0",
+            TransitGatewayRouteTableId=rt_id,
+            DestinationCidrBlock=DEFAULT_ROUTE,
             Blackhole=True
         )
     except ClientError as e:
         if e.response["Error"]["Code"] != "TransitGatewayRouteAlreadyExists":
             raise
 
+    return 2
 
-def restore_egress():
+
+def restore_egress(target, rt_id):
     """
     Restores default route to egress VPC attachment.
     """
-    print("Firewall healthy — restoring egress routing")
+    print(f"Firewall healthy — restoring egress routing in {rt_id}")
 
-    delete_default_route()
+    ec2 = CLIENTS[target.region][0]
+    delete_default_route(target, rt_id)
 
     try:
         ec2.create_transit_gateway_route(
-            TransitGatewayRouteTableId=TGW_RT_ID,
-            DestinationCidrBlock="0.0.0.0/0",
-            TransitGatewayAttachmentId=EGRESS_ATTACHMENT_ID
+            TransitGatewayRouteTableId=rt_id,
+            DestinationCidrBlock=DEFAULT_ROUTE,
+            TransitGatewayAttachmentId=target.egress_attachment_id
         )
     except ClientError as e:
         if e.response["Error"]["Code"] != "TransitGatewayRouteAlreadyExists":
             raise
 
+    return 2
+
 
-def delete_default_route():
+def delete_default_route(target, rt_id):
     """
     Safely deletes the default TGW route if present.
     """
+    ec2 = CLIENTS[target.region][0]
     try:
         ec2.delete_transit_gateway_route(
-            TransitGatewayRouteTableId=TGW_RT_ID,
-            DestinationCidrBlock="0.0.0.0/0"
+            TransitGatewayRouteTableId=rt_id,
+            DestinationCidrBlock=DEFAULT_ROUTE
         )
     except ClientError as e:
         if e.response["Error"]["Code"] != "InvalidRoute.NotFound":
             raise
+
+
+def emit_metrics(report):
+    """
+    Prints the run report as a CloudWatch Embedded Metric Format record,
+    so decision latency, route mutations, samples, transitions and
+    steered AZs become metrics.
+    """
+    record = {
+        "RouteTableId": report["target"],
+        "Firewall": report["firewall"],
+        "DecisionLatency": report["decision_ms"],
+        "RouteMutations": report["mutations"],
+        "HealthSamples": report["samples"],
+        "Transitions": int(report["transitioned"]),
+        "SteeredAZs": len(report["steered_azs"]),
+        "Mode": report["mode"],
+        "Action": report["action"],
+        "DurationMs": report["duration_ms"],
+        "_aws": {
+            "Timestamp": int(time.time() * 1000),
+            "CloudWatchMetrics": [{
+                "Namespace": METRICS_NAMESPACE,
+                "Dimensions": [["RouteTableId"]],
+                "Metrics": [
+                    {"Name": "DecisionLatency", "Unit": "Milliseconds"},
+                    {"Name": "RouteMutations", "Unit": "Count"},
+                    {"Name": "HealthSamples", "Unit": "Count"},
+                    {"Name": "Transitions", "Unit": "Count"},
+                    {"Name": "SteeredAZs", "Unit": "Count"}
+                ]
+            }]
+        }
+    }
+    print(json.dumps(record))
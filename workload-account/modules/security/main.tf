@@ -1,6 +1,46 @@
+locals {
+  # The single firewall / route table pair unless inspection_targets is set
+  inspection_targets = length(var.inspection_targets) > 0 ? var.inspection_targets : [{
+    firewall_name        = var.firewall_name
+    route_table_ids      = [var.tgw_route_table_id]
+    egress_attachment_id = var.egress_attachment_id
+    az_route_tables      = {}
+    alarm_arns           = []
+    region               = null
+  }]
+
+  inspection_regions = distinct([for t in local.inspection_targets : coalesce(t.region, var.region)])
+  per_az_targets     = [for t in local.inspection_targets : t if length(t.az_route_tables) > 0]
+
+  firewall_alarm_arns = distinct(concat(var.firewall_alarm_arns, flatten([for t in local.inspection_targets : t.alarm_arns])))
+}
+
 # KMS Key for all encrypted services
 resource "aws_kms_key" "main" {
   description             = "Bank-grade CMK"
   enable_key_rotation     = true
   deletion_window_in_days = 30
 }
+
+############################
+# Inspection Controller State
+############################
+
+# Debounce state of the fail-close state machine, one item per target
+# (keyed by its route table IDs)
+resource "aws_dynamodb_table" "inspection_state" {
+  name         = "${var.env}-inspection-controller-state"
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "RouteTableId"
+
+  attribute {
+    name = "RouteTableId"
+    type = "S"
+  }
+
+  tags = {
+    Name        = "${var.env}-inspection-controller-state"
+    Environment = var.env
+    Purpose     = "fail-close-enforcement"
+  }
+}
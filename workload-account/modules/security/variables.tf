@@ -9,18 +9,45 @@ variable "region" {
 }
 
 variable "tgw_route_table_id" {
-  description = "Transit Gateway inspection route table ID"
+  description = "Transit Gateway inspection route table ID (single target; see inspection_targets)"
   type        = string
+  default     = null
 }
 
 variable "egress_attachment_id" {
-  description = "Transit Gateway attachment ID for egress VPC"
+  description = "Transit Gateway attachment ID for egress VPC (single target; see inspection_targets)"
   type        = string
+  default     = null
 }
 
 variable "firewall_name" {
-  description = "AWS Network Firewall name"
+  description = "AWS Network Firewall name (single target; see inspection_targets)"
   type        = string
+  default     = null
+}
+
+variable "inspection_targets" {
+  description = "Firewalls and the TGW route tables they guard, all controlled by one Lambda. az_route_tables (Availability Zone -> VPC route table IDs routing 0.0.0.0/0 to that AZ's firewall endpoint) enables per-AZ mode; alarm_arns limits which firewall_alarm_arns count against the target; region defaults to var.region, and a target in another region gets no firewall or alarm events (poll-only) unless they are forwarded to this region's default event bus"
+  type = list(object({
+    firewall_name        = string
+    route_table_ids      = list(string)
+    egress_attachment_id = string
+    az_route_tables      = optional(map(list(string)), {})
+    alarm_arns           = optional(list(string), [])
+    region               = optional(string)
+  }))
+  default = []
+
+  validation {
+    condition     = alltrue([for t in var.inspection_targets : length(t.route_table_ids) > 0])
+    error_message = "Every inspection target needs at least one route table."
+  }
+}
+
+variable "target_concurrency" {
+  description = "Inspection targets evaluated in parallel per invocation"
+  type        = number
+  default     = 8
 }
 
 variable "enable_fail_close" {
@@ -28,3 +55,72 @@ variable "enable_fail_close" {
   type        = bool
   default     = true
 }
+
+variable "route_update_mode" {
+  description = "How the default route is updated: reconcile (read it, replace it in place only when it differs) or recreate (delete and re-create it on every run)"
+  type        = string
+  default     = "reconcile"
+
+  validation {
+    condition     = contains(["reconcile", "recreate"], var.route_update_mode)
+    error_message = "route_update_mode must be reconcile or recreate."
+  }
+}
+
+variable "fail_close_samples" {
+  description = "Consecutive unhealthy samples before egress is blocked; each controller run (scheduled poll, alarm, firewall event or follow-up) takes one"
+  type        = number
+  default     = 3
+
+  validation {
+    condition     = var.fail_close_samples >= 1
+    error_message = "fail_close_samples must be at least 1."
+  }
+}
+
+variable "fail_open_samples" {
+  description = "Consecutive healthy samples before egress is restored"
+  type        = number
+  default     = 3
+
+  validation {
+    condition     = var.fail_open_samples >= 1
+    error_message = "fail_open_samples must be at least 1."
+  }
+}
+
+variable "fail_close_cooldown_seconds" {
+  description = "Minimum time after egress is restored before it can be blocked again"
+  type        = number
+  default     = 0
+}
+
+variable "fail_open_cooldown_seconds" {
+  description = "Minimum time after egress is blocked before it can be restored"
+  type        = number
+  default     = 120
+}
+
+variable "sample_interval_seconds" {
+  description = "Minimum spacing of samples that count toward a streak; a run repeating the last sample sooner (a burst of events about one change) is not counted"
+  type        = number
+  default     = 10
+
+  # Shorter than the 1 minute poll, so every scheduled sample counts
+  validation {
+    condition     = var.sample_interval_seconds >= 0 && var.sample_interval_seconds < 60
+    error_message = "sample_interval_seconds must be at least 0 and below 60."
+  }
+}
+
+variable "follow_up_samples" {
+  description = "After a sample that starts or extends a fail-close streak, invoke the controller again sample_interval_seconds later (through an SQS delay queue) instead of waiting for the next 1 minute polls"
+  type        = bool
+  default     = true
+}
+
+variable "firewall_alarm_arns" {
+  description = "CloudWatch alarm ARNs whose ALARM state counts as an unhealthy sample and triggers the controller immediately"
+  type        = list(string)
+  default     = []
+}